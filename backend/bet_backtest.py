@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Back-test de apostas contra os resultados das partidas
+
+Junta os registros da tabela `bets` (export CSV/JSON do Supabase) com as
+partidas pelo id da partida no banco (`bets.match_id` = `matches.id`) e calcula,
+com operações vetorizadas em DataFrame, ROI, drawdown e acerto por casa, time e
+mapa. As partidas vêm do export das tabelas `matches` e `teams` (map_name, nome,
+lado inicial e placar de cada time), com o placar de cada metade montado a partir
+do export de `rounds` (winner_side por número do round); resultados JSON do
+parse_demo também podem ser usados (halfScores de cada time), casados pelo
+`matchId` do header (o id que o upload grava no banco). Também
+reaplica estratégias de stake hipotéticas (flat, fração fixa e Kelly
+fracionário) sobre a sequência cronológica das apostas liquidadas.
+
+Uso:
+  python bet_backtest.py bets.csv --matches matches.csv --teams teams.csv [--rounds rounds.csv] [--by betting_house team map]
+  python bet_backtest.py bets.json --matches export.json --strategy flat:10 --strategy kelly:0.5
+  python bet_backtest.py bets.csv --parsed parsed/
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kill_index import collect_results
+from score_verification import HALF_ROUNDS, REGULATION_ROUNDS
+
+
+SETTLED = ("WON", "LOST")
+DEFAULT_BANKROLL = 1000.0
+DEFAULT_MAX_FRACTION = 0.05
+# Faixas de odd para estimar a chance de acerto do Kelly
+ODDS_BANDS = (1.5, 2.0, 2.5, 3.5)
+# Peso (em apostas) da chance implícita da odd contra o acerto observado
+EDGE_PRIOR_BETS = 50
+GROUPINGS = ("betting_house", "team", "map")
+MATCH_COLUMNS = ["match_id", "map", "team_a", "team_b", "score_a", "score_b",
+                 "half1_a", "half1_b", "half2_a", "half2_b"]
+HALF_COLUMNS = MATCH_COLUMNS[6:]
+
+
+def _read_table(path, key=None):
+    """
+    Export de uma tabela do Supabase: CSV, lista JSON ou {key: [...]} em JSON
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        return pd.read_csv(path, dtype={"id": str, "match_id": str})
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get(key, []) if key else data
+    return pd.DataFrame(data)
+
+
+def _normalize_id(series):
+    return series.astype(str).str.strip().str.lower()
+
+
+def load_bets(path):
+    """
+    Lê o export da tabela bets (CSV ou JSON) com as colunas do CREATE_BETS_TABLES.sql
+    """
+    bets = _read_table(path, "bets")
+    bets["bet_amount"] = pd.to_numeric(bets["bet_amount"], errors="coerce")
+    bets["odd"] = pd.to_numeric(bets["odd"], errors="coerce")
+    bets["bet_status"] = bets["bet_status"].astype(str).str.upper()
+    bets["bet_date"] = pd.to_datetime(bets["bet_date"], errors="coerce", utc=True)
+    bets["match_id"] = bets.get("match_id", pd.Series(index=bets.index, dtype=object)).astype(object)
+    return bets
+
+
+def _half_scores(rounds, teams):
+    """
+    Rounds ganhos por cada time em cada metade do tempo regulamentar
+
+    O lado gravado em teams.side é o lado inicial; na segunda metade os lados
+    trocam (mesma convenção do score_verification). Prorrogação fica de fora.
+
+    Returns:
+        DataFrame indexado por match_id com HALF_COLUMNS (vazio sem rounds/side)
+    """
+    if rounds.empty or "side" not in teams.columns or \
+            not {"match_id", "number", "winner_side"} <= set(rounds.columns):
+        return pd.DataFrame(columns=HALF_COLUMNS)
+    rounds = pd.DataFrame({
+        "match_id": _normalize_id(rounds["match_id"]),
+        "number": pd.to_numeric(rounds["number"], errors="coerce"),
+        "winner_side": rounds["winner_side"].astype(str).str.upper(),
+    })
+    rounds["half"] = np.select([rounds["number"] <= HALF_ROUNDS, rounds["number"] <= REGULATION_ROUNDS], [1, 2], 0)
+    rounds = rounds[rounds["half"] > 0].drop_duplicates(["match_id", "number"])
+
+    sides = teams[["match_id", "slot"]].assign(side=teams["side"].astype(str).str.upper())
+    merged = rounds.merge(sides, on="match_id", how="inner")
+    current = np.where(merged["half"] == 1, merged["side"], np.where(merged["side"] == "CT", "T", "CT"))
+    merged["won"] = (merged["winner_side"] == current).astype(int)
+    wide = merged.pivot_table(index="match_id", columns=["half", "slot"], values="won", aggfunc="sum")
+    wide.columns = [f"half{half}_{'a' if slot == 0 else 'b'}" for half, slot in wide.columns]
+    return wide.reindex(columns=HALF_COLUMNS)
+
+
+def load_db_matches(matches_path, teams_path=None, rounds_path=None):
+    """
+    Partidas a partir do export das tabelas matches, teams e rounds do Supabase
+
+    Args:
+        matches_path: export de matches (ou JSON único {"matches": [...], "teams": [...], "rounds": [...]})
+        teams_path: export de teams (id, match_id, name, side, score); opcional no JSON único
+        rounds_path: export de rounds (match_id, number, winner_side) para o placar
+            de cada metade; opcional no JSON único
+
+    Returns:
+        DataFrame com MATCH_COLUMNS (time A/B pelos team_a_id/team_b_id da partida,
+        ou pela ordem de cadastro quando esses campos não existem; metades vazias
+        quando não há rounds)
+    """
+    matches = _read_table(matches_path, "matches")
+    teams = _read_table(teams_path or matches_path, "teams")
+    if matches.empty or teams.empty:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+    matches = matches.assign(id=_normalize_id(matches["id"]))
+    teams = teams.assign(match_id=_normalize_id(teams["match_id"]), id=_normalize_id(teams["id"]))
+    teams = teams.sort_values([c for c in ("match_id", "created_at", "id") if c in teams.columns], kind="stable")
+
+    # Posição de cada time na partida: 0 = time A, 1 = time B
+    position = teams.groupby("match_id").cumcount()
+    if {"team_a_id", "team_b_id"} <= set(matches.columns):
+        slots = pd.concat([
+            pd.DataFrame({"id": _normalize_id(matches["team_a_id"]), "slot": 0}),
+            pd.DataFrame({"id": _normalize_id(matches["team_b_id"]), "slot": 1}),
+        ])
+        slots = slots[slots["id"] != "nan"].drop_duplicates("id")
+        slot = teams[["id"]].merge(slots, on="id", how="left")["slot"]
+        position = slot.fillna(pd.Series(position.to_numpy())).to_numpy()
+    teams = teams.assign(slot=position)
+    teams = teams[teams["slot"].isin([0, 1])].drop_duplicates(["match_id", "slot"])
+
+    wide = teams.pivot(index="match_id", columns="slot", values=["name", "score"])
+    wide.columns = [f"{'team' if field == 'name' else 'score'}_{'a' if slot == 0 else 'b'}" for field, slot in wide.columns]
+    frame = matches[["id", "map_name"]].rename(columns={"id": "match_id", "map_name": "map"})
+    frame = frame.merge(wide.reset_index(), on="match_id", how="inner")
+    rounds = _read_table(rounds_path or matches_path, "rounds")
+    frame = frame.merge(_half_scores(rounds, teams), left_on="match_id", right_index=True, how="left")
+    for column in ("score_a", "score_b") + tuple(HALF_COLUMNS):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    return frame.reindex(columns=MATCH_COLUMNS)
+
+
+def _format_map_name(raw):
+    """
+    Mesmo formato do map_name gravado pelo frontend (de_mirage -> Mirage)
+    """
+    if not raw:
+        return raw
+    name = re.sub(r"^(de_|cs_)", "", raw)
+    return name[:1].upper() + name[1:]
+
+
+def load_parsed_matches(inputs):
+    """
+    Partidas a partir de resultados JSON do parse_demo, casadas pelo matchId do header
+
+    Resultados sem matchId (id gerado no navegador) não têm como ser casados e são ignorados.
+    """
+    rows = []
+    for path in collect_results(inputs):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for record in data if isinstance(data, list) else [data]:
+            match_id = record.get("id") or record.get("matchId")
+            if not match_id:
+                continue
+            team_a, team_b = record.get("teamA", {}), record.get("teamB", {})
+            halves_a, halves_b = team_a.get("halfScores") or {}, team_b.get("halfScores") or {}
+            rows.append({
+                "match_id": str(match_id).strip().lower(),
+                "map": _format_map_name(record.get("mapName")),
+                "team_a": team_a.get("name"),
+                "team_b": team_b.get("name"),
+                "score_a": team_a.get("score"),
+                "score_b": team_b.get("score"),
+                "half1_a": halves_a.get("firstHalf"),
+                "half1_b": halves_b.get("firstHalf"),
+                "half2_a": halves_a.get("secondHalf"),
+                "half2_b": halves_b.get("secondHalf"),
+            })
+    return pd.DataFrame(rows, columns=MATCH_COLUMNS)
+
+
+def combine_matches(*frames):
+    """
+    Une as fontes de partidas (a primeira vence em ids repetidos) e calcula o vencedor
+    """
+    matches = pd.concat([frame for frame in frames if frame is not None and len(frame)] or
+                        [pd.DataFrame(columns=MATCH_COLUMNS)], ignore_index=True)
+    matches = matches.drop_duplicates("match_id", keep="first").reset_index(drop=True)
+    for column in ("score_a", "score_b") + tuple(HALF_COLUMNS):
+        matches[column] = pd.to_numeric(matches[column], errors="coerce")
+    # Quem liderava no intervalo venceu o mapa? (NaN sem metades ou com empate no intervalo)
+    leader = np.sign(matches["half1_a"] - matches["half1_b"])
+    result = np.sign(matches["score_a"] - matches["score_b"])
+    matches["half_leader_won"] = (leader == result).astype(float).where(leader.abs() == 1)
+    matches["winner"] = np.where(matches["score_a"] > matches["score_b"], matches["team_a"],
+                                 np.where(matches["score_b"] > matches["score_a"], matches["team_b"], None))
+    return matches
+
+
+def settle(bets, matches):
+    """
+    Junta apostas e partidas e calcula o resultado de cada aposta liquidada
+
+    Returns:
+        DataFrame (somente WON/LOST) ordenado por bet_date com profit, return_rate e colunas da partida
+    """
+    frame = bets[bets["bet_status"].isin(SETTLED)].copy()
+    frame["match_id"] = _normalize_id(frame["match_id"])
+    frame = frame.merge(matches, on="match_id", how="left")
+    won = frame["bet_status"] == "WON"
+    # Retorno por unidade apostada: odd - 1 na vitória, -1 na derrota
+    frame["return_rate"] = np.where(won, frame["odd"] - 1.0, -1.0)
+    frame["profit"] = frame["bet_amount"] * frame["return_rate"]
+    frame["won"] = won
+    return frame.sort_values("bet_date", kind="stable").reset_index(drop=True)
+
+
+def summarize(frame, by):
+    """
+    ROI, acerto, odd média, drawdown máximo e metades por grupo (vetorizado)
+
+    by="team" conta cada aposta para os dois times da partida e traz a média de
+    rounds que o time ganhou em cada metade; todos os agrupamentos trazem o % de
+    apostas em partidas vencidas por quem liderava no intervalo
+    """
+    if by == "team":
+        frame = pd.concat([
+            frame.assign(team=frame["team_a"], team_half1=frame["half1_a"], team_half2=frame["half2_a"]),
+            frame.assign(team=frame["team_b"], team_half1=frame["half1_b"], team_half2=frame["half2_b"]),
+        ], ignore_index=True).sort_values("bet_date", kind="stable")
+    frame = frame.assign(**{by: frame[by].fillna("(sem partida)")})
+
+    grouped = frame.groupby(by)
+    cumulative = grouped["profit"].cumsum()
+    # Drawdown: queda do lucro acumulado em relação ao pico anterior (pico inicial = 0)
+    peak = cumulative.groupby(frame[by]).cummax().clip(lower=0)
+    frame = frame.assign(drawdown=peak - cumulative)
+
+    table = frame.groupby(by).agg(
+        bets=("profit", "size"),
+        staked=("bet_amount", "sum"),
+        profit=("profit", "sum"),
+        hits=("won", "sum"),
+        avg_odd=("odd", "mean"),
+        max_drawdown=("drawdown", "max"),
+        half_leader_won=("half_leader_won", "mean"),
+        **({"avg_first_half": ("team_half1", "mean"), "avg_second_half": ("team_half2", "mean")} if by == "team" else {}),
+    )
+    table["half_leader_won"] *= 100.0
+    table["roi"] = 100.0 * table["profit"] / table["staked"]
+    table["hit_rate"] = 100.0 * table["hits"] / table["bets"]
+    return table.drop(columns="hits").sort_values("profit", ascending=False).round(2)
+
+
+def _kelly_probability(frame):
+    """
+    Chance de acerto de cada aposta para o Kelly, sem olhar o futuro
+
+    Parte da chance implícita da odd (1/odd) e soma a vantagem observada nas
+    apostas anteriores da mesma casa e faixa de odd (acertos - soma das chances
+    implícitas), encolhida por EDGE_PRIOR_BETS apostas fictícias sem vantagem.
+    """
+    odds = frame["odd"].astype(float)
+    implied = 1.0 / odds
+    keys = [frame["betting_house"], pd.Series(np.digitize(odds, ODDS_BANDS), index=frame.index)]
+    surprise = frame["won"].astype(float) - implied
+    prior_edge = surprise.groupby(keys).cumsum() - surprise
+    prior_bets = surprise.groupby(keys).cumcount()
+    p = implied + prior_edge / (prior_bets + EDGE_PRIOR_BETS)
+    return p.clip(0.0, 1.0).to_numpy(dtype=float)
+
+
+def replay_strategy(frame, strategy, bankroll=DEFAULT_BANKROLL, max_fraction=DEFAULT_MAX_FRACTION):
+    """
+    Reaplica uma regra de stake sobre as apostas liquidadas em ordem cronológica
+
+    Estratégias:
+        flat:S       stake fixo S
+        fraction:F   fração F da banca a cada aposta
+        kelly:K      K x Kelly, com a chance estimada pela odd mais a vantagem
+                     observada na casa/faixa de odd até a aposta anterior
+                     (sem olhar o futuro)
+
+    fraction e kelly nunca arriscam mais que max_fraction da banca numa aposta.
+
+    Returns:
+        dict com banca final, lucro, ROI sobre o total apostado e drawdown máximo
+    """
+    name, _, raw = strategy.partition(":")
+    param = float(raw) if raw else 1.0
+    r = frame["return_rate"].to_numpy(dtype=float)
+    odds = frame["odd"].to_numpy(dtype=float)
+
+    if name == "flat":
+        stakes = np.full(len(r), param)
+        curve = bankroll + np.cumsum(stakes * r)
+    elif name in ("fraction", "kelly"):
+        if name == "fraction":
+            fractions = np.full(len(r), param)
+        else:
+            p = _kelly_probability(frame)
+            edge = (p * odds - 1.0) / np.maximum(odds - 1.0, 1e-9)
+            fractions = np.clip(edge, 0.0, 1.0) * param
+        fractions = np.clip(fractions, 0.0, max_fraction)
+        # Banca multiplicativa: B_n = B_0 * prod(1 + f_i * r_i)
+        growth = np.cumprod(1.0 + fractions * r)
+        curve = bankroll * growth
+        previous = np.concatenate([[bankroll], curve[:-1]])
+        stakes = fractions * previous
+    else:
+        raise ValueError(f"Estratégia desconhecida: {strategy}")
+
+    if len(r) == 0:
+        return {"strategy": strategy, "bets": 0, "finalBankroll": bankroll, "profit": 0.0,
+                "staked": 0.0, "roi": None, "maxDrawdown": 0.0}
+    peaks = np.maximum.accumulate(np.concatenate([[bankroll], curve]))[1:]
+    staked = float(stakes.sum())
+    return {
+        "strategy": strategy,
+        "bets": int(len(r)),
+        "finalBankroll": round(float(curve[-1]), 2),
+        "profit": round(float(curve[-1] - bankroll), 2),
+        "staked": round(staked, 2),
+        "roi": round(100.0 * float(curve[-1] - bankroll) / staked, 2) if staked else None,
+        "maxDrawdown": round(float((peaks - curve).max()), 2),
+    }
+
+
+def backtest(bets, matches, by=GROUPINGS, strategies=(), bankroll=DEFAULT_BANKROLL, max_fraction=DEFAULT_MAX_FRACTION):
+    start = time.perf_counter()
+    frame = settle(bets, matches)
+    report = {
+        "bets": int(len(bets)),
+        "settled": int(len(frame)),
+        "unmatched": int(frame["map"].isna().sum()) if len(frame) else 0,
+        "overall": summarize(frame.assign(all="todas"), "all").reset_index().to_dict("records") if len(frame) else [],
+        "groups": {key: summarize(frame, key).reset_index().to_dict("records") if len(frame) else [] for key in by},
+        "strategies": [replay_strategy(frame, s, bankroll, max_fraction) for s in strategies],
+    }
+    report["elapsedMs"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Back-test de apostas contra os resultados das partidas")
+    cli.add_argument("bets", help="Export da tabela bets (.csv ou .json)")
+    cli.add_argument("--matches", help="Export da tabela matches (.csv/.json, ou JSON único com matches e teams)")
+    cli.add_argument("--teams", help="Export da tabela teams (.csv/.json)")
+    cli.add_argument("--rounds", help="Export da tabela rounds (.csv/.json) para o placar de cada metade")
+    cli.add_argument("--parsed", nargs="+", help="Resultados JSON do parse_demo (casados pelo matchId)")
+    cli.add_argument("--by", nargs="+", choices=GROUPINGS, default=list(GROUPINGS))
+    cli.add_argument("--strategy", action="append", default=[], help="flat:S, fraction:F ou kelly:K (repetível)")
+    cli.add_argument("--bankroll", type=float, default=DEFAULT_BANKROLL)
+    cli.add_argument("--max-fraction", type=float, default=DEFAULT_MAX_FRACTION,
+                     help="Fração máxima da banca por aposta em fraction/kelly")
+    args = cli.parse_args()
+    if not args.matches and not args.parsed:
+        cli.error("informe --matches (export do banco) e/ou --parsed")
+
+    bets = load_bets(args.bets)
+    matches = combine_matches(
+        load_db_matches(args.matches, args.teams, args.rounds) if args.matches else None,
+        load_parsed_matches(args.parsed) if args.parsed else None,
+    )
+    print(f"🎰 {len(bets)} apostas, {len(matches)} partidas", file=sys.stderr)
+    report = backtest(bets, matches, args.by, args.strategy, args.bankroll, args.max_fraction)
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
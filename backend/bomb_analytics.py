@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Análise de bomba do CS2
+Site do plant (A/B), tempo de plant, pós-plant, tentativas de defuse e retakes
+"""
+
+import numpy as np
+import pandas as pd
+
+from demo_events import assign_rounds, pick_column, round_windows
+
+
+# Eventos de bomba (extraídos numa única passada)
+BOMB_EVENTS = ["bomb_planted", "bomb_defused", "bomb_begindefuse", "bomb_exploded"]
+
+BOMB_KINDS = {
+    "bomb_planted": "plant",
+    "bomb_defused": "defuse",
+    "bomb_begindefuse": "defuse_attempt",
+    "bomb_exploded": "explode",
+}
+
+
+def site_from_place(place):
+    """
+    Converte last_place_name ("BombsiteA", "Bombsite B"...) na letra do site
+    """
+    if not isinstance(place, str):
+        return None
+    normalized = place.replace(' ', '').lower()
+    if normalized.endswith('sitea') or normalized in ('a', 'asite'):
+        return "A"
+    if normalized.endswith('siteb') or normalized in ('b', 'bsite'):
+        return "B"
+    return None
+
+
+def _bomb_frame(frames):
+    """
+    Empilha todos os eventos de bomba num único frame ordenado por tick
+    """
+    parts = []
+    for event_name, kind in BOMB_KINDS.items():
+        df = frames.get(event_name)
+        if df is None or df.empty or 'tick' not in df.columns:
+            continue
+        place_col = pick_column(df, ['user_last_place_name', 'last_place_name'])
+        site_col = pick_column(df, ['site'])
+        parts.append(pd.DataFrame({
+            'tick': df['tick'].to_numpy(dtype=np.int64),
+            'kind': kind,
+            'site': df[place_col].map(site_from_place).to_numpy(dtype=object) if place_col else None,
+            'site_id': df[site_col].to_numpy(dtype=object) if site_col else None,
+        }))
+    if not parts:
+        return pd.DataFrame(columns=['tick', 'kind', 'site', 'site_id'])
+    return pd.concat(parts, ignore_index=True).sort_values('tick', kind='stable').reset_index(drop=True)
+
+
+def analyze_bombs(frames, end_ticks, round_winners, tickrate=64, freeze_end_ticks=None):
+    """
+    Associa os eventos de bomba aos rounds e calcula métricas de pós-plant
+
+    Args:
+        frames: dict evento -> DataFrame (parse_event_frames com BOMB_EVENTS)
+        end_ticks: tick de fim de cada round emitido
+        round_winners: lado vencedor de cada round emitido
+        tickrate: tickrate da demo
+        freeze_end_ticks: ticks de round_freeze_end (opcional)
+
+    Returns:
+        dict com:
+            "rounds": lista alinhada aos rounds; None sem plant, senão
+                      {"site", "plantTime", "postPlantDuration", "defuseAttempts",
+                       "defused", "exploded", "retakeWon"}
+            "sites": agregados do mapa por site {"A": {"plants", "tWins", "ctRetakes", "tWinRate"}, ...}
+    """
+    n_rounds = len(end_ticks)
+    per_round = [None] * n_rounds
+    sites = {}
+    bombs = _bomb_frame(frames)
+    if bombs.empty or n_rounds == 0:
+        return {"rounds": per_round, "sites": sites}
+
+    end_ticks = np.asarray(end_ticks, dtype=np.int64)
+    start_ticks = round_windows(end_ticks, freeze_end_ticks)
+    bombs['round_idx'] = assign_rounds(bombs['tick'].to_numpy(), end_ticks, start_ticks)
+    bombs = bombs[bombs['round_idx'] >= 0]
+
+    plants = bombs[bombs['kind'] == 'plant'].drop_duplicates('round_idx')
+    if plants.empty:
+        return {"rounds": per_round, "sites": sites}
+
+    # Eventos depois do plant, agrupados por round e tipo
+    plant_tick = pd.Series(plants['tick'].to_numpy(), index=plants['round_idx'].to_numpy())
+    after = bombs[bombs['tick'] >= bombs['round_idx'].map(plant_tick).fillna(np.inf)]
+    first_tick = after.groupby(['round_idx', 'kind'])['tick'].min().unstack()
+    counts = after.groupby(['round_idx', 'kind']).size().unstack(fill_value=0)
+
+    tick_seconds = float(tickrate or 64)
+    idx = plants['round_idx'].to_numpy()
+    ticks = plants['tick'].to_numpy(dtype=np.int64)
+
+    def lookup(frame, column, default):
+        if column not in frame.columns:
+            return np.full(len(idx), default, dtype=float)
+        return frame[column].reindex(idx).fillna(default).to_numpy(dtype=float)
+
+    defuse_tick = lookup(first_tick, 'defuse', np.nan)
+    explode_tick = lookup(first_tick, 'explode', np.nan)
+    attempts = lookup(counts, 'defuse_attempt', 0).astype(int)
+    # Fim do pós-plant: defuse, explosão ou fim do round (o que vier primeiro)
+    post_end = np.fmin(np.fmin(defuse_tick, explode_tick), end_ticks[idx].astype(float))
+    plant_time = (ticks - start_ticks[idx]) / tick_seconds
+    post_plant = (post_end - ticks) / tick_seconds
+
+    winners = np.asarray(round_winners, dtype=object)[idx]
+    site_letters = plants['site'].to_numpy(dtype=object)
+    site_ids = plants['site_id'].to_numpy(dtype=object)
+
+    for i, round_idx in enumerate(idx):
+        site_id = site_ids[i]
+        per_round[int(round_idx)] = {
+            "site": site_letters[i],
+            "siteId": int(site_id) if isinstance(site_id, (int, np.integer, float)) and not pd.isna(site_id) else None,
+            "plantTime": round(float(plant_time[i]), 1),
+            "postPlantDuration": round(float(post_plant[i]), 1),
+            "defuseAttempts": int(attempts[i]),
+            "defused": not np.isnan(defuse_tick[i]),
+            "exploded": not np.isnan(explode_tick[i]),
+            "retakeWon": winners[i] == "CT",
+        }
+
+    # Agregados por site no mapa (sem last_place_name, agrupa pelo id da entidade do site)
+    site_keys = [letter if letter else (str(site_id) if site_id is not None else None)
+                 for letter, site_id in zip(site_letters, site_ids)]
+    site_frame = pd.DataFrame({'site': site_keys, 't_win': winners == "T"}).dropna(subset=['site'])
+    if not site_frame.empty:
+        grouped = site_frame.groupby('site')['t_win'].agg(['size', 'sum'])
+        for site, row in grouped.iterrows():
+            plants_count = int(row['size'])
+            t_wins = int(row['sum'])
+            sites[site] = {
+                "plants": plants_count,
+                "tWins": t_wins,
+                "ctRetakes": plants_count - t_wins,
+                "tWinRate": round(t_wins / plants_count, 3) if plants_count else 0.0,
+            }
+
+    return {"rounds": per_round, "sites": sites}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Utilitários compartilhados para eventos do demoparser2
+Normalização de frames, colunas de time e janelas de round (vetorizado)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# team_num do CS2: 2 = Terroristas, 3 = Contra-Terroristas
+TEAM_SIDES = {
+    2: "T",
+    3: "CT",
+    "2": "T",
+    "3": "CT",
+    "T": "T",
+    "CT": "CT",
+    "TERRORIST": "T",
+}
+
+
+def as_dataframe(events):
+    """
+    Garante que o retorno de parser.parse_event seja um DataFrame
+    (algumas versões retornam lista de dicts ou lista vazia)
+    """
+    if events is None:
+        return pd.DataFrame()
+    if isinstance(events, pd.DataFrame):
+        return events
+    if isinstance(events, list):
+        return pd.DataFrame(events) if events else pd.DataFrame()
+    return pd.DataFrame(events)
+
+
+def safe_parse_event(parser, event_name, failures=None, **kwargs):
+    """
+    Executa parser.parse_event sem propagar erros (evento ausente na demo)
+
+    Args:
+        failures: lista opcional que recebe "evento: erro" quando a extração falha
+            (demo truncada/corrompida), para marcar o resultado como parcial
+
+    Returns:
+        DataFrame (vazio se o evento não existir)
+    """
+    try:
+        return as_dataframe(parser.parse_event(event_name, **kwargs))
+    except Exception as e:
+        error = e
+        if kwargs:
+            # Algumas versões não aceitam player/other para todos os eventos
+            try:
+                return as_dataframe(parser.parse_event(event_name))
+            except Exception as retry_error:
+                error = retry_error
+        if failures is not None:
+            failures.append(f"{event_name}: {error}")
+        return pd.DataFrame()
+
+
+def parse_event_frames(parser, event_names, failures=None, **kwargs):
+    """
+    Extrai vários eventos numa única passada pela demo (parser.parse_events)
+
+    Returns:
+        dict nome_do_evento -> DataFrame (vazio para eventos ausentes)
+    """
+    frames = {name: pd.DataFrame() for name in event_names}
+    try:
+        parsed = parser.parse_events(list(event_names), **kwargs)
+    except Exception:
+        # Fallback: uma chamada por evento
+        for name in event_names:
+            frames[name] = safe_parse_event(parser, name, failures, **kwargs)
+        return frames
+
+    if isinstance(parsed, dict):
+        parsed = list(parsed.items())
+    for item in parsed or []:
+        if isinstance(item, (tuple, list)) and len(item) == 2:
+            name, events = item
+            if name in frames:
+                frames[name] = as_dataframe(events)
+    return frames
+
+
+def pick_column(df, candidates):
+    """
+    Retorna o primeiro nome de coluna existente em df dentre os candidatos
+    """
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+def sides_from_team(values):
+    """
+    Converte uma série de team_num/strings em array de lados ("CT", "T" ou None)
+    """
+    series = pd.Series(values)
+    if series.empty:
+        return np.array([], dtype=object)
+    normalized = series.map(lambda v: TEAM_SIDES.get(v.upper() if isinstance(v, str) else v))
+    numeric = pd.to_numeric(series, errors='coerce')
+    normalized = normalized.where(normalized.notna(), numeric.map(lambda v: TEAM_SIDES.get(int(v)) if not pd.isna(v) else None))
+    return normalized.to_numpy(dtype=object)
+
+
+def round_windows(end_ticks, freeze_end_ticks=None):
+    """
+    Calcula o tick de início "ao vivo" de cada round
+
+    O início é o último round_freeze_end entre o fim do round anterior e o
+    fim do round atual; sem freeze_end usa o fim do round anterior.
+
+    Args:
+        end_ticks: ticks de round_end (ordenados)
+        freeze_end_ticks: ticks de round_freeze_end (opcional)
+
+    Returns:
+        np.ndarray com o tick de início de cada round
+    """
+    end_ticks = np.asarray(end_ticks, dtype=np.int64)
+    prev_end = np.concatenate(([0], end_ticks[:-1])) if len(end_ticks) else end_ticks
+    if freeze_end_ticks is None or len(freeze_end_ticks) == 0:
+        return prev_end
+
+    freeze = np.sort(np.asarray(freeze_end_ticks, dtype=np.int64))
+    idx = np.searchsorted(freeze, end_ticks, side='right') - 1
+    candidate = np.where(idx >= 0, freeze[np.clip(idx, 0, None)], -1)
+    return np.where((idx >= 0) & (candidate > prev_end), candidate, prev_end)
+
+
+def assign_rounds(ticks, end_ticks, start_ticks=None):
+    """
+    Associa cada tick ao índice (0-based) do round cuja janela (início, fim] o contém
+
+    Args:
+        ticks: ticks dos eventos
+        end_ticks: ticks de fim de cada round (ordenados)
+        start_ticks: ticks de início de cada round (padrão: fim do round anterior)
+
+    Returns:
+        np.ndarray de índices; -1 para eventos fora de qualquer janela
+    """
+    ticks = np.asarray(ticks, dtype=np.int64)
+    end_ticks = np.asarray(end_ticks, dtype=np.int64)
+    if start_ticks is None:
+        start_ticks = round_windows(end_ticks)
+    start_ticks = np.asarray(start_ticks, dtype=np.int64)
+    if len(end_ticks) == 0 or len(ticks) == 0:
+        return np.full(len(ticks), -1, dtype=np.int64)
+
+    pos = np.searchsorted(end_ticks, ticks, side='left')
+    inside = pos < len(end_ticks)
+    clipped = np.clip(pos, 0, len(end_ticks) - 1)
+    inside &= ticks > start_ticks[clipped]
+    return np.where(inside, pos, -1)
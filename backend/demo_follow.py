@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Modo follow: acompanha uma demo .dem que ainda está sendo gravada e emite,
+em NDJSON no stdout, cada round assim que o seu round_end aparece no arquivo
+
+O demoparser2 não retoma um parse do ponto onde parou (cada leitura varre o
+arquivo inteiro), então o custo é controlado por round: a sonda de round_end só
+roda depois que o arquivo cresceu --probe-mb, e com round novo roda apenas o
+parse leve (rounds/placar). Os rounds ficam em cache pelo tick do round_end e só
+os novos (ou revisados) são emitidos. As análises pesadas (kills, utilitários,
+bomba, jogadores) rodam uma única vez, quando a partida termina, e só reemitem os
+rounds cujo conteúdo já enviado mudou.
+
+Uso:
+  python demo_follow.py <arquivo.dem> [--interval S] [--probe-mb N] [--light]
+  python demo_follow.py <destino.dem> --simulate <demo_final.dem> [--chunk-mb N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from parse_demo import DemoParser, parse_demo
+from score_verification import match_finished
+
+
+DEFAULT_INTERVAL = 1.0
+# Crescimento mínimo do arquivo entre duas sondas de round_end (cada sonda relê a demo toda)
+DEFAULT_PROBE_BYTES = 512 * 1024
+# Bytes do início do arquivo usados para detectar que a demo foi trocada/reiniciada
+PREFIX_BYTES = 64 * 1024
+
+
+def _prefix_digest(path, length):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def _guarded(fn, *args, **kwargs):
+    """
+    Executa um parse sobre o arquivo em crescimento; None se o final ainda
+    estiver incompleto (o demoparser2 pode até lançar PanicException, que não
+    herda de Exception)
+    """
+    try:
+        return fn(*args, **kwargs)
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except BaseException as e:
+        print(f"⏳ Demo ainda incompleta para parse ({type(e).__name__}) - aguardando mais dados", file=sys.stderr)
+        return None
+
+
+def _round_key(round_info):
+    """
+    Conteúdo completo do round (inclui endTick, duração, bomba e killFeed): qualquer
+    mudança em relação ao que já foi emitido vira uma revisão
+    """
+    return json.dumps(round_info, sort_keys=True, default=str)
+
+
+class DemoFollower:
+    """
+    Estado do acompanhamento de uma demo em crescimento
+
+    Args:
+        demo_path: caminho da demo sendo gravada
+        light: somente rounds/placar (sem o parse completo no fim da partida)
+        probe_bytes: crescimento mínimo do arquivo entre duas sondas de round_end
+    """
+
+    def __init__(self, demo_path, light=False, probe_bytes=DEFAULT_PROBE_BYTES):
+        self.demo_path = str(demo_path)
+        self.light = light
+        self.probe_bytes = probe_bytes
+        self.reset()
+
+    def reset(self):
+        self.size = 0
+        self.probed_size = 0
+        self.prefix = None
+        self.round_end_ticks = ()
+        # tick do round_end -> (chave do round já emitido, campos emitidos)
+        self.emitted = {}
+        self.rounds = []
+        self.finished = False
+
+    def _probe_round_ends(self):
+        # Sonda barata: um único evento, sem props de jogador
+        rounds_df = DemoParser(self.demo_path).parse_event("round_end")
+        if rounds_df is None or len(rounds_df) == 0 or "tick" not in rounds_df.columns:
+            return ()
+        if "winner" in rounds_df.columns:
+            rounds_df = rounds_df.dropna(subset=["winner"])
+        return tuple(int(tick) for tick in rounds_df["tick"])
+
+    def _round_records(self, rounds, details=None):
+        """
+        Registros dos rounds ainda não emitidos ou que mudaram desde a emissão
+
+        Só os campos já emitidos entram na comparação: um round do parse completo
+        que só acrescenta análises (killFeed, economia, utilitários...) não é
+        revisão; esses campos novos vão para `details` (quando informado).
+        """
+        records = []
+        for round_info in rounds:
+            tick = round_info.get("endTick", round_info["number"])
+            previous = self.emitted.get(tick)
+            if previous is not None:
+                key, fields = previous
+                if _round_key({field: round_info.get(field) for field in fields}) == key:
+                    extra = {field: value for field, value in round_info.items() if field not in fields}
+                    if details is not None and extra:
+                        details.append({"number": round_info["number"], "endTick": tick, **extra})
+                    continue
+            record = {"type": "round", **round_info}
+            if previous is not None:
+                record["revised"] = True
+            records.append(record)
+            self.emitted[tick] = (_round_key(round_info), tuple(round_info))
+        return records
+
+    def _finish(self, result):
+        """
+        Fim da partida: parse completo (uma vez) para as análises pesadas
+        """
+        self.finished = True
+        records = []
+        details = []
+        if not self.light:
+            full = _guarded(parse_demo, self.demo_path)
+            if full is not None:
+                result = full
+                self.rounds = full["rounds"]
+                records.extend(self._round_records(self.rounds, details))
+        ct = sum(1 for r in self.rounds if r["winnerSide"] == "CT")
+        record = {
+            "type": "match_end",
+            "rounds": len(self.rounds),
+            "winsBySide": {"CT": ct, "T": len(self.rounds) - ct},
+            "mapName": result["mapName"],
+        }
+        if not self.light:
+            record["players"] = result.get("players", [])
+            record["bombSites"] = result.get("bombSites")
+            # Análises do parse completo dos rounds que não mudaram (os que mudaram
+            # saíram inteiros como revisão)
+            record["roundDetails"] = details
+            # Jogadores/armas referenciados pelos killFeed dos rounds
+            record["killFeedPools"] = result.get("killFeedPools")
+        records.append(record)
+        return records
+
+    def poll(self, force=False):
+        """
+        Um ciclo: verifica crescimento, sonda round_end (se o arquivo cresceu o
+        bastante) e, se houver round novo, roda o parse leve e devolve os
+        registros a emitir
+
+        Args:
+            force: sonda mesmo sem crescimento suficiente (arquivo parado)
+
+        Returns:
+            lista de dicts (type "round", "reset" ou "match_end")
+        """
+        try:
+            size = os.path.getsize(self.demo_path)
+        except OSError:
+            return []
+        if size == self.size and not force:
+            return []
+
+        records = []
+        # O início já visto não pode mudar; se mudou (ou encolheu), é outra gravação
+        checked = min(self.size, PREFIX_BYTES)
+        if size < self.size or (checked and _prefix_digest(self.demo_path, checked) != self.prefix):
+            print("🔁 Demo reiniciada/substituída - recomeçando do zero", file=sys.stderr)
+            self.reset()
+            records.append({"type": "reset"})
+        self.size = size
+        self.prefix = _prefix_digest(self.demo_path, min(size, PREFIX_BYTES))
+
+        if not force and self.probed_size and size - self.probed_size < self.probe_bytes:
+            return records
+        round_end_ticks = _guarded(self._probe_round_ends)
+        if round_end_ticks is None:
+            return records
+        self.probed_size = size
+        if not set(round_end_ticks) - set(self.round_end_ticks):
+            return records
+
+        result = _guarded(parse_demo, self.demo_path, light=True)
+        if result is None:
+            return records
+        self.round_end_ticks = round_end_ticks
+        self.rounds = result["rounds"]
+        records.extend(self._round_records(self.rounds))
+
+        if match_finished(self.rounds):
+            records.extend(self._finish(result))
+        return records
+
+    def flush(self):
+        """
+        Sonda final sem o limite de crescimento (arquivo parado ou encerrado)
+        """
+        if self.finished or self.probed_size == self.size:
+            return []
+        return self.poll(force=True)
+
+
+def simulate_growth(source, target, chunk_bytes, interval):
+    """
+    Copia uma demo final para target em pedaços, imitando a gravação ao vivo
+    """
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        for chunk in iter(lambda: src.read(chunk_bytes), b""):
+            dst.write(chunk)
+            dst.flush()
+            time.sleep(interval)
+
+
+def follow(demo_path, interval=DEFAULT_INTERVAL, light=False, idle_timeout=None, out=sys.stdout,
+           probe_bytes=DEFAULT_PROBE_BYTES):
+    """
+    Loop do modo follow: emite NDJSON até a partida terminar ou o arquivo
+    ficar parado por idle_timeout segundos
+    """
+    follower = DemoFollower(demo_path, light, probe_bytes)
+    last_growth = time.time()
+
+    def emit(records):
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+    print(f"👀 Acompanhando {demo_path} (a cada {interval}s)", file=sys.stderr)
+    while True:
+        size_before = follower.size
+        emit(follower.poll())
+        if follower.size != size_before:
+            last_growth = time.time()
+        if follower.finished:
+            print(f"🏁 Partida encerrada após {len(follower.rounds)} rounds", file=sys.stderr)
+            return follower
+        if idle_timeout and time.time() - last_growth > idle_timeout:
+            # Rounds gravados depois da última sonda ainda saem antes de encerrar
+            emit(follower.flush())
+            print(f"💤 Demo sem crescer há {idle_timeout}s - encerrando", file=sys.stderr)
+            return follower
+        time.sleep(interval)
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Parse ao vivo de uma demo em gravação (NDJSON)")
+    cli.add_argument("demo_path")
+    cli.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    cli.add_argument("--light", action="store_true", help="Apenas rounds/placar")
+    cli.add_argument("--probe-mb", type=float, default=DEFAULT_PROBE_BYTES / (1024 * 1024),
+                     help="Crescimento mínimo (MB) entre duas sondas de round_end")
+    cli.add_argument("--idle-timeout", type=float, default=None,
+                     help="Encerra se o arquivo não crescer por S segundos")
+    cli.add_argument("--simulate", metavar="DEMO_FINAL",
+                     help="Grava DEMO_FINAL em pedaços em demo_path enquanto acompanha (teste)")
+    cli.add_argument("--chunk-mb", type=float, default=4.0)
+    args = cli.parse_args()
+
+    idle_timeout = args.idle_timeout
+    if args.simulate:
+        Path(args.demo_path).unlink(missing_ok=True)
+        writer = threading.Thread(
+            target=simulate_growth,
+            args=(args.simulate, args.demo_path, int(args.chunk_mb * 1024 * 1024), args.interval),
+            daemon=True,
+        )
+        writer.start()
+        idle_timeout = idle_timeout or max(10 * args.interval, 5.0)
+
+    follow(args.demo_path, args.interval, args.light, idle_timeout,
+           probe_bytes=int(args.probe_mb * 1024 * 1024))
+
+
+if __name__ == "__main__":
+    main()
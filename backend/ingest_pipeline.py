@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Pipeline de ingestão de demos em estágios concorrentes
+hash → descompressão → parse → persistência
+
+Estágios de I/O rodam em threads, o parse roda num pool de processos, e os
+estágios são ligados por filas limitadas (backpressure). Contadores por
+estágio mostram onde está o gargalo.
+
+Uso:
+  python ingest_pipeline.py <demo_ou_pasta> [...] [--out parsed/] [--parse-workers N]
+"""
+
+import argparse
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import parse_metrics
+from kill_index import KillIndex
+from player_careers import PlayerCareers
+from round_similarity import RoundVectorStore
+from team_ratings import TeamRatings
+from win_probability import WinProbabilityTable
+
+
+DEFAULT_PARSE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_IO_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 4
+HASH_CHUNK = 4 * 1024 * 1024
+
+# Extensão → função de abertura para demos compactadas
+DECOMPRESSORS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+# Registro (no diretório de saída) de quais agregadores já receberam cada partida
+SINK_LEDGER = "sinks.ndjson"
+
+_DONE = object()
+
+
+class StageStats:
+    """
+    Contadores de um estágio: itens, erros, bytes e tempo ocupado
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, nbytes=0, error=False, skipped=False):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += elapsed
+            self.bytes += nbytes
+            if error:
+                self.errors += 1
+            if skipped:
+                self.skipped += 1
+
+    def snapshot(self, wall_seconds):
+        wall = max(wall_seconds, 1e-9)
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "workers": self.workers,
+            "busySeconds": round(self.busy_seconds, 3),
+            # Fração do tempo em que os workers do estágio estiveram ocupados
+            "utilization": round(self.busy_seconds / (wall * self.workers), 3),
+            "itemsPerSecond": round(self.items / wall, 3),
+            "mbPerSecond": round(self.bytes / wall / 1024 / 1024, 3),
+        }
+
+
+def _parse_job(demo_path, original_name):
+    """
+    Executado no pool de processos: parse completo com resolução de times
+    """
+    import parse_demo
+
+    start = time.time()
+    try:
+        result = parse_demo.build_match_result(demo_path, original_name)
+        return {"result": result, "elapsed": time.time() - start}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "errorType": type(e).__name__, "elapsed": time.time() - start}
+
+
+def write_json_result(item, out_dir):
+    """
+    Persistência padrão: <out_dir>/<sha256>.json + linha no manifest.ndjson
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    target = out_dir / f"{item['sha256']}.json"
+    tmp = target.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(item["result"], f, ensure_ascii=False)
+    os.replace(tmp, target)
+    with open(out_dir / "manifest.ndjson", "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "sha256": item["sha256"],
+            "source": item["source"],
+            "name": item["name"],
+            "partial": parse_metrics.result_partial(item["result"]),
+        }, ensure_ascii=False) + "\n")
+    return target
+
+
+def sink_id(sink):
+    """
+    Identificador estável de um agregador: classe + diretório/arquivo de destino
+    """
+    target = getattr(sink, "dir", None) or getattr(sink, "path", "")
+    return f"{type(sink).__name__}:{Path(target).resolve() if target else ''}"
+
+
+def load_sink_ledger(out_dir):
+    """
+    Pares (sha256, agregador) já concluídos, lidos do sinks.ndjson
+    """
+    done = set()
+    path = Path(out_dir) / SINK_LEDGER
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # linha parcial de uma execução interrompida
+                done.add((entry["sha256"], entry["sink"]))
+    return done
+
+
+class IngestPipeline:
+    """
+    Orquestra os estágios conectados por filas limitadas
+
+    Args:
+        out_dir: diretório de saída (usado pela persistência padrão e como cache por hash)
+        parse_workers: processos de parse
+        io_workers: threads por estágio de I/O
+        queue_size: capacidade de cada fila entre estágios
+        persist: função (item, out_dir) -> destino; padrão grava JSON
+        parse_fn: função (demo_path, original_name) -> dict (executada no pool)
+        sinks: agregadores com add(result, match_key) atualizados a cada partida
+               persistida (ex.: KillIndex, TeamRatings, WinProbabilityTable). A
+               conclusão é registrada por partida em sinks.ndjson: um agregador que
+               falhou (ou foi adicionado depois) recebe a partida do JSON em cache
+               na próxima execução, sem novo parse
+    """
+
+    def __init__(self, out_dir, parse_workers=DEFAULT_PARSE_WORKERS, io_workers=DEFAULT_IO_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, persist=write_json_result, parse_fn=_parse_job, sinks=()):
+        self.out_dir = Path(out_dir)
+        self.parse_workers = max(1, parse_workers)
+        self.io_workers = max(1, io_workers)
+        self.queue_size = max(1, queue_size)
+        self.persist = persist
+        self.parse_fn = parse_fn
+        self.sinks = list(sinks)
+        self.stats = {
+            "hash": StageStats("hash", self.io_workers),
+            "decompress": StageStats("decompress", self.io_workers),
+            "parse": StageStats("parse", self.parse_workers),
+            "persist": StageStats("persist", 1),
+        }
+        self.results = []
+        self._tmp_dir = None
+        self._sinks_done = load_sink_ledger(self.out_dir) if self.sinks else set()
+
+    # --- estágios -----------------------------------------------------------
+
+    def _hash(self, item):
+        digest = hashlib.sha256()
+        size = 0
+        with open(item["source"], "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        item["sha256"] = digest.hexdigest()
+        item["size"] = size
+        # Cache: demo já ingerida (mesmo conteúdo) não é parseada de novo
+        item["cached"] = (self.out_dir / f"{item['sha256']}.json").exists()
+        parse_metrics.observe_cache(item["cached"])
+        return item, size, False
+
+    def _decompress(self, item):
+        if item["cached"] or "error" in item:
+            return item, 0, True
+        suffix = Path(item["source"]).suffix.lower()
+        opener = DECOMPRESSORS.get(suffix)
+        if opener is None:
+            item["demo_path"] = item["source"]
+            return item, 0, False
+        target = Path(self._tmp_dir) / f"{item['sha256']}.dem"
+        with opener(item["source"], "rb") as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, HASH_CHUNK)
+        item["demo_path"] = str(target)
+        item["temp"] = True
+        return item, target.stat().st_size, False
+
+    def _persist(self, item):
+        if "error" in item:
+            item["status"] = "error"
+            return item, 0, False
+        if not item.get("cached"):
+            item["output"] = str(self.persist(item, self.out_dir))
+        self._update_sinks(item)
+        item["status"] = "cached" if item.get("cached") else "done"
+        return item, 0, bool(item.get("cached"))
+
+    def _update_sinks(self, item):
+        """
+        Atualiza os agregadores que ainda não receberam a partida e registra cada conclusão
+        """
+        pending = [sink for sink in self.sinks if (item["sha256"], sink_id(sink)) not in self._sinks_done]
+        if not pending:
+            return
+        result = item.get("result")
+        if result is None:
+            with open(self.out_dir / f"{item['sha256']}.json", "r", encoding="utf-8") as f:
+                result = json.load(f)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for sink in pending:
+            try:
+                sink.add(result, item["sha256"])
+            except Exception as e:
+                # O JSON já está salvo; a próxima execução tenta de novo só este agregador
+                raise RuntimeError(f"{type(sink).__name__}: {type(e).__name__}: {e}") from e
+            key = (item["sha256"], sink_id(sink))
+            with open(self.out_dir / SINK_LEDGER, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"sha256": key[0], "sink": key[1]}, ensure_ascii=False) + "\n")
+            self._sinks_done.add(key)
+
+    # --- infraestrutura -----------------------------------------------------
+
+    def _thread_stage(self, fn, stats, in_q, out_q, workers):
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def loop():
+            while True:
+                item = in_q.get()
+                if item is _DONE:
+                    in_q.put(_DONE)  # liberar os irmãos
+                    break
+                start = time.time()
+                try:
+                    item, nbytes, skipped = fn(item)
+                    stats.record(time.time() - start, nbytes, skipped=skipped)
+                except Exception as e:
+                    item["error"] = f"{stats.name}: {type(e).__name__}: {e}"
+                    item["cached"] = False
+                    stats.record(time.time() - start, error=True)
+                out_q.put(item)
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    out_q.put(_DONE)
+
+        threads = [threading.Thread(target=loop, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _parse_stage(self, pool, in_q, out_q):
+        """
+        Despacha itens para o pool de processos sem exceder parse_workers em voo
+        """
+        stats = self.stats["parse"]
+        slots = threading.Semaphore(self.parse_workers)
+        pending = []
+        # Os callbacks rodam na thread interna do pool: só registram e repassam por
+        # uma fila sem limite; o put na fila limitada (que pode bloquear) fica com
+        # o forwarder, e o slot só volta depois dele (backpressure preservado)
+        handoff = queue.SimpleQueue()
+
+        def finished(item, future):
+            try:
+                outcome = future.result()
+            except Exception as e:  # processo do pool morreu
+                outcome = {"error": f"{type(e).__name__}: {e}", "errorType": type(e).__name__, "elapsed": 0.0}
+            if "error" in outcome:
+                item["error"] = outcome["error"]
+            else:
+                item["result"] = outcome["result"]
+            stats.record(outcome.get("elapsed", 0.0), item.get("size", 0), error="error" in outcome)
+            parse_metrics.observe_parse(
+                outcome.get("elapsed", 0.0),
+                item.get("size"),
+                len(outcome["result"].get("rounds", [])) if "result" in outcome else None,
+                error_type=outcome.get("errorType", "Exception") if "error" in outcome else None,
+                partial=parse_metrics.result_partial(outcome.get("result")),
+            )
+            if item.get("temp"):
+                Path(item["demo_path"]).unlink(missing_ok=True)
+            handoff.put(item)
+
+        def forward():
+            while True:
+                item = handoff.get()
+                if item is _DONE:
+                    break
+                out_q.put(item)
+                slots.release()
+
+        def loop():
+            while True:
+                item = in_q.get()
+                if item is _DONE:
+                    break
+                if item.get("cached") or "error" in item:
+                    stats.record(0.0, skipped=True)
+                    out_q.put(item)
+                    continue
+                slots.acquire()
+                future = pool.submit(self.parse_fn, item["demo_path"], item["name"])
+                future.add_done_callback(lambda f, it=item: finished(it, f))
+                pending.append(future)
+            for future in pending:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+            # Aguarda o forwarder entregar todos os resultados antes de encerrar
+            for _ in range(self.parse_workers):
+                slots.acquire()
+            handoff.put(_DONE)
+            out_q.put(_DONE)
+
+        forwarder = threading.Thread(target=forward, daemon=True)
+        forwarder.start()
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return [thread, forwarder]
+
+    def run(self, paths):
+        """
+        Processa todas as demos e retorna o relatório por estágio
+        """
+        start = time.time()
+        q_hash, q_decompress, q_parse, q_persist, q_out = (queue.Queue(self.queue_size) for _ in range(5))
+        self._tmp_dir = tempfile.mkdtemp(prefix="cs2-ingest-")
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            threads = []
+            threads += self._thread_stage(self._hash, self.stats["hash"], q_hash, q_decompress, self.io_workers)
+            threads += self._thread_stage(self._decompress, self.stats["decompress"], q_decompress, q_parse, self.io_workers)
+            threads += self._parse_stage(pool, q_parse, q_persist)
+            threads += self._thread_stage(self._persist, self.stats["persist"], q_persist, q_out, 1)
+
+            def feed():
+                for path in paths:
+                    q_hash.put({"source": str(path), "name": Path(path).name})
+                q_hash.put(_DONE)
+
+            feeder = threading.Thread(target=feed, daemon=True)
+            feeder.start()
+
+            while True:
+                item = q_out.get()
+                if item is _DONE:
+                    break
+                self.results.append({k: item.get(k) for k in ("source", "sha256", "status", "output", "error")})
+                label = item.get("status")
+                print(f"📦 {item['name']}: {label}" + (f" ({item['error']})" if item.get("error") else ""), file=sys.stderr)
+
+            feeder.join()
+            for thread in threads:
+                thread.join()
+
+        # Agregadores com gravação periódica persistem o que ficou pendente
+        for sink in self.sinks:
+            if hasattr(sink, "flush"):
+                sink.flush()
+
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        return self.report(time.time() - start)
+
+    def report(self, wall_seconds):
+        stages = {name: stats.snapshot(wall_seconds) for name, stats in self.stats.items()}
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"])
+        return {
+            "wallSeconds": round(wall_seconds, 3),
+            "demos": len(self.results),
+            "stages": stages,
+            "bottleneck": bottleneck,
+            "results": self.results,
+        }
+
+
+def collect_demos(inputs):
+    """
+    Expande pastas em arquivos .dem (inclusive compactados)
+    """
+    suffixes = (".dem",) + tuple(f".dem{ext}" for ext in DECOMPRESSORS)
+    paths = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.rglob("*") if p.name.lower().endswith(suffixes)))
+        elif path.exists():
+            paths.append(path)
+        else:
+            print(f"⚠️  Arquivo não encontrado: {entry}", file=sys.stderr)
+    return paths
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Ingestão de demos em pipeline")
+    cli.add_argument("inputs", nargs="+")
+    cli.add_argument("--out", default="parsed")
+    cli.add_argument("--parse-workers", type=int, default=DEFAULT_PARSE_WORKERS)
+    cli.add_argument("--io-workers", type=int, default=DEFAULT_IO_WORKERS)
+    cli.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    cli.add_argument("--metrics-file", help="Grava as métricas (formato Prometheus) ao final")
+    cli.add_argument("--index", help="Atualiza o índice de kills/rounds (kill_index.py) neste diretório")
+    cli.add_argument("--ratings", help="Atualiza os ratings/agregados por time (team_ratings.py) neste diretório")
+    cli.add_argument("--win-prob", help="Atualiza a tabela de probabilidade de vitória (win_probability.py) neste arquivo")
+    cli.add_argument("--careers", help="Atualiza a carreira por jogador (player_careers.py) neste diretório")
+    cli.add_argument("--round-vectors", help="Atualiza os vetores de rounds para busca por similaridade (round_similarity.py)")
+    args = cli.parse_args()
+
+    paths = collect_demos(args.inputs)
+    print(f"🚚 {len(paths)} demo(s) para ingerir com {args.parse_workers} processo(s) de parse", file=sys.stderr)
+    sinks = []
+    if args.index:
+        sinks.append(KillIndex(args.index))
+    if args.ratings:
+        sinks.append(TeamRatings(args.ratings))
+    if args.win_prob:
+        sinks.append(WinProbabilityTable(args.win_prob))
+    if args.careers:
+        sinks.append(PlayerCareers(args.careers))
+    if args.round_vectors:
+        sinks.append(RoundVectorStore(args.round_vectors))
+    pipeline = IngestPipeline(args.out, args.parse_workers, args.io_workers, args.queue_size, sinks=sinks)
+    report = pipeline.run(paths)
+    print(f"🐢 Gargalo: {report['bottleneck']}", file=sys.stderr)
+    if args.metrics_file:
+        parse_metrics.REGISTRY.dump(args.metrics_file)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Análise do kill feed (player_death) do CS2
+Trades, clutches (1vX), multi-kills e opening duels por round e por jogador
+
+Toda a detecção usa arrays ordenados por tick e comparações vetorizadas
+(janela deslizante por defasagem), sem loops aninhados sobre kills.
+"""
+
+import numpy as np
+import pandas as pd
+
+from demo_events import assign_rounds, pick_column, round_windows, sides_from_team
+from round_timeline import KILL_FLAGS
+
+
+# Janela padrão para considerar um kill como trade (segundos)
+TRADE_WINDOW_SECONDS = 5.0
+
+
+def _player_key(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    key = str(value)
+    return None if key in ('', '0', 'None', 'nan') else key
+
+
+def _sides(kills_df, candidates):
+    """
+    Lado ("CT"/"T"/None) por linha: primeira coluna de lado disponível, completada
+    pelas seguintes (ex.: team_num) onde estiver vazia
+    """
+    sides = np.full(len(kills_df), None, dtype=object)
+    for col in candidates:
+        if col in kills_df.columns:
+            missing = pd.isna(sides)
+            sides[missing] = sides_from_team(kills_df[col])[missing]
+    sides[pd.isna(sides)] = None
+    return sides
+
+
+def enemy_kill_mask(frame):
+    """
+    Kills em adversários: atacante presente (exclui mundo/queda) e de outro lado
+    (exclui team kills); sem lado conhecido, basta não ser suicídio
+    """
+    attacker_side = frame['attacker_side'].to_numpy(dtype=object)
+    victim_side = frame['victim_side'].to_numpy(dtype=object)
+    known = ~(pd.isna(attacker_side) | pd.isna(victim_side))
+    return (
+        frame['attacker'].notna()
+        & np.where(known, attacker_side != victim_side, (frame['attacker'] != frame['victim']).to_numpy())
+    )
+
+
+def build_kill_frame(kills_df, end_ticks, start_ticks=None):
+    """
+    Normaliza o frame de player_death em colunas fixas, ordenado por tick
+
+    Args:
+        kills_df: DataFrame de player_death (demoparser2)
+        end_ticks: ticks de fim de cada round emitido
+        start_ticks: ticks de início ao vivo de cada round (opcional)
+
+    Returns:
+        DataFrame com round_idx, tick, attacker, attacker_name, attacker_side,
+        victim, victim_name, victim_side, weapon e headshot (apenas kills dentro de rounds)
+    """
+    columns = ['round_idx', 'tick', 'attacker', 'attacker_name', 'attacker_side',
+               'victim', 'victim_name', 'victim_side', 'weapon', 'headshot']
+    if kills_df is None or kills_df.empty or 'tick' not in kills_df.columns or len(end_ticks) == 0:
+        return pd.DataFrame(columns=columns)
+
+    att_id = pick_column(kills_df, ['attacker_steamid', 'attacker_name'])
+    att_name = pick_column(kills_df, ['attacker_name', 'attacker_steamid'])
+    vic_id = pick_column(kills_df, ['user_steamid', 'victim_steamid', 'user_name', 'victim_name'])
+    vic_name = pick_column(kills_df, ['user_name', 'victim_name', 'user_steamid', 'victim_steamid'])
+    weapon = pick_column(kills_df, ['weapon'])
+    headshot = pick_column(kills_df, ['headshot'])
+
+    n = len(kills_df)
+    none_col = np.full(n, None, dtype=object)
+
+    def column(name):
+        return kills_df[name].to_numpy(dtype=object) if name else none_col
+
+    frame = pd.DataFrame({
+        'tick': kills_df['tick'].to_numpy(dtype=np.int64),
+        'attacker': column(att_id),
+        'attacker_name': column(att_name),
+        'attacker_side': _sides(kills_df, ['attacker_side', 'attacker_team_name', 'attacker_team_num', 'attacker_team']),
+        'victim': column(vic_id),
+        'victim_name': column(vic_name),
+        'victim_side': _sides(kills_df, ['user_side', 'victim_side', 'user_team_name', 'victim_team_name',
+                                         'user_team_num', 'victim_team_num', 'user_team', 'victim_team']),
+        'weapon': column(weapon),
+        'headshot': kills_df[headshot].fillna(False).to_numpy(dtype=bool) if headshot else np.zeros(n, dtype=bool),
+    })
+    # steamid 0/"0"/"" indica mundo (queda, bomba) ou atacante ausente
+    for key in ('attacker', 'victim'):
+        frame[key] = frame[key].map(_player_key).astype(object)
+
+    frame = frame.sort_values('tick', kind='stable').reset_index(drop=True)
+    if start_ticks is None:
+        start_ticks = round_windows(end_ticks)
+    frame.insert(0, 'round_idx', assign_rounds(frame['tick'].to_numpy(), end_ticks, start_ticks))
+    return frame[frame['round_idx'] >= 0].reset_index(drop=True)[columns]
+
+
+def opening_sides(kills_df, end_ticks, freeze_end_ticks=None):
+    """
+    Lado de quem abriu cada round (primeiro kill em adversário), mesmo critério
+    do openingDuel do analyze_kills, sem as demais análises (parse leve)
+
+    Returns:
+        lista alinhada a end_ticks com "CT", "T" ou None (round sem kill em adversário)
+    """
+    sides = [None] * len(end_ticks)
+    frame = build_kill_frame(kills_df, end_ticks, round_windows(end_ticks, freeze_end_ticks))
+    if frame.empty:
+        return sides
+    openings = frame[enemy_kill_mask(frame)].drop_duplicates('round_idx')
+    for round_idx, side in zip(openings['round_idx'], openings['attacker_side']):
+        sides[round_idx] = side
+    return sides
+
+
+def detect_trades(frame, tickrate, window_seconds=TRADE_WINDOW_SECONDS):
+    """
+    Marca trades: kill j "troca" o kill i quando o atacante de i morre para um
+    aliado da vítima de i dentro da janela, no mesmo round
+
+    Returns:
+        (traded_by, is_trade): traded_by[i] = índice do kill que trocou i (-1 se nenhum);
+        is_trade[j] = True se j foi um trade
+    """
+    n = len(frame)
+    traded_by = np.full(n, -1, dtype=np.int64)
+    is_trade = np.zeros(n, dtype=bool)
+    if n < 2:
+        return traded_by, is_trade
+
+    window = int(window_seconds * (tickrate or 64))
+    ticks = frame['tick'].to_numpy(dtype=np.int64)
+    rounds = frame['round_idx'].to_numpy(dtype=np.int64)
+    # Códigos inteiros por jogador (-1 = ausente) para comparação vetorizada
+    codes, _ = pd.factorize(pd.concat([frame['attacker'], frame['victim']], ignore_index=True))
+    att = codes[:n]
+    vic = codes[n:]
+    att_side = frame['attacker_side'].to_numpy(dtype=object)
+    vic_side = frame['victim_side'].to_numpy(dtype=object)
+
+    # Maior defasagem possível dentro da janela (limitada pelo nº de kills na janela)
+    hi = np.searchsorted(ticks, ticks + window, side='right')
+    max_lag = int((hi - np.arange(n)).max()) - 1
+
+    for lag in range(1, max_lag + 1):
+        a = slice(0, n - lag)
+        b = slice(lag, n)
+        hit = (
+            (att[a] >= 0)
+            & (vic[b] == att[a])
+            & (rounds[b] == rounds[a])
+            & (ticks[b] - ticks[a] <= window)
+            & (att_side[b] == vic_side[a])
+            & (att_side[b] != vic_side[b])
+            & (traded_by[a] < 0)
+        )
+        idx = np.nonzero(hit)[0]
+        traded_by[idx] = idx + lag
+        is_trade[idx + lag] = True
+
+    return traded_by, is_trade
+
+
+def detect_clutches(frame, round_winners, team_size=None):
+    """
+    Detecta situações 1vX: primeiro momento do round em que um lado fica com
+    um único jogador vivo contra X >= 1 adversários
+
+    Args:
+        frame: frame normalizado (build_kill_frame)
+        round_winners: lado vencedor de cada round (lista alinhada aos rounds)
+        team_size: jogadores por lado (padrão: maior elenco observado por lado num round)
+
+    Returns:
+        dict round_idx -> {"side", "vs", "won", "player", "steamid"}
+    """
+    if frame.empty:
+        return {}
+
+    sided = frame[frame['victim_side'].isin(['CT', 'T'])]
+    if sided.empty:
+        return {}
+
+    if team_size is None:
+        seen = pd.concat([
+            frame[['round_idx', 'attacker', 'attacker_side']].set_axis(['round_idx', 'player', 'side'], axis=1),
+            frame[['round_idx', 'victim', 'victim_side']].set_axis(['round_idx', 'player', 'side'], axis=1),
+        ], ignore_index=True).dropna()
+        team_size = int(seen.groupby(['round_idx', 'side'])['player'].nunique().max()) if not seen.empty else 5
+        team_size = max(team_size, 1)
+
+    ct_dead = (sided['victim_side'] == 'CT').astype(int).groupby(sided['round_idx']).cumsum()
+    t_dead = (sided['victim_side'] == 'T').astype(int).groupby(sided['round_idx']).cumsum()
+    alive_ct = team_size - ct_dead
+    alive_t = team_size - t_dead
+
+    ct_clutch = (alive_ct == 1) & (alive_t >= 1)
+    t_clutch = (alive_t == 1) & (alive_ct >= 1)
+    candidates = sided.assign(
+        clutch_side=np.where(ct_clutch, 'CT', np.where(t_clutch, 'T', None)),
+        vs=np.where(ct_clutch, alive_t, alive_ct),
+    )
+    firsts = candidates[candidates['clutch_side'].notna()].drop_duplicates('round_idx')
+
+    clutches = {}
+    by_round = {idx: group for idx, group in frame[frame['round_idx'].isin(firsts['round_idx'])].groupby('round_idx')}
+    for row in firsts.itertuples(index=False):
+        side = row.clutch_side
+        # Elenco do lado no round menos os mortos até o início do clutch
+        roster = by_round[row.round_idx]
+        round_kills = roster[roster['tick'] <= row.tick]
+        members = {}
+        for pid, name, pside in zip(roster['attacker'], roster['attacker_name'], roster['attacker_side']):
+            if pid and pside == side:
+                members[pid] = name
+        for pid, name, pside in zip(roster['victim'], roster['victim_name'], roster['victim_side']):
+            if pid and pside == side:
+                members[pid] = name
+        dead = set(round_kills.loc[round_kills['victim_side'] == side, 'victim'].dropna())
+        survivors = [pid for pid in members if pid not in dead]
+        clutcher = survivors[0] if len(survivors) == 1 else None
+
+        winner = round_winners[row.round_idx] if row.round_idx < len(round_winners) else None
+        clutches[int(row.round_idx)] = {
+            "side": side,
+            "vs": int(row.vs),
+            "won": winner == side,
+            "player": members.get(clutcher) if clutcher else None,
+            "steamid": clutcher,
+        }
+    return clutches
+
+
+def analyze_kills(kills_df, end_ticks, round_winners, tickrate=64, freeze_end_ticks=None,
+                  trade_window=TRADE_WINDOW_SECONDS):
+    """
+    Executa todas as detecções sobre o kill feed
+
+    Args:
+        kills_df: DataFrame de player_death
+        end_ticks: tick de fim de cada round emitido (mesma ordem de rounds_data)
+        round_winners: lado vencedor de cada round emitido
+        tickrate: tickrate da demo
+        freeze_end_ticks: ticks de round_freeze_end (opcional, refina o início dos rounds)
+        trade_window: janela de trade em segundos
+
+    Returns:
+        dict com:
+            "rounds": lista (alinhada a end_ticks) de dicts com trades, openingDuel,
+                      multiKills, clutch e killFeed (índices nos pools + flags, por kill)
+            "players": lista de estatísticas agregadas por jogador
+            "pools": jogadores ([id, nome]) e armas referenciados pelo killFeed
+    """
+    n_rounds = len(end_ticks)
+    per_round = [{"trades": 0, "openingDuel": None, "multiKills": [], "clutch": None,
+                  "killFeed": {"attackers": [], "victims": [], "weapons": [], "flags": []}}
+                 for _ in range(n_rounds)]
+    start_ticks = round_windows(end_ticks, freeze_end_ticks)
+    frame = build_kill_frame(kills_df, end_ticks, start_ticks)
+    if frame.empty:
+        return {"rounds": per_round, "players": [], "pools": {"players": [], "weapons": []}}
+
+    traded_by, is_trade = detect_trades(frame, tickrate, trade_window)
+    frame['traded'] = traded_by >= 0
+    frame['is_trade'] = is_trade
+    enemy = enemy_kill_mask(frame)
+
+    # Trades por round
+    trade_counts = np.bincount(frame['round_idx'][frame['is_trade']], minlength=n_rounds)
+
+    # Opening duel = primeiro kill em adversário do round (sem mundo nem team kill)
+    openings = frame[enemy].drop_duplicates('round_idx')
+
+    # Multi-kills: kills em adversários por jogador no round
+    enemy_kills = frame[enemy]
+    per_player_round = enemy_kills.groupby(['round_idx', 'attacker']).agg(
+        kills=('tick', 'size'), name=('attacker_name', 'last')
+    ).reset_index()
+    multi = per_player_round[per_player_round['kills'] >= 2]
+
+    clutches = detect_clutches(frame, round_winners)
+
+    for i in range(n_rounds):
+        per_round[i]["trades"] = int(trade_counts[i])
+        per_round[i]["clutch"] = clutches.get(i)
+    for row in openings.itertuples(index=False):
+        per_round[row.round_idx]["openingDuel"] = {
+            "attacker": row.attacker_name,
+            "victim": row.victim_name,
+            "side": row.attacker_side,
+            "weapon": row.weapon,
+            "traded": bool(row.traded),
+        }
+    for row in multi.sort_values(['round_idx', 'kills'], ascending=[True, False]).itertuples(index=False):
+        per_round[row.round_idx]["multiKills"].append({"player": row.name, "kills": int(row.kills)})
+
+    # Kill feed compacto por round (base do índice invertido em kill_index.py): só
+    # inteiros alinhados aos kills da timeline; round_timeline.round_kills expande
+    frame['opening'] = frame.index.isin(openings.index)
+    pools = {"players": [], "weapons": []}
+    codes = {"players": {}, "weapons": {}}
+
+    def code(pool, value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return -1
+        if value not in codes[pool]:
+            codes[pool][value] = len(pools[pool])
+            pools[pool].append(list(value) if pool == "players" else value)
+        return codes[pool][value]
+
+    flag_columns = {
+        "headshot": frame['headshot'], "opening": frame['opening'],
+        "trade": frame['is_trade'], "traded": frame['traded'],
+        "attackerCT": frame['attacker_side'] == "CT", "attackerT": frame['attacker_side'] == "T",
+        "victimCT": frame['victim_side'] == "CT", "victimT": frame['victim_side'] == "T",
+    }
+    flags = sum(flag_columns[name].to_numpy(dtype=np.int64) << bit for bit, name in enumerate(KILL_FLAGS))
+    for row, row_flags in zip(frame.itertuples(index=False), flags.tolist()):
+        feed = per_round[row.round_idx]["killFeed"]
+        feed["attackers"].append(code("players", (row.attacker, row.attacker_name)) if row.attacker else -1)
+        feed["victims"].append(code("players", (row.victim, row.victim_name)) if row.victim else -1)
+        feed["weapons"].append(code("weapons", row.weapon))
+        feed["flags"].append(row_flags)
+
+    players = aggregate_players(frame, enemy, openings, per_player_round, clutches)
+    return {"rounds": per_round, "players": players, "pools": pools}
+
+
+def aggregate_players(frame, enemy, openings, per_player_round, clutches):
+    """
+    Agrega estatísticas por jogador (chave: steamid, ou nome na ausência dele)
+    """
+    kills = frame[enemy].groupby('attacker').size()
+    deaths = frame[frame['victim'].notna()].groupby('victim').size()
+    trade_kills = frame[enemy & frame['is_trade']].groupby('attacker').size()
+    traded_deaths = frame[frame['traded']].groupby('victim').size()
+    opening_kills = openings[openings['attacker'].notna()].groupby('attacker').size()
+    opening_deaths = openings[openings['victim'].notna()].groupby('victim').size()
+    multi = per_player_round[per_player_round['kills'] >= 2]
+    multi_counts = multi.groupby(['attacker', 'kills']).size().unstack(fill_value=0) if not multi.empty else pd.DataFrame()
+
+    names = pd.concat([
+        frame[['attacker', 'attacker_name']].set_axis(['id', 'name'], axis=1),
+        frame[['victim', 'victim_name']].set_axis(['id', 'name'], axis=1),
+    ]).dropna(subset=['id']).drop_duplicates('id', keep='last').set_index('id')['name']
+
+    # Kills/mortes por lado (team_num do próprio evento)
+    side_kills = frame[enemy].groupby(['attacker', 'attacker_side']).size()
+    side_deaths = frame[frame['victim'].notna()].groupby(['victim', 'victim_side']).size()
+
+    clutch_df = pd.DataFrame([c for c in clutches.values() if c["steamid"]])
+    clutches_played = clutch_df.groupby('steamid').size() if not clutch_df.empty else pd.Series(dtype=int)
+    clutches_won = clutch_df[clutch_df['won']].groupby('steamid').size() if not clutch_df.empty else pd.Series(dtype=int)
+
+    players = []
+    for pid, name in names.items():
+        players.append({
+            "steamid": pid,
+            "name": name,
+            "kills": int(kills.get(pid, 0)),
+            "deaths": int(deaths.get(pid, 0)),
+            "tradeKills": int(trade_kills.get(pid, 0)),
+            "tradedDeaths": int(traded_deaths.get(pid, 0)),
+            "openingKills": int(opening_kills.get(pid, 0)),
+            "openingDeaths": int(opening_deaths.get(pid, 0)),
+            "multiKills": {
+                f"{k}k": int(multi_counts.loc[pid, k])
+                for k in multi_counts.columns if pid in multi_counts.index and multi_counts.loc[pid, k] > 0
+            },
+            "clutchesPlayed": int(clutches_played.get(pid, 0)),
+            "clutchesWon": int(clutches_won.get(pid, 0)),
+            "ctKills": int(side_kills.get((pid, 'CT'), 0)),
+            "ctDeaths": int(side_deaths.get((pid, 'CT'), 0)),
+            "tKills": int(side_kills.get((pid, 'T'), 0)),
+            "tDeaths": int(side_deaths.get((pid, 'T'), 0)),
+        })
+    players.sort(key=lambda p: (-p["kills"], p["deaths"]))
+    return players
+
+
+def empty_player(steamid, name):
+    """
+    Estatísticas zeradas (mesmas chaves de aggregate_players) para quem não
+    aparece no kill feed
+    """
+    return {
+        "steamid": steamid, "name": name, "kills": 0, "deaths": 0, "tradeKills": 0, "tradedDeaths": 0,
+        "openingKills": 0, "openingDeaths": 0, "multiKills": {}, "clutchesPlayed": 0, "clutchesWon": 0,
+        "ctKills": 0, "ctDeaths": 0, "tKills": 0, "tDeaths": 0,
+    }
+
+
+def aggregate_damage(hurt_df, end_ticks, start_ticks=None):
+    """
+    Dano causado em adversários por jogador (player_hurt, dmg_health) dentro dos rounds
+
+    Returns:
+        dict chave do jogador (steamid) -> dano total
+    """
+    if hurt_df is None or hurt_df.empty or 'tick' not in hurt_df.columns or len(end_ticks) == 0:
+        return {}
+    att_id = pick_column(hurt_df, ['attacker_steamid', 'attacker_name'])
+    dmg = pick_column(hurt_df, ['dmg_health'])
+    att_team = pick_column(hurt_df, ['attacker_team_num', 'attacker_team'])
+    vic_team = pick_column(hurt_df, ['user_team_num', 'victim_team_num', 'user_team'])
+    if not att_id or not dmg:
+        return {}
+
+    if start_ticks is None:
+        start_ticks = round_windows(end_ticks)
+    in_round = assign_rounds(hurt_df['tick'].to_numpy(dtype=np.int64), end_ticks, start_ticks) >= 0
+    # Sem times no evento não dá para separar dano em aliados: conta tudo
+    enemy = (sides_from_team(hurt_df[att_team]) != sides_from_team(hurt_df[vic_team])) if att_team and vic_team \
+        else np.ones(len(hurt_df), dtype=bool)
+    frame = pd.DataFrame({
+        'attacker': hurt_df[att_id].map(_player_key).to_numpy(dtype=object),
+        'damage': pd.to_numeric(hurt_df[dmg], errors='coerce').fillna(0).to_numpy(dtype=float),
+    })[in_round & enemy]
+    totals = frame.dropna(subset=['attacker']).groupby('attacker')['damage'].sum()
+    return {pid: int(total) for pid, total in totals.items()}
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Índice invertido persistente sobre kills e rounds de todas as partidas parseadas
+
+Cada ingestão vira um segmento imutável (termos ordenados + posting lists
+numpy de ids de documento); quando passam de MAX_SEGMENTS, os segmentos mais
+novos são mesclados em camadas de tamanho crescente (cada documento é
+reescrito O(log n) vezes). Os ids são globais e crescentes, então a posting list de um termo
+no índice inteiro é a concatenação (já ordenada) das listas dos segmentos, e uma
+consulta é uma interseção/diferença de arrays ordenados.
+
+Termos de kill:  attacker:<steamid|nome>  victim:<steamid|nome>  weapon:<arma>
+                 map:<mapa>  side:<CT|T>  team:<time>  round:<n>  opening  trade
+                 traded  headshot  won  pistol  overtime  planted
+                 clutch (kills do jogador em clutch, depois de ficar sozinho)
+Termos de round: map:<mapa>  winner:<CT|T>  team_won:<time>  team_lost:<time>
+                 round:<n>  planted  defused  exploded  pistol  overtime  clutch
+
+Uso:
+  python kill_index.py add <resultado.json|pasta> [...] [--index kill_index/]
+  python kill_index.py query kills weapon:awp opening attacker:fallen map:mirage side:CT
+  python kill_index.py query rounds team_lost:furia planted --not defused
+  python kill_index.py merge
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from round_timeline import round_kills
+from score_verification import HALF_ROUNDS, REGULATION_ROUNDS, starting_ct_side
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_INDEX_DIR = os.environ.get("KILL_INDEX_DIR", str(BACKEND_DIR / "kill_index"))
+DOC_TYPES = ("kills", "rounds")
+# Acima disso, os segmentos mais novos são mesclados na ingestão
+MAX_SEGMENTS = 8
+
+
+def normalize_term_value(value):
+    return str(value).strip().lower().replace(" ", "_")
+
+
+def normalize_query_term(term):
+    if ":" not in term:
+        return term
+    field, value = term.split(":", 1)
+    return f"{field}:{normalize_term_value(value)}"
+
+
+def _term(field, value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value == "":
+        return None
+    return f"{field}:{normalize_term_value(value)}"
+
+
+def _round_teams(result, round_number):
+    """
+    (time em CT, time em T) no round, pelo lado inicial do teamA
+    """
+    team_a = result.get("teamA", {})
+    team_b = result.get("teamB", {})
+    starter, other = (team_a, team_b) if team_a.get("side", "CT") == "CT" else (team_b, team_a)
+    if starting_ct_side(round_number) == "CT":
+        return starter.get("name"), other.get("name")
+    return other.get("name"), starter.get("name")
+
+
+def clutch_kills(kills, clutch):
+    """
+    Índices (no kill feed do round) dos kills do jogador em clutch feitos depois
+    que ele ficou sozinho: após a última morte de um aliado do mesmo lado
+    """
+    if not clutch or not clutch.get("steamid"):
+        return set()
+    side, clutcher = clutch.get("side"), clutch["steamid"]
+    start = max((k.get("tick") or 0 for k in kills
+                 if k.get("victimSide") == side and k.get("victimSteamid") != clutcher), default=0)
+    return {
+        i for i, k in enumerate(kills)
+        if k.get("attackerSteamid") == clutcher and k.get("victimSide") != side and (k.get("tick") or 0) >= start
+    }
+
+
+def match_documents(result, match_key):
+    """
+    Converte um resultado do parse_demo em documentos de round e de kill
+
+    Returns:
+        dict tipo -> lista de (termos, documento armazenado)
+    """
+    map_term = _term("map", result.get("mapName"))
+    docs = {"kills": [], "rounds": []}
+    for round_info in result.get("rounds", []):
+        number = round_info["number"]
+        ct_team, t_team = _round_teams(result, number)
+        team_by_side = {"CT": ct_team, "T": t_team}
+        winner = round_info.get("winnerSide")
+        loser = "T" if winner == "CT" else "CT"
+        bomb = round_info.get("bomb") or {}
+        context = {
+            map_term,
+            f"round:{number}",
+            "pistol" if number in (1, HALF_ROUNDS + 1) else None,
+            "overtime" if number > REGULATION_ROUNDS else None,
+            "planted" if round_info.get("bombPlanted") else None,
+        }
+        round_terms = context | {
+            "clutch" if round_info.get("clutch") else None,
+            f"winner:{normalize_term_value(winner)}",
+            _term("team_won", team_by_side.get(winner)),
+            _term("team_lost", team_by_side.get(loser)),
+            "defused" if round_info.get("bombDefused") else None,
+            "exploded" if bomb.get("exploded") else None,
+        }
+        docs["rounds"].append((round_terms - {None}, {
+            "match": match_key,
+            "map": result.get("mapName"),
+            "round": number,
+            "winnerSide": winner,
+            "winnerTeam": team_by_side.get(winner),
+            "endReason": round_info.get("endReason"),
+        }))
+
+        kills = round_kills(result, round_info) or []
+        # Em kills, "clutch" marca só os kills do jogador em clutch durante o 1vX
+        clutch = clutch_kills(kills, round_info.get("clutch"))
+        for position, kill in enumerate(kills):
+            side = kill.get("attackerSide")
+            kill_terms = context | {
+                _term("attacker", kill.get("attackerSteamid")),
+                _term("attacker", kill.get("attacker")),
+                _term("victim", kill.get("victimSteamid")),
+                _term("victim", kill.get("victim")),
+                _term("weapon", kill.get("weapon")),
+                _term("side", side),
+                _term("team", team_by_side.get(side)),
+                "opening" if kill.get("opening") else None,
+                "trade" if kill.get("trade") else None,
+                "traded" if kill.get("traded") else None,
+                "headshot" if kill.get("headshot") else None,
+                "clutch" if position in clutch else None,
+                "won" if side and side == winner else None,
+            }
+            docs["kills"].append((kill_terms - {None}, {
+                "match": match_key,
+                "map": result.get("mapName"),
+                "round": number,
+                "tick": kill.get("tick"),
+                "attacker": kill.get("attacker"),
+                "victim": kill.get("victim"),
+                "weapon": kill.get("weapon"),
+                "side": side,
+            }))
+    return docs
+
+
+class Segment:
+    """
+    Segmento imutável de um tipo de documento: termos ordenados, offsets e
+    postings (uint32) num .npz e os documentos armazenados num .json
+    """
+
+    def __init__(self, path, terms, offsets, postings, first_id, stored=None):
+        self.path = Path(path)
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.first_id = first_id
+        self._stored = stored
+
+    @classmethod
+    def build(cls, path, docs, first_id):
+        by_term = {}
+        for i, (terms, _) in enumerate(docs):
+            for term in terms:
+                by_term.setdefault(term, []).append(first_id + i)
+        terms = np.array(sorted(by_term), dtype=str)
+        lengths = np.array([len(by_term[t]) for t in terms], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        postings = (np.concatenate([by_term[t] for t in terms]) if len(terms) else np.array([])).astype(np.uint32)
+        return cls(path, terms, offsets, postings, first_id, [stored for _, stored in docs])
+
+    @classmethod
+    def load(cls, path, first_id):
+        with np.load(f"{path}.npz", allow_pickle=False) as data:
+            return cls(path, data["terms"], data["offsets"], data["postings"], first_id)
+
+    @property
+    def stored(self):
+        if self._stored is None:
+            with open(f"{self.path}.json", "r", encoding="utf-8") as f:
+                self._stored = json.load(f)
+        return self._stored
+
+    def save(self):
+        np.savez(f"{self.path}.tmp.npz", terms=self.terms, offsets=self.offsets, postings=self.postings)
+        os.replace(f"{self.path}.tmp.npz", f"{self.path}.npz")
+        with open(f"{self.path}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.stored, f, ensure_ascii=False)
+        os.replace(f"{self.path}.json.tmp", f"{self.path}.json")
+
+    def postings_for(self, term):
+        i = np.searchsorted(self.terms, term)
+        if i >= len(self.terms) or self.terms[i] != term:
+            return self.postings[:0]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def document(self, doc_id):
+        return self.stored[doc_id - self.first_id]
+
+    def remove_files(self):
+        for suffix in (".npz", ".json"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+
+
+class KillIndex:
+    """
+    Índice em disco: manifest.json + segmentos por tipo de documento; as partidas
+    indexadas ficam num log só de acréscimo (matches.txt, uma chave por linha)
+
+    O manifest é o ponto de commit: ele guarda até que byte de matches.txt vale
+    (matchesBytes), gravado junto com os segmentos da partida. Uma chave acrescentada
+    sem o manifest correspondente (queda no meio do add) é descartada ao reabrir.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.dir = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.dir / "manifest.json"
+        self.matches_path = self.dir / "matches.txt"
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"nextSegment": 1, "types": {t: {"nextId": 0, "segments": []} for t in DOC_TYPES}}
+        self.matches = set()
+        if self.matches_path.exists():
+            committed = self.manifest.setdefault("matchesBytes", self.matches_path.stat().st_size)
+            with open(self.matches_path, "rb") as f:
+                self.matches = {line.decode("utf-8").rstrip("\n") for line in f.read(committed).splitlines(True)
+                                if line.endswith(b"\n") and line.strip()}
+        legacy = self.manifest.pop("matches", None)
+        if legacy:
+            # Formato antigo: lista de partidas dentro do manifest
+            self._append_matches([key for key in legacy if key not in self.matches])
+            self._save_manifest()
+        self._segments = {}
+
+    def _append_matches(self, keys):
+        """
+        Acrescenta chaves a matches.txt; só valem depois do próximo _save_manifest
+        """
+        if not keys:
+            return
+        committed = self.manifest.get("matchesBytes", 0)
+        if self.matches_path.exists():
+            committed = min(committed, self.matches_path.stat().st_size)
+        with open(self.matches_path, "ab") as f:
+            # Descarta chaves de um add interrompido antes do commit do manifest
+            f.truncate(committed)
+            f.write("".join(f"{key}\n" for key in keys).encode("utf-8"))
+            self.manifest["matchesBytes"] = f.tell()
+        self.matches.update(keys)
+
+    def _save_manifest(self):
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(tmp, self.manifest_path)
+
+    def segments(self, doc_type):
+        entries = self.manifest["types"][doc_type]["segments"]
+        loaded = []
+        for entry in entries:
+            key = (doc_type, entry["name"])
+            if key not in self._segments:
+                self._segments[key] = Segment.load(self.dir / entry["name"], entry["firstId"])
+            loaded.append(self._segments[key])
+        return loaded
+
+    def _new_segment_path(self, doc_type):
+        name = f"{doc_type}-{self.manifest['nextSegment']:06d}"
+        self.manifest["nextSegment"] += 1
+        return name
+
+    def add(self, result, match_key):
+        """
+        Indexa uma partida (ignorada se match_key já foi indexada)
+
+        Returns:
+            dict tipo -> nº de documentos adicionados (None se duplicada)
+        """
+        if match_key in self.matches:
+            return None
+        # A chave entra no mesmo commit (manifest) que os segmentos da partida
+        self._append_matches([match_key])
+        added = {}
+        for doc_type, docs in match_documents(result, match_key).items():
+            added[doc_type] = len(docs)
+            if not docs:
+                continue
+            state = self.manifest["types"][doc_type]
+            name = self._new_segment_path(doc_type)
+            segment = Segment.build(self.dir / name, docs, state["nextId"])
+            segment.save()
+            self._segments[(doc_type, name)] = segment
+            state["segments"].append({"name": name, "firstId": state["nextId"], "size": len(docs)})
+            state["nextId"] += len(docs)
+        for doc_type in DOC_TYPES:
+            entries = self.manifest["types"][doc_type]["segments"]
+            if len(entries) > MAX_SEGMENTS:
+                # Cauda com os MAX_SEGMENTS mais novos, estendida enquanto o segmento
+                # anterior não for maior que a cauda inteira (camadas geométricas)
+                start = len(entries) - MAX_SEGMENTS
+                tail = sum(e["size"] for e in entries[start:])
+                while start > 0 and entries[start - 1]["size"] <= tail:
+                    start -= 1
+                    tail += entries[start]["size"]
+                self.merge(doc_type, start)
+        self._save_manifest()
+        return added
+
+    def merge(self, doc_type, start=0):
+        """
+        Mescla os segmentos de um tipo a partir da posição start num só (ids preservados)
+        """
+        state = self.manifest["types"][doc_type]
+        kept = state["segments"][:start]
+        segments = self.segments(doc_type)[start:]
+        if len(segments) < 2:
+            return
+        terms = np.unique(np.concatenate([s.terms for s in segments]))
+        lists = [[] for _ in terms]
+        for segment in segments:
+            positions = np.searchsorted(terms, segment.terms)
+            for pos, lo, hi in zip(positions, segment.offsets[:-1], segment.offsets[1:]):
+                lists[pos].append(segment.postings[lo:hi])
+        lengths = np.array([sum(len(p) for p in parts) for parts in lists], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        postings = np.concatenate([np.concatenate(parts) for parts in lists]).astype(np.uint32)
+        stored = [doc for segment in segments for doc in segment.stored]
+
+        name = self._new_segment_path(doc_type)
+        merged = Segment(self.dir / name, terms, offsets, postings, segments[0].first_id, stored)
+        merged.save()
+        state["segments"] = kept + [{"name": name, "firstId": merged.first_id, "size": len(stored)}]
+        self._save_manifest()
+        for segment in segments:
+            segment.remove_files()
+            self._segments.pop((doc_type, segment.path.name), None)
+        self._segments[(doc_type, name)] = merged
+        print(f"🗜️  {len(segments)} segmentos de {doc_type} mesclados ({len(stored)} documentos)", file=sys.stderr)
+
+    def postings(self, doc_type, term):
+        parts = [s.postings_for(term) for s in self.segments(doc_type)]
+        return np.concatenate(parts) if parts else np.array([], dtype=np.uint32)
+
+    def query(self, doc_type, include, exclude=(), limit=20):
+        """
+        Documentos que têm todos os termos de include e nenhum de exclude
+
+        Returns:
+            dict com total, hits (até limit documentos) e tempo em ms
+        """
+        start = time.perf_counter()
+        include = [normalize_query_term(t) for t in include]
+        # Interseção começando pela lista mais curta
+        lists = sorted((self.postings(doc_type, t) for t in include), key=len)
+        if lists:
+            ids = lists[0]
+            for other in lists[1:]:
+                if len(ids) == 0:
+                    break
+                ids = np.intersect1d(ids, other, assume_unique=True)
+        else:
+            total = self.manifest["types"][doc_type]["nextId"]
+            ids = np.arange(total, dtype=np.uint32)
+        for term in exclude:
+            ids = np.setdiff1d(ids, self.postings(doc_type, normalize_query_term(term)), assume_unique=True)
+
+        segments = self.segments(doc_type)
+        firsts = np.array([s.first_id for s in segments], dtype=np.int64)
+        hits = []
+        for doc_id in ids[:limit]:
+            segment = segments[int(np.searchsorted(firsts, doc_id, side="right")) - 1]
+            hits.append(segment.document(int(doc_id)))
+        return {
+            "total": int(len(ids)),
+            "hits": hits,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+
+def collect_results(inputs):
+    """
+    Expande pastas em arquivos de resultado .json (ignora *.error.json)
+    """
+    paths = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.glob("*.json") if not p.name.endswith(".error.json")))
+        elif path.exists():
+            paths.append(path)
+        else:
+            print(f"⚠️  Arquivo não encontrado: {entry}", file=sys.stderr)
+    return paths
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Índice invertido de kills e rounds")
+    cli.add_argument("--index", default=DEFAULT_INDEX_DIR)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Indexa resultados JSON do parse_demo")
+    add.add_argument("inputs", nargs="+")
+
+    query = sub.add_parser("query", help="Documentos com todos os termos")
+    query.add_argument("doc_type", choices=DOC_TYPES)
+    query.add_argument("terms", nargs="*")
+    query.add_argument("--not", dest="exclude", action="append", default=[], help="Termo a excluir (repetível)")
+    query.add_argument("--limit", type=int, default=20)
+
+    sub.add_parser("merge", help="Mescla todos os segmentos")
+    args = cli.parse_args()
+
+    index = KillIndex(args.index)
+    if args.command == "add":
+        for path in collect_results(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            added = index.add(result, path.stem)
+            label = "já indexada" if added is None else f"{added['kills']} kills, {added['rounds']} rounds"
+            print(f"📇 {path.name}: {label}", file=sys.stderr)
+    elif args.command == "merge":
+        for doc_type in DOC_TYPES:
+            index.merge(doc_type)
+    else:
+        print(json.dumps(index.query(args.doc_type, args.terms, args.exclude, args.limit), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ Usa demoparser2 + pandas para análise completa
 
 import sys
 import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
@@ -18,6 +19,16 @@ except ImportError:
     }), file=sys.stderr)
     sys.exit(1)
 
+from bomb_analytics import BOMB_EVENTS, analyze_bombs
+from demo_events import parse_event_frames, round_windows, safe_parse_event
+from kill_analytics import aggregate_damage, analyze_kills, empty_player, opening_sides
+from round_reconciliation import reconcile_round_ends
+from round_timeline import build_timelines
+from score_verification import match_finished, verify_scores
+from survivor_analytics import sample_economy, sample_survivors
+from team_aliases import TeamAliasRegistry
+from utility_analytics import UTILITY_EVENTS, analyze_utility
+
 
 def load_config_file(demo_path):
     """
@@ -47,12 +58,23 @@ def load_config_file(demo_path):
     return None
 
 
-def parse_demo(demo_path):
+def events_in_window(sorted_ticks, start_tick, end_tick):
+    """
+    Verifica se há algum tick em (start_tick, end_tick] num array ordenado
+    """
+    lo = np.searchsorted(sorted_ticks, start_tick, side='right')
+    hi = np.searchsorted(sorted_ticks, end_tick, side='right')
+    return bool(hi > lo)
+
+
+def parse_demo(demo_path, light=False):
     """
     Processa arquivo .dem do CS2 e retorna dados estruturados
     
     Args:
         demo_path: Caminho para o arquivo .dem
+        light: Se True, extrai só rounds/placar (sem análises de kills, bomba,
+               utilitários e sobreviventes) - usado como fallback do watchdog
         
     Returns:
         dict: Dados da partida em formato JSON
@@ -78,53 +100,51 @@ def parse_demo(demo_path):
         print("🔄 Extraindo rounds...", file=sys.stderr)
         rounds_df = parser.parse_event("round_end")
         
-        # Extrair kills
+        # Extrair kills (com team_num de atacante/vítima para trades e clutches)
+        # Falhas de extração (demo truncada/corrompida) viram motivos de resultado parcial
+        event_failures = []
         print("💀 Extraindo kills...", file=sys.stderr)
-        kills_df = parser.parse_event("player_death")
+        kills_df = safe_parse_event(parser, "player_death", event_failures, player=["team_num"])
+        freeze_end_df = safe_parse_event(parser, "round_freeze_end", event_failures)
+        official_end_df = safe_parse_event(parser, "round_officially_ended", event_failures)
+        freeze_end_ticks_sorted = np.sort(freeze_end_df['tick'].to_numpy(dtype=np.int64)) if 'tick' in freeze_end_df.columns else np.array([], dtype=np.int64)
         
-        # Extrair bomb events
+        # Extrair granadas, cegueiras e dano numa única passada
+        utility_frames = {}
+        if not light:
+            print("🧨 Extraindo eventos de utilitários...", file=sys.stderr)
+            utility_frames = parse_event_frames(parser, UTILITY_EVENTS, event_failures, player=["team_num"])
+
+        # Extrair bomb events (plant, defuse, tentativas e explosão) numa única passada
         print("💣 Extraindo eventos de bomba...", file=sys.stderr)
-        try:
-            bomb_planted_df = parser.parse_event("bomb_planted")
-            bomb_defused_df = parser.parse_event("bomb_defused")
-            # Garantir que são DataFrames (parser.parse_event pode retornar listas)
-            if isinstance(bomb_planted_df, list):
-                bomb_planted_df = pd.DataFrame(bomb_planted_df) if bomb_planted_df else pd.DataFrame()
-            if isinstance(bomb_defused_df, list):
-                bomb_defused_df = pd.DataFrame(bomb_defused_df) if bomb_defused_df else pd.DataFrame()
-        except:
-            bomb_planted_df = pd.DataFrame()
-            bomb_defused_df = pd.DataFrame()
+        bomb_frames = parse_event_frames(parser, BOMB_EVENTS, event_failures, player=["last_place_name"])
+        bomb_planted_df = bomb_frames["bomb_planted"]
+        bomb_defused_df = bomb_frames["bomb_defused"]
+        bomb_planted_ticks = np.sort(bomb_planted_df['tick'].to_numpy()) if 'tick' in bomb_planted_df.columns else np.array([])
+        bomb_defused_ticks = np.sort(bomb_defused_df['tick'].to_numpy()) if 'tick' in bomb_defused_df.columns else np.array([])
         
         # Processar rounds
         rounds_data = []
         tickrate = header.get('tickrate', 64) or 64
         last_end_tick = 0
+        round_end_ticks = []
+        removed_round_ends = []
 
         if not rounds_df.empty:
             print(f"📋 Colunas disponíveis: {rounds_df.columns.tolist()}", file=sys.stderr)
             print(f"📋 Primeiros dados: {rounds_df.head(2).to_dict()}", file=sys.stderr)
             print(f"📋 Total de linhas em rounds_df: {len(rounds_df)}", file=sys.stderr)
-            # Limpeza: remover eventos sem vencedor (warmup/restart), ordenar por tick e renumerar
-            rounds_df = rounds_df.dropna(subset=['winner'])
-            
-            # Detectar e remover rounds duplicados/suspeitos
-            # Em algumas demos (ex: Nuke), há eventos round_end duplicados que precisam ser removidos
-            # Estratégia: se houver 23+ rounds após cleanup, verificar se remover certos rounds
-            # resulta em contagem mais "natural" (MR12 = 12+11=23 máx, ou 22 em OT curto)
-            if len(rounds_df) > 22:
-                print(f"⚠️  Detectado {len(rounds_df)} rounds - verificando duplicatas", file=sys.stderr)
-                # Verificar se remover round 2 normaliza (específico para Nuke)
-                rounds_test = rounds_df[rounds_df['round'] != 2]
-                if len(rounds_test) == 22:
-                    t_test = len(rounds_test[rounds_test['winner'] == 'T'])
-                    ct_test = len(rounds_test[rounds_test['winner'] == 'CT'])
-                    # Se resulta em contagem válida (13-9, 13-6, etc), é o culpado
-                    if (t_test == 13 or ct_test == 13) and (t_test + ct_test == 22):
-                        print(f"⚠️  Removendo round 2 (resultado: {t_test}-{ct_test})", file=sys.stderr)
-                        rounds_df = rounds_test
-            
-            rounds_df = rounds_df.sort_values('tick').reset_index(drop=True)
+            # Reconciliação em uma passada: warmup, ecos duplicados, restarts/restores e
+            # eventos após o fim da partida saem com o motivo registrado
+            rounds_df, removed_round_ends = reconcile_round_ends(
+                rounds_df,
+                safe_parse_event(parser, "round_start", event_failures),
+                freeze_end_df,
+                official_end_df,
+                tickrate=tickrate,
+            )
+            for removal in removed_round_ends:
+                print(f"⏭️  Removendo round_end do tick {removal['tick']} (round {removal['round']}): {removal['reason']}", file=sys.stderr)
             print(f"📋 Total de linhas em rounds_df (limpo): {len(rounds_df)}", file=sys.stderr)
 
             # Funções de mapeamento (inclui target_saved)
@@ -265,14 +285,14 @@ def parse_demo(demo_path):
                 if not bomb_planted_df.empty:
                     if 'round' in bomb_planted_df.columns:
                         bomb_planted = len(bomb_planted_df[bomb_planted_df['round'] == round_num]) > 0
-                    elif 'tick' in bomb_planted_df.columns:
-                        bomb_planted = len(bomb_planted_df[(bomb_planted_df['tick'] >= tick_val - 5000) & (bomb_planted_df['tick'] <= tick_val)]) > 0
+                    elif len(bomb_planted_ticks):
+                        bomb_planted = events_in_window(bomb_planted_ticks, last_end_tick, tick_val)
 
                 if not bomb_defused_df.empty:
                     if 'round' in bomb_defused_df.columns:
                         bomb_defused = len(bomb_defused_df[bomb_defused_df['round'] == round_num]) > 0
-                    elif 'tick' in bomb_defused_df.columns:
-                        bomb_defused = len(bomb_defused_df[(bomb_defused_df['tick'] >= tick_val - 5000) & (bomb_defused_df['tick'] <= tick_val)]) > 0
+                    elif len(bomb_defused_ticks):
+                        bomb_defused = events_in_window(bomb_defused_ticks, last_end_tick, tick_val)
 
                 # End reason
                 end_reason = map_reason_to_end(reason_val, winner_side)
@@ -288,23 +308,152 @@ def parse_demo(demo_path):
                     else:
                         end_reason = "Terroristas Eliminados"
 
-                # Duração baseada em ticks
-                duration_seconds = max(0, int((tick_val - last_end_tick) / tickrate)) if tickrate else 0
+                # Duração ao vivo: do último round_freeze_end do round até o round_end
+                # (sem o freeze time e sem o intervalo pós-round do round anterior)
+                live_start = last_end_tick
+                if len(freeze_end_ticks_sorted):
+                    pos = np.searchsorted(freeze_end_ticks_sorted, tick_val, side='right') - 1
+                    if pos >= 0 and freeze_end_ticks_sorted[pos] > last_end_tick:
+                        live_start = int(freeze_end_ticks_sorted[pos])
+                duration_seconds = max(0, int((tick_val - live_start) / tickrate)) if tickrate else 0
                 duration_str = f"{duration_seconds//60}:{(duration_seconds%60):02d}"
                 last_end_tick = tick_val
+                round_end_ticks.append(tick_val)
 
                 rounds_data.append({
                     "number": round_number_counter,
+                    "endTick": int(tick_val),
                     "winnerSide": winner_side,
                     "endReason": end_reason,
                     "duration": duration_str,
                     "bombPlanted": bomb_planted,
+                    "bombDefused": bomb_defused,
                     "totalKills": int(total_kills),
                     "firstKillSide": first_kill_side
                 })
 
                 round_number_counter += 1
 
+        # Etapas de análise opcionais: se uma delas falhar (demo truncada/corrompida),
+        # o resultado segue com os rounds completos e é marcado como parcial
+        players_data = []
+        bomb_sites = {}
+        kill_pools = None
+        partial_reasons = []
+        for failure in event_failures:
+            print(f"⚠️  Falha ao extrair evento {failure} - seguindo com dados parciais", file=sys.stderr)
+            partial_reasons.append(f"Evento {failure}")
+
+        def run_step(label, step):
+            try:
+                return step()
+            except Exception as e:
+                print(f"⚠️  Etapa '{label}' falhou: {e} - seguindo com dados parciais", file=sys.stderr)
+                partial_reasons.append(f"{label}: {e}")
+                return None
+
+        if rounds_data and light:
+            # Mesmo critério do openingDuel do parse completo (primeiro kill em
+            # adversário): o follow não vê o round mudar quando o parse completo roda
+            freeze_ticks = freeze_end_df['tick'].to_numpy() if 'tick' in freeze_end_df.columns else None
+            sides = run_step("openings", lambda: opening_sides(kills_df, round_end_ticks, freeze_ticks))
+            for round_info, side in zip(rounds_data, sides or []):
+                if side in ("CT", "T"):
+                    round_info["firstKillSide"] = side
+
+        if rounds_data and not light:
+            winners = [r['winnerSide'] for r in rounds_data]
+            freeze_ticks = freeze_end_df['tick'].to_numpy() if 'tick' in freeze_end_df.columns else None
+
+            # Trades, clutches, multi-kills e opening duels a partir do kill feed
+            print("🎯 Analisando trades, clutches e multi-kills...", file=sys.stderr)
+            kill_analysis = run_step("kills", lambda: analyze_kills(
+                kills_df,
+                round_end_ticks,
+                winners,
+                tickrate=tickrate,
+                freeze_end_ticks=freeze_ticks,
+            ))
+            if kill_analysis:
+                for round_info, extra in zip(rounds_data, kill_analysis["rounds"]):
+                    round_info.update(extra)
+                    if extra["openingDuel"] and extra["openingDuel"]["side"] in ("CT", "T"):
+                        round_info["firstKillSide"] = extra["openingDuel"]["side"]
+                players_data = kill_analysis["players"]
+                kill_pools = kill_analysis["pools"]
+
+            # Dano em adversários (player_hurt) e ADR por jogador
+            damage = run_step("damage", lambda: aggregate_damage(
+                utility_frames.get("player_hurt"),
+                round_end_ticks,
+                round_windows(round_end_ticks, freeze_ticks),
+            ))
+            for player in players_data if damage is not None else []:
+                player["damage"] = damage.get(player["steamid"], 0)
+                player["adr"] = round(player["damage"] / len(rounds_data), 1)
+
+            print("🧨 Agregando utilitários por round e lado...", file=sys.stderr)
+            utility_summary = run_step("utility", lambda: analyze_utility(utility_frames, round_end_ticks, freeze_ticks))
+            for round_info, utility in zip(rounds_data, utility_summary or []):
+                round_info["utility"] = utility
+
+            print("💣 Analisando plants, pós-plant e retakes...", file=sys.stderr)
+            bomb_analysis = run_step("bomb", lambda: analyze_bombs(
+                bomb_frames,
+                round_end_ticks,
+                winners,
+                tickrate=tickrate,
+                freeze_end_ticks=freeze_ticks,
+            ))
+            if bomb_analysis:
+                for round_info, bomb in zip(rounds_data, bomb_analysis["rounds"]):
+                    round_info["bomb"] = bomb
+                    if bomb:
+                        round_info["bombPlanted"] = True
+                        round_info["bombDefused"] = round_info["bombDefused"] or bomb["defused"]
+                bomb_sites = bomb_analysis["sites"]
+
+            # Timeline compacta (fases + kills/plant/defuse ordenados, delta-codificados)
+            print("🕒 Montando timeline de cada round...", file=sys.stderr)
+            timelines = run_step("timeline", lambda: build_timelines(
+                round_end_ticks,
+                round_windows(round_end_ticks, freeze_ticks),
+                {"player_death": kills_df, **bomb_frames},
+                official_end_df,
+            ))
+            for round_info, timeline in zip(rounds_data, timelines or []):
+                round_info["timeline"] = timeline
+
+            # Uma única amostragem esparsa de parse_ticks nos ticks de fim de round
+            print("🩸 Amostrando sobreviventes no fim de cada round...", file=sys.stderr)
+            roster = {}
+            survivors = run_step("survivors", lambda: sample_survivors(parser, round_end_ticks, roster))
+            for round_info, round_survivors in zip(rounds_data, survivors or []):
+                round_info["survivors"] = round_survivors
+
+            # Lado inicial (team_num) de cada jogador, inclusive quem não matou nem morreu
+            for player in players_data:
+                sides = roster.pop(player["steamid"], None)
+                if sides:
+                    player.update({key: sides[key] for key in ("startSide", "ctRounds", "tRounds")})
+            for steamid, sides in roster.items():
+                player = empty_player(steamid, sides["name"])
+                player.update({key: sides[key] for key in ("startSide", "ctRounds", "tRounds")})
+                if damage is not None:
+                    player["damage"] = damage.get(steamid, 0)
+                    player["adr"] = round(player["damage"] / len(rounds_data), 1)
+                players_data.append(player)
+
+            # Economia por lado no início ao vivo de cada round (equipamento comprado)
+            print("💰 Amostrando economia no início de cada round...", file=sys.stderr)
+            economy = run_step("economy", lambda: sample_economy(parser, round_windows(round_end_ticks, freeze_ticks)))
+            for round_info, round_economy in zip(rounds_data, economy or []):
+                round_info["economy"] = round_economy
+
+        if rounds_data and not match_finished(rounds_data):
+            print("⚠️  Nenhum time fechou a partida - demo possivelmente truncada", file=sys.stderr)
+            partial_reasons.append("Partida incompleta: rounds até o último round_end completo")
+
         # Calcular scores finais por lado
         ct_score = len([r for r in rounds_data if r['winnerSide'] == 'CT'])
         t_score = len([r for r in rounds_data if r['winnerSide'] == 'T'])
@@ -345,6 +494,37 @@ def parse_demo(demo_path):
                         ot_ct_wins += 1
             print(f"📊 Overtime (por lado): T={ot_t_wins}, CT={ot_ct_wins}", file=sys.stderr)
         
+        # Verificar placar calculado contra o placar do próprio jogo
+        verification = {"ok": None, "checks": [], "halves": {}}
+        if not light:
+            print("🔎 Verificando placar com as props de time do jogo...", file=sys.stderr)
+            verification = run_step("verification", lambda: verify_scores(parser, rounds_data, round_end_ticks, tickrate)) or verification
+        corrected = []
+        if verification["ok"] is False:
+            for check in verification["checks"]:
+                if check["ok"] is False:
+                    print(f"⚠️  Placar divergente ({check['label']}, round {check['round']}): "
+                          f"calculado {check['expected']} x jogo {check['game']}", file=sys.stderr)
+            # Auto-correção das parciais quando o jogo fornece os valores do intervalo/fim real
+            halves = verification["halves"]
+            current = {
+                "first_half_ct": first_half_ct,
+                "first_half_t": first_half_t,
+                "second_half_ct": second_half_ct,
+                "second_half_t": second_half_t,
+            }
+            for key, value in halves.items():
+                if current[key] != value:
+                    print(f"🔧 Corrigindo {key}: {current[key]} → {value}", file=sys.stderr)
+                    current[key] = value
+                    corrected.append(key)
+            first_half_ct = current["first_half_ct"]
+            first_half_t = current["first_half_t"]
+            second_half_ct = current["second_half_ct"]
+            second_half_t = current["second_half_t"]
+        elif verification["ok"]:
+            print("✅ Placar confere com o jogo", file=sys.stderr)
+
         # Debug: mostrar vencedores de cada round
         print(f"🔍 Detalhamento de rounds:", file=sys.stderr)
         for r in rounds_data:
@@ -375,7 +555,17 @@ def parse_demo(demo_path):
                 }
             },
             "rounds": rounds_data,
-            "players": [],
+            "players": players_data,
+            "bombSites": bomb_sites,
+            "killFeedPools": kill_pools,
+            "partial": bool(partial_reasons),
+            "partialReasons": partial_reasons,
+            "removedRoundEnds": removed_round_ends,
+            "scoreVerification": {
+                "ok": verification["ok"],
+                "checks": verification["checks"],
+                "corrected": corrected,
+            },
             "duration": f"{len(rounds_data) * 2}m",
             "tickrate": header.get('tickrate', 64),
             # Valores brutos para cálculo no main()
@@ -398,195 +588,237 @@ def parse_demo(demo_path):
         raise
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "Uso: python parse_demo.py <arquivo.dem> [nome_original.dem]"}), file=sys.stderr)
-        sys.exit(1)
-
-    demo_path = sys.argv[1]
-    original_filename = sys.argv[2] if len(sys.argv) > 2 else None
-
-    try:
-        # Carregar config se existir
-        config = load_config_file(demo_path)
-        
-        result = parse_demo(demo_path)
-
-        # Se foi passado nome original, usar para extrair times
-        filename_to_parse = original_filename if original_filename else Path(demo_path).name
-
-        # Prioridade: Config > Filename > Padrão
-        team_a_name = None
-        team_b_name = None
-        team_a_side = None
-        team_b_side = None
-
-        # Primeiro: tentar carregar do arquivo config
-        if config:
-            team_a_name = config.get("teamA")
-            team_b_name = config.get("teamB")
-            team_a_side = config.get("teamA_side")
-            team_b_side = config.get("teamB_side")
-            print(f"📋 Usando dados do arquivo config:", file=sys.stderr)
-            print(f"   Team A: {team_a_name} ({team_a_side})", file=sys.stderr)
-            print(f"   Team B: {team_b_name} ({team_b_side})", file=sys.stderr)
-
-        # Segundo: extrair do filename se config não forneceu
-        if not (team_a_name and team_b_name and team_a_side and team_b_side):
-            if '-vs-' in filename_to_parse.lower():
-                parts = filename_to_parse.lower().split('-vs-')
-                team_a_part = parts[0].strip()
-                # Team B: pegar tudo depois de -vs- até a primeira indicação de mapa (-mX- ou .dem)
-                team_b_full = parts[1].strip() if len(parts) > 1 else ""
-                
-                # Remover sufixo de mapa (tipo -m2-overpass.dem)
-                if '-m' in team_b_full:
-                    team_b_part = team_b_full.split('-m')[0].strip()
-                elif '.dem' in team_b_full:
-                    team_b_part = team_b_full.split('.dem')[0].strip()
-                else:
-                    team_b_part = team_b_full
-                
-                print(f"🔍 Extraindo dados do filename: {filename_to_parse}", file=sys.stderr)
-                print(f"   team_a_part: '{team_a_part}'", file=sys.stderr)
-                print(f"   team_b_part: '{team_b_part}'", file=sys.stderr)
-                
-                # Tentar extrair lado e nome
-                if not team_a_name:
-                    if '-ct' in team_a_part:
-                        if not team_a_side:
-                            team_a_side = "CT"
-                        team_a_name = team_a_part.replace('-ct', '').strip().title()
-                    elif team_a_part.endswith('-t'):
-                        if not team_a_side:
-                            team_a_side = "T"
-                        team_a_name = team_a_part[:-2].strip().title()
-                    else:
-                        team_a_name = team_a_part.replace('-', ' ').strip().title()
-                
-                if not team_b_name:
-                    if '-ct' in team_b_part:
-                        if not team_b_side:
-                            team_b_side = "CT"
-                        team_b_name = team_b_part.replace('-ct', '').strip().title()
-                    elif team_b_part.endswith('-t'):
-                        if not team_b_side:
-                            team_b_side = "T"
-                        team_b_name = team_b_part[:-2].strip().title()
-                    else:
-                        team_b_name = team_b_part.replace('-', ' ').strip().title()
-        
-        # Aplicar valores extraídos
-        if team_a_name:
-            result["teamA"]["name"] = team_a_name
-        if team_b_name:
-            result["teamB"]["name"] = team_b_name
+def build_match_result(demo_path, original_filename=None, light=False):
+    """
+    Executa parse_demo e resolve nomes, lados e scores finais dos times
+    (config .config.json > nome do arquivo > padrão)
+    
+    Args:
+        demo_path: Caminho para o arquivo .dem
+        original_filename: Nome original do arquivo (upload), usado para extrair os times
+        light: Repassado para parse_demo (apenas rounds/placar)
         
-        # CORREÇÃO PRINCIPAL: Calcular scores finais de forma correta
-        if team_a_side and team_b_side:
-            print(f"📝 Lados confirmados - Team A: {team_a_side}, Team B: {team_b_side}", file=sys.stderr)
-            
-            raw = result.get("_raw", {})
-            first_half_t = raw.get("first_half_t", 0)
-            first_half_ct = raw.get("first_half_ct", 0)
-            second_half_t = raw.get("second_half_t", 0)
-            second_half_ct = raw.get("second_half_ct", 0)
-            ot_t_wins = raw.get("ot_t_wins", 0)
-            ot_ct_wins = raw.get("ot_ct_wins", 0)
-            
-            # Calcular a parcial do OT por time (baseado em swaps de lado a cada 3 rounds)
-            team_a_ot = 0
-            team_b_ot = 0
-            
-            if ot_t_wins + ot_ct_wins > 0:
-                # Loop através dos rounds de OT
-                for r in result["rounds"]:
-                    if r['number'] >= 25:
-                        ot_round_index = r['number'] - 25
-                        ot_period = ot_round_index // 3
-                        sides_swapped = (ot_period % 2 == 1)
-                        
-                        if team_a_side == "T":
-                            # Team A começou como T
-                            # Períodos pares (0, 2, 4...): Team A = T, Team B = CT
-                            # Períodos ímpares (1, 3, 5...): Team A = CT, Team B = T
-                            if not sides_swapped:  # Período par
-                                if r['winnerSide'] == 'T':
-                                    team_a_ot += 1
-                                else:
-                                    team_b_ot += 1
-                            else:  # Período ímpar
-                                if r['winnerSide'] == 'CT':
-                                    team_a_ot += 1
-                                else:
-                                    team_b_ot += 1
-                        else:
-                            # Team A começou como CT
-                            # Períodos pares (0, 2, 4...): Team A = CT, Team B = T
-                            # Períodos ímpares (1, 3, 5...): Team A = T, Team B = CT
-                            if not sides_swapped:  # Período par
-                                if r['winnerSide'] == 'CT':
-                                    team_a_ot += 1
-                                else:
-                                    team_b_ot += 1
-                            else:  # Período ímpar
-                                if r['winnerSide'] == 'T':
-                                    team_a_ot += 1
-                                else:
-                                    team_b_ot += 1
+    Returns:
+        dict: Resultado final da partida (mesmo JSON impresso pelo script)
+    """
+    # Carregar config se existir
+    config = load_config_file(demo_path)
+    
+    result = parse_demo(demo_path, light=light)
+
+    # Se foi passado nome original, usar para extrair times
+    filename_to_parse = original_filename if original_filename else Path(demo_path).name
+
+    # Prioridade: Config > Filename > Padrão
+    team_a_name = None
+    team_b_name = None
+    team_a_side = None
+    team_b_side = None
+
+    # Primeiro: tentar carregar do arquivo config
+    if config:
+        team_a_name = config.get("teamA")
+        team_b_name = config.get("teamB")
+        team_a_side = config.get("teamA_side")
+        team_b_side = config.get("teamB_side")
+        print(f"📋 Usando dados do arquivo config:", file=sys.stderr)
+        print(f"   Team A: {team_a_name} ({team_a_side})", file=sys.stderr)
+        print(f"   Team B: {team_b_name} ({team_b_side})", file=sys.stderr)
+
+    # Segundo: extrair do filename se config não forneceu
+    if not (team_a_name and team_b_name and team_a_side and team_b_side):
+        if '-vs-' in filename_to_parse.lower():
+            parts = filename_to_parse.lower().split('-vs-')
+            team_a_part = parts[0].strip()
+            # Team B: pegar tudo depois de -vs- até a primeira indicação de mapa (-mX- ou .dem)
+            team_b_full = parts[1].strip() if len(parts) > 1 else ""
             
-            # Calcular scores finais: SOMA SIMPLES DAS PARCIAIS
-            if team_a_side == "T":
-                # Team A começou como T
-                team_a_first = first_half_t
-                team_a_second = second_half_ct  # Lados trocam no 2º tempo
-                team_b_first = first_half_ct
-                team_b_second = second_half_t
+            # Remover sufixo de mapa (tipo -m2-overpass.dem)
+            if '-m' in team_b_full:
+                team_b_part = team_b_full.split('-m')[0].strip()
+            elif '.dem' in team_b_full:
+                team_b_part = team_b_full.split('.dem')[0].strip()
             else:
-                # Team A começou como CT
-                team_a_first = first_half_ct
-                team_a_second = second_half_t  # Lados trocam no 2º tempo
-                team_b_first = first_half_t
-                team_b_second = second_half_ct
-            
-            team_a_score = team_a_first + team_a_second + team_a_ot
-            team_b_score = team_b_first + team_b_second + team_b_ot
-            
-            result["teamA"]["score"] = team_a_score
-            result["teamB"]["score"] = team_b_score
-            result["teamA"]["side"] = team_a_side
-            result["teamB"]["side"] = team_b_side
+                team_b_part = team_b_full
             
-            result["teamA"]["halfScores"]["firstHalf"] = team_a_first
-            result["teamA"]["halfScores"]["secondHalf"] = team_a_second
-            result["teamA"]["halfScores"]["overtime"] = team_a_ot
+            print(f"🔍 Extraindo dados do filename: {filename_to_parse}", file=sys.stderr)
+            print(f"   team_a_part: '{team_a_part}'", file=sys.stderr)
+            print(f"   team_b_part: '{team_b_part}'", file=sys.stderr)
             
-            result["teamB"]["halfScores"]["firstHalf"] = team_b_first
-            result["teamB"]["halfScores"]["secondHalf"] = team_b_second
-            result["teamB"]["halfScores"]["overtime"] = team_b_ot
+            # Tentar extrair lado e nome
+            if not team_a_name:
+                if '-ct' in team_a_part:
+                    if not team_a_side:
+                        team_a_side = "CT"
+                    team_a_name = team_a_part.replace('-ct', '').strip().title()
+                elif team_a_part.endswith('-t'):
+                    if not team_a_side:
+                        team_a_side = "T"
+                    team_a_name = team_a_part[:-2].strip().title()
+                else:
+                    team_a_name = team_a_part.replace('-', ' ').strip().title()
             
-            print(f"📊 Cálculo de scores:", file=sys.stderr)
-            print(f"   Team A ({team_a_side}):", file=sys.stderr)
-            print(f"      1º tempo: {team_a_first}", file=sys.stderr)
-            print(f"      2º tempo: {team_a_second}", file=sys.stderr)
-            if team_a_ot > 0:
-                print(f"      OT: {team_a_ot}", file=sys.stderr)
-            print(f"      TOTAL: {team_a_score}", file=sys.stderr)
-            print(f"   Team B ({team_b_side}):", file=sys.stderr)
-            print(f"      1º tempo: {team_b_first}", file=sys.stderr)
-            print(f"      2º tempo: {team_b_second}", file=sys.stderr)
-            if team_b_ot > 0:
-                print(f"      OT: {team_b_ot}", file=sys.stderr)
-            print(f"      TOTAL: {team_b_score}", file=sys.stderr)
+            if not team_b_name:
+                if '-ct' in team_b_part:
+                    if not team_b_side:
+                        team_b_side = "CT"
+                    team_b_name = team_b_part.replace('-ct', '').strip().title()
+                elif team_b_part.endswith('-t'):
+                    if not team_b_side:
+                        team_b_side = "T"
+                    team_b_name = team_b_part[:-2].strip().title()
+                else:
+                    team_b_name = team_b_part.replace('-', ' ').strip().title()
+    
+    # Aplicar valores extraídos
+    if team_a_name:
+        result["teamA"]["name"] = team_a_name
+    if team_b_name:
+        result["teamB"]["name"] = team_b_name
+
+    # Unificar grafias ("imperial-esports", "Imperial E" -> "Imperial") pelo registro de aliases
+    try:
+        for old_name, new_name in TeamAliasRegistry().resolve_result(result):
+            print(f"🏷️  Time resolvido: {old_name} → {new_name}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Registro de aliases indisponível: {e}", file=sys.stderr)
+    
+    # CORREÇÃO PRINCIPAL: Calcular scores finais de forma correta
+    if team_a_side and team_b_side:
+        print(f"📝 Lados confirmados - Team A: {team_a_side}, Team B: {team_b_side}", file=sys.stderr)
+        
+        raw = result.get("_raw", {})
+        first_half_t = raw.get("first_half_t", 0)
+        first_half_ct = raw.get("first_half_ct", 0)
+        second_half_t = raw.get("second_half_t", 0)
+        second_half_ct = raw.get("second_half_ct", 0)
+        ot_t_wins = raw.get("ot_t_wins", 0)
+        ot_ct_wins = raw.get("ot_ct_wins", 0)
+        
+        # Calcular a parcial do OT por time (baseado em swaps de lado a cada 3 rounds)
+        team_a_ot = 0
+        team_b_ot = 0
+        
+        if ot_t_wins + ot_ct_wins > 0:
+            # Loop através dos rounds de OT
+            for r in result["rounds"]:
+                if r['number'] >= 25:
+                    ot_round_index = r['number'] - 25
+                    ot_period = ot_round_index // 3
+                    sides_swapped = (ot_period % 2 == 1)
+                    
+                    if team_a_side == "T":
+                        # Team A começou como T
+                        # Períodos pares (0, 2, 4...): Team A = T, Team B = CT
+                        # Períodos ímpares (1, 3, 5...): Team A = CT, Team B = T
+                        if not sides_swapped:  # Período par
+                            if r['winnerSide'] == 'T':
+                                team_a_ot += 1
+                            else:
+                                team_b_ot += 1
+                        else:  # Período ímpar
+                            if r['winnerSide'] == 'CT':
+                                team_a_ot += 1
+                            else:
+                                team_b_ot += 1
+                    else:
+                        # Team A começou como CT
+                        # Períodos pares (0, 2, 4...): Team A = CT, Team B = T
+                        # Períodos ímpares (1, 3, 5...): Team A = T, Team B = CT
+                        if not sides_swapped:  # Período par
+                            if r['winnerSide'] == 'CT':
+                                team_a_ot += 1
+                            else:
+                                team_b_ot += 1
+                        else:  # Período ímpar
+                            if r['winnerSide'] == 'T':
+                                team_a_ot += 1
+                            else:
+                                team_b_ot += 1
+        
+        # Calcular scores finais: SOMA SIMPLES DAS PARCIAIS
+        if team_a_side == "T":
+            # Team A começou como T
+            team_a_first = first_half_t
+            team_a_second = second_half_ct  # Lados trocam no 2º tempo
+            team_b_first = first_half_ct
+            team_b_second = second_half_t
         else:
-            print(f"⚠️  Lados não especificados - usando padrão", file=sys.stderr)
-            result["teamA"]["side"] = "CT"
-            result["teamB"]["side"] = "T"
+            # Team A começou como CT
+            team_a_first = first_half_ct
+            team_a_second = second_half_t  # Lados trocam no 2º tempo
+            team_b_first = first_half_t
+            team_b_second = second_half_ct
+        
+        team_a_score = team_a_first + team_a_second + team_a_ot
+        team_b_score = team_b_first + team_b_second + team_b_ot
         
-        if "_raw" in result:
-            del result["_raw"]
+        result["teamA"]["score"] = team_a_score
+        result["teamB"]["score"] = team_b_score
+        result["teamA"]["side"] = team_a_side
+        result["teamB"]["side"] = team_b_side
         
-        print(f"📝 Resultado final: {result['teamA']['name']} ({result['teamA']['side']}) {result['teamA']['score']} x {result['teamB']['score']} {result['teamB']['name']} ({result['teamB']['side']})", file=sys.stderr)
+        result["teamA"]["halfScores"]["firstHalf"] = team_a_first
+        result["teamA"]["halfScores"]["secondHalf"] = team_a_second
+        result["teamA"]["halfScores"]["overtime"] = team_a_ot
+        
+        result["teamB"]["halfScores"]["firstHalf"] = team_b_first
+        result["teamB"]["halfScores"]["secondHalf"] = team_b_second
+        result["teamB"]["halfScores"]["overtime"] = team_b_ot
+        
+        print(f"📊 Cálculo de scores:", file=sys.stderr)
+        print(f"   Team A ({team_a_side}):", file=sys.stderr)
+        print(f"      1º tempo: {team_a_first}", file=sys.stderr)
+        print(f"      2º tempo: {team_a_second}", file=sys.stderr)
+        if team_a_ot > 0:
+            print(f"      OT: {team_a_ot}", file=sys.stderr)
+        print(f"      TOTAL: {team_a_score}", file=sys.stderr)
+        print(f"   Team B ({team_b_side}):", file=sys.stderr)
+        print(f"      1º tempo: {team_b_first}", file=sys.stderr)
+        print(f"      2º tempo: {team_b_second}", file=sys.stderr)
+        if team_b_ot > 0:
+            print(f"      OT: {team_b_ot}", file=sys.stderr)
+        print(f"      TOTAL: {team_b_score}", file=sys.stderr)
+    else:
+        print(f"⚠️  Lados não especificados - usando padrão", file=sys.stderr)
+        result["teamA"]["side"] = "CT"
+        result["teamB"]["side"] = "T"
+    
+    if "_raw" in result:
+        del result["_raw"]
+    
+    print(f"📝 Resultado final: {result['teamA']['name']} ({result['teamA']['side']}) {result['teamA']['score']} x {result['teamB']['score']} {result['teamB']['name']} ({result['teamB']['side']})", file=sys.stderr)
+
+    return result
+
+
+
+if __name__ == "__main__":
+    # --spool <dir>: roda como worker(s) de um diretório de spool (spool_worker.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "--spool":
+        from spool_worker import main as spool_main
+        spool_main(sys.argv[2:])
+        sys.exit(0)
+
+    # --series <demos...>: agrupa mapas de uma série e parseia em paralelo (series_ingest.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "--series":
+        from series_ingest import main as series_main
+        series_main(sys.argv[2:])
+        sys.exit(0)
+
+    # --light: apenas rounds/placar (fallback do parse_watchdog.py)
+    light_mode = "--light" in sys.argv
+    cli_args = [arg for arg in sys.argv[1:] if arg != "--light"]
+
+    if len(cli_args) < 1:
+        print(json.dumps({"error": "Uso: python parse_demo.py <arquivo.dem> [nome_original.dem] [--light] | --spool <dir> [--workers N] | --series <pasta>"}), file=sys.stderr)
+        sys.exit(1)
+
+    demo_path = cli_args[0]
+    original_filename = cli_args[1] if len(cli_args) > 1 else None
+
+    try:
+        result = build_match_result(demo_path, original_filename, light=light_mode)
 
         print(json.dumps(result, ensure_ascii=False))
         sys.exit(0)
@@ -594,6 +826,7 @@ if __name__ == "__main__":
     except Exception as e:
         error_data = {
             "error": "Erro ao processar demo",
+            "type": type(e).__name__,
             "details": str(e)
         }
         print(json.dumps(error_data), file=sys.stderr)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Métricas operacionais do parser no formato de exposição texto do Prometheus
+Registro em memória (contadores, gauges e histogramas) com dump em arquivo
+e endpoint HTTP /metrics opcional
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+METRICS_FILE = os.environ.get("PARSE_METRICS_FILE", str(BACKEND_DIR / "parse_metrics.prom"))
+METRICS_PORT = os.environ.get("PARSE_METRICS_PORT")
+DUMP_SECONDS = 15.0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None, const=None):
+    pairs = list((const or {}).items()) + list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self, const=None):
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key, const=const)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self, const=None):
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, dict(state, counts=list(state["counts"]))) for key, state in self._values.items())
+        for key, state in items:
+            for bound, count in zip(self.buckets, state["counts"]):
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)), const)
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            base = _format_labels(self.label_names, key, const=const)
+            lines.append(f"{self.name}_sum{base} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{base} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas do processo, renderizado no formato texto do Prometheus
+
+    const_labels são adicionados a todas as séries (ex.: worker=..., para que
+    dumps de vários processos não colidam no textfile collector)
+    """
+
+    def __init__(self, const_labels=None):
+        self._metrics = []
+        self.const_labels = dict(const_labels or {})
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, buckets, labels=()):
+        return self.register(Histogram(name, help_text, buckets, labels))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(self.const_labels))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Grava a exposição num arquivo (atômico), para o server.js ou node_exporter
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Sobe GET /metrics numa thread daemon
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, int(port)), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+DEMOS_PARSED = REGISTRY.counter(
+    "cs2_demos_parsed_total", "Demos processadas com sucesso", labels=("partial",))
+PARSE_FAILURES = REGISTRY.counter(
+    "cs2_parse_failures_total", "Falhas de parsing por tipo de exceção", labels=("error_type",))
+PARSE_DURATION = REGISTRY.histogram(
+    "cs2_parse_duration_seconds", "Duração do parse de uma demo",
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600))
+DEMO_SIZE = REGISTRY.histogram(
+    "cs2_demo_size_bytes", "Tamanho das demos processadas",
+    buckets=tuple(mb * 1024 * 1024 for mb in (25, 50, 100, 200, 300, 500, 750, 1000)))
+ROUNDS_PARSED = REGISTRY.counter(
+    "cs2_rounds_parsed_total", "Rounds extraídos")
+ROUNDS_PER_SECOND = REGISTRY.gauge(
+    "cs2_parse_rounds_per_second", "Rounds por segundo no último parse")
+CACHE_REQUESTS = REGISTRY.counter(
+    "cs2_parse_cache_requests_total", "Consultas ao cache de resultados por hash", labels=("result",))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "cs2_parse_cache_hit_ratio", "Fração de demos servidas do cache")
+QUEUE_DEPTH = REGISTRY.gauge(
+    "cs2_parse_queue_depth", "Jobs aguardando na fila de parsing")
+LAST_SUCCESS = REGISTRY.gauge(
+    "cs2_parse_last_success_timestamp_seconds", "Horário (epoch) do último parse bem-sucedido")
+
+
+def observe_parse(duration, size_bytes=None, rounds=None, error_type=None, partial=False):
+    """
+    Registra o resultado de um parse (sucesso ou falha)
+    """
+    PARSE_DURATION.observe(duration)
+    if size_bytes is not None:
+        DEMO_SIZE.observe(size_bytes)
+    if error_type:
+        PARSE_FAILURES.inc(error_type=error_type)
+        return
+    DEMOS_PARSED.inc(partial=str(bool(partial)).lower())
+    LAST_SUCCESS.set(time.time())
+    if rounds:
+        ROUNDS_PARSED.inc(rounds)
+        if duration > 0:
+            ROUNDS_PER_SECOND.set(rounds / duration)
+
+
+def result_partial(result):
+    """
+    Resultado parcial pelo próprio JSON (partial ou partialReasons do parse_demo)
+    """
+    return isinstance(result, dict) and bool(result.get("partial") or result.get("partialReasons"))
+
+
+def observe_cache(hit):
+    CACHE_REQUESTS.inc(result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.value(result="hit")
+    total = hits + CACHE_REQUESTS.value(result="miss")
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0)
+
+
+def _error_type(run):
+    """
+    Tipo de falha de uma execução supervisionada: motivo do watchdog, tipo da
+    exceção reportado pelo parse_demo.py ou código de saída
+    """
+    if run.get("reason"):
+        return f"budget_{run['reason']}"
+    for line in reversed(run.get("stderr", "").splitlines()):
+        if line.startswith("{"):
+            try:
+                error = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(error, dict) and error.get("type"):
+                return error["type"]
+    return f"exit_{run.get('returncode')}"
+
+
+def observe_run(run, demo_path):
+    """
+    Registra uma execução do parse_with_budget (fila e spool)
+    """
+    try:
+        size = os.path.getsize(demo_path)
+    except OSError:
+        size = None
+    if run["returncode"] != 0:
+        observe_parse(run["elapsed"], size, error_type=_error_type(run))
+        return
+    try:
+        result = json.loads(run["stdout"])
+        rounds = len(result.get("rounds", []))
+    except (ValueError, AttributeError):
+        result, rounds = None, None
+    # Parcial pelo fallback do watchdog ou pelo próprio resultado (ex.: eventos que falharam)
+    observe_parse(run["elapsed"], size, rounds, partial=run.get("partial") or result_partial(result))
+
+
+def start_exporters(metrics_file=METRICS_FILE, port=METRICS_PORT, interval=DUMP_SECONDS):
+    """
+    Liga o dump periódico em arquivo e, se PARSE_METRICS_PORT estiver definido, o endpoint HTTP
+    """
+    if port:
+        REGISTRY.serve(port)
+    if metrics_file:
+        def loop():
+            while True:
+                try:
+                    REGISTRY.dump(metrics_file)
+                except OSError as e:
+                    print(f"⚠️  Não foi possível gravar métricas em {metrics_file}: {e}", file=sys.stderr)
+                time.sleep(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Fila persistente de jobs de parsing (SQLite em disco local)
+Limita quantos parse_demo.py rodam ao mesmo tempo, com prioridade e retry com backoff
+(cada job roda sob o parse_watchdog.py, com limites de tempo e memória)
+
+Uso:
+  python parse_queue.py worker [--workers N]
+  python parse_queue.py submit <arquivo.dem> [nome_original.dem] [--priority N] [--wait] [--cleanup]
+  python parse_queue.py wait <job_id> [--timeout S]
+  python parse_queue.py status <job_id> [--result]
+  python parse_queue.py metrics
+"""
+
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import parse_metrics
+from parse_watchdog import parse_with_budget
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_DB = os.environ.get("PARSE_QUEUE_DB", str(BACKEND_DIR / "parse_queue.db"))
+DEFAULT_WORKERS = int(os.environ.get("PARSE_WORKERS", "1"))
+MAX_ATTEMPTS = int(os.environ.get("PARSE_MAX_ATTEMPTS", "3"))
+BACKOFF_SECONDS = float(os.environ.get("PARSE_BACKOFF_SECONDS", "5"))
+# Job "running" sem heartbeat por mais que isso é considerado de um worker morto
+LEASE_SECONDS = float(os.environ.get("PARSE_LEASE_SECONDS", "60"))
+HEARTBEAT_SECONDS = 5.0
+POLL_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    demo_path TEXT NOT NULL,
+    original_name TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_run_at REAL NOT NULL DEFAULT 0,
+    heartbeat_at REAL,
+    worker TEXT,
+    cleanup INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, id);
+"""
+# Colunas adicionadas depois da criação da tabela (bancos antigos)
+MIGRATIONS = {
+    "cleanup": "ALTER TABLE jobs ADD COLUMN cleanup INTEGER NOT NULL DEFAULT 0",
+}
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class ParseQueue:
+    """
+    Acesso à fila de jobs no SQLite (uma conexão por thread)
+    """
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = db_path
+        with self._session() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _session(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, demo_path, original_name=None, priority=0, cleanup=False):
+        """
+        Enfileira um parse; com cleanup a demo é apagada quando o job termina (done/failed)
+        """
+        with self._session() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (demo_path, original_name, priority, cleanup, created_at) VALUES (?, ?, ?, ?, ?)",
+                (str(demo_path), original_name, int(priority), int(bool(cleanup)), time.time()),
+            )
+            return cur.lastrowid
+
+    def get(self, job_id):
+        with self._session() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def position(self, job_id):
+        """
+        Posição na fila (0 = próximo a ser executado)
+        """
+        with self._session() as conn:
+            job = conn.execute("SELECT priority, id, status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not job or job["status"] != "queued":
+                return None
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND (priority > ? OR (priority = ? AND id < ?))",
+                (job["priority"], job["priority"], job["id"]),
+            ).fetchone()
+        return row[0]
+
+    def depth(self):
+        with self._session() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim(self, worker):
+        """
+        Reserva atomicamente o próximo job (maior prioridade, mais antigo)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND next_run_at <= ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            job = dict(row)
+            job["attempts"] += 1
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # Atualizações de um job em execução só valem para o worker que o reservou:
+    # um worker atrasado não sobrescreve um job devolvido à fila ou já concluído
+    OWNED = "id = ? AND status = 'running' AND worker IS ?"
+
+    def heartbeat(self, job_id, worker):
+        """
+        Returns:
+            False se o job não é mais deste worker (devolvido à fila por falta de heartbeat)
+        """
+        with self._session() as conn:
+            cur = conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE {self.OWNED}", (time.time(), job_id, worker))
+            return cur.rowcount > 0
+
+    def complete(self, job_id, result, worker):
+        with self._session() as conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? WHERE {self.OWNED}",
+                (result, time.time(), job_id, worker),
+            )
+            return cur.rowcount > 0
+
+    def fail(self, job_id, error, attempts, worker, retryable=True, stale_before=None):
+        """
+        Registra falha; reagenda com backoff exponencial enquanto houver tentativas
+
+        Args:
+            stale_before: só aplica se o último heartbeat for anterior a este instante
+
+        Returns:
+            "queued", "failed" ou None se o job não é mais deste worker
+        """
+        now = time.time()
+        guard = self.OWNED
+        params = [job_id, worker]
+        if stale_before is not None:
+            guard += " AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+            params.append(stale_before)
+        with self._session() as conn:
+            if retryable and attempts < MAX_ATTEMPTS:
+                delay = BACKOFF_SECONDS * (2 ** (attempts - 1))
+                cur = conn.execute(
+                    f"UPDATE jobs SET status = 'queued', error = ?, worker = NULL, next_run_at = ? WHERE {guard}",
+                    [error, now + delay] + params,
+                )
+                return "queued" if cur.rowcount else None
+            cur = conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE {guard}",
+                [error, now] + params,
+            )
+            return "failed" if cur.rowcount else None
+
+    def release(self, job_id, worker):
+        """
+        Devolve um job interrompido pelo próprio worker (desligamento), sem gastar tentativa
+        """
+        with self._session() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, attempts = MAX(attempts - 1, 0), "
+                f"next_run_at = ? WHERE {self.OWNED}",
+                (time.time(), job_id, worker),
+            )
+            return cur.rowcount > 0
+
+    def requeue_stale(self, lease_seconds=LEASE_SECONDS):
+        """
+        Devolve à fila jobs "running" cujo worker parou de dar heartbeat
+        (processo morto, reinício do servidor)
+        """
+        cutoff = time.time() - lease_seconds
+        with self._session() as conn:
+            stale = conn.execute(
+                "SELECT id, attempts, worker FROM jobs WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (cutoff,),
+            ).fetchall()
+        requeued = 0
+        for row in stale:
+            # O heartbeat pode ter chegado entre a leitura e a atualização: fail confere de novo
+            status = self.fail(row["id"], "Worker interrompido", row["attempts"], row["worker"], stale_before=cutoff)
+            if status:
+                print(f"♻️  Job {row['id']} sem heartbeat - {status}", file=sys.stderr)
+                requeued += 1
+                if status == "failed":
+                    self.cleanup(row["id"])
+        return requeued
+
+    def cleanup(self, job_id):
+        """
+        Apaga a demo de um job terminado se ela foi enviada com cleanup (upload temporário)
+        """
+        job = self.get(job_id)
+        if job and job["cleanup"] and job["status"] in TERMINAL_STATUSES:
+            try:
+                os.unlink(job["demo_path"])
+            except FileNotFoundError:
+                pass
+
+
+def run_job(queue, job, worker_name, stop_event=None):
+    """
+    Executa parse_demo.py sob o watchdog (limites de tempo/memória), mantendo o heartbeat do job
+    """
+    print(f"🐍 [{worker_name}] Job {job['id']} (tentativa {job['attempts']}): {job['demo_path']}", file=sys.stderr)
+    last_beat = [time.time()]
+    lost = [False]
+
+    def beat():
+        # False cancela o parse: desligamento do worker ou job devolvido à fila
+        if stop_event is not None and stop_event.is_set():
+            return False
+        if time.time() - last_beat[0] >= HEARTBEAT_SECONDS:
+            if not queue.heartbeat(job["id"], worker_name):
+                lost[0] = True
+                return False
+            last_beat[0] = time.time()
+        return True
+
+    run = parse_with_budget(job["demo_path"], job["original_name"], on_poll=beat)
+    if run["reason"] == "cancelled":
+        if lost[0]:
+            print(f"⚠️  [{worker_name}] Job {job['id']} não é mais deste worker - parse cancelado", file=sys.stderr)
+        elif queue.release(job["id"], worker_name):
+            print(f"↩️  [{worker_name}] Job {job['id']} devolvido à fila (desligando)", file=sys.stderr)
+        return
+    parse_metrics.observe_run(run, job["demo_path"])
+
+    if run["returncode"] == 0:
+        if queue.complete(job["id"], run["stdout"], worker_name):
+            queue.cleanup(job["id"])
+            label = "concluído (parcial)" if run["partial"] else "concluído"
+            print(f"✅ [{worker_name}] Job {job['id']} {label} em {run['elapsed']}s", file=sys.stderr)
+        else:
+            print(f"⚠️  [{worker_name}] Job {job['id']} não é mais deste worker - resultado descartado", file=sys.stderr)
+        return
+
+    # Código 1 = erro tratado pelo parse_demo (demo inválida) e orçamento estourado:
+    # não adianta repetir. Outros códigos/sinais = crash do processo: tenta de novo com backoff
+    retryable = run["returncode"] != 1 and run["reason"] is None
+    stderr = run["stderr"]
+    error = stderr[-4000:] if stderr else f"Processo terminou com código {run['returncode']}"
+    if run["reason"]:
+        error = f"Orçamento de parsing excedido ({run['reason']}, {run['elapsed']}s, {run['peak_rss_mb']}MB)\n" + error
+    status = queue.fail(job["id"], error, job["attempts"], worker_name, retryable=retryable)
+    if status == "failed":
+        queue.cleanup(job["id"])
+    print(f"❌ [{worker_name}] Job {job['id']} falhou (código {run['returncode']}) → {status or 'já reatribuído'}", file=sys.stderr)
+
+
+def worker_loop(queue, worker_name, stop_event):
+    while not stop_event.is_set():
+        job = queue.claim(worker_name)
+        if job is None:
+            stop_event.wait(POLL_SECONDS)
+            continue
+        try:
+            run_job(queue, job, worker_name, stop_event)
+        except Exception as e:
+            if queue.fail(job["id"], str(e), job["attempts"], worker_name) == "failed":
+                queue.cleanup(job["id"])
+
+
+def run_workers(db_path=DEFAULT_DB, workers=DEFAULT_WORKERS):
+    """
+    Sobe N workers (threads supervisionando subprocessos) até Ctrl+C/SIGTERM
+
+    No desligamento os parses em andamento são cancelados e os jobs voltam para a
+    fila sem gastar tentativa.
+    """
+    queue = ParseQueue(db_path)
+    # Só jobs sem heartbeat dentro do lease: outros processos worker podem estar ativos
+    queue.requeue_stale()
+    parse_metrics.QUEUE_DEPTH.set(queue.depth())
+    parse_metrics.start_exporters()
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        print(f"🛑 Sinal {signum} recebido - encerrando workers", file=sys.stderr)
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    prefix = f"{os.uname().nodename if hasattr(os, 'uname') else 'local'}-{os.getpid()}"
+    threads = [
+        threading.Thread(target=worker_loop, args=(queue, f"{prefix}-w{i + 1}", stop_event), daemon=True)
+        for i in range(max(1, workers))
+    ]
+    print(f"🚀 Fila de parsing: {len(threads)} worker(s) em {db_path}", file=sys.stderr)
+    for thread in threads:
+        thread.start()
+    try:
+        last_requeue = time.time()
+        while not stop_event.wait(parse_metrics.DUMP_SECONDS):
+            parse_metrics.QUEUE_DEPTH.set(queue.depth())
+            if time.time() - last_requeue >= LEASE_SECONDS / 2:
+                queue.requeue_stale()
+                last_requeue = time.time()
+    except KeyboardInterrupt:
+        stop_event.set()
+    # Cada worker cancela o parse atual no próximo poll do watchdog e devolve o job
+    for thread in threads:
+        thread.join(timeout=HEARTBEAT_SECONDS * 2)
+
+
+def wait_for(queue, job_id, timeout=None):
+    """
+    Aguarda o job terminar (done/failed) e retorna a linha final
+    """
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        job = queue.get(job_id)
+        if job is None or job["status"] in ("done", "failed"):
+            return job
+        if deadline and time.time() > deadline:
+            return job
+        time.sleep(POLL_SECONDS)
+
+
+def job_status(queue, job_id, include_result=False):
+    job = queue.get(job_id)
+    if job is None:
+        return None
+    info = {
+        "id": job["id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "attempts": job["attempts"],
+        "position": queue.position(job_id),
+        "error": job["error"],
+        "createdAt": job["created_at"],
+        "startedAt": job["started_at"],
+        "finishedAt": job["finished_at"],
+    }
+    if include_result and job["status"] == "done":
+        info["result"] = json.loads(job["result"])
+    return info
+
+
+def print_outcome(queue, job_id, timeout=None):
+    """
+    Aguarda o job e sai como o parse_demo.py: JSON do resultado no stdout (código 0)
+    ou JSON de erro com o jobId no stderr (código 1)
+    """
+    job = wait_for(queue, job_id, timeout)
+    if job and job["status"] == "done":
+        sys.stdout.write(job["result"])
+        sys.exit(0)
+    print(json.dumps({
+        "error": "Erro ao processar demo",
+        "jobId": job_id,
+        "status": job["status"] if job else None,
+        "details": job["error"] if job else None,
+    }), file=sys.stderr)
+    sys.exit(1)
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Fila persistente de parsing de demos")
+    cli.add_argument("--db", default=DEFAULT_DB)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    worker = sub.add_parser("worker")
+    worker.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    submit = sub.add_parser("submit")
+    submit.add_argument("demo_path")
+    submit.add_argument("original_name", nargs="?")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--wait", action="store_true", help="Aguarda e imprime o resultado do parse")
+    submit.add_argument("--timeout", type=float, default=None)
+    submit.add_argument("--cleanup", action="store_true", help="Apaga a demo quando o job terminar (upload temporário)")
+
+    wait = sub.add_parser("wait", help="Aguarda um job já enfileirado e imprime o resultado")
+    wait.add_argument("job_id", type=int)
+    wait.add_argument("--timeout", type=float, default=None)
+
+    status = sub.add_parser("status")
+    status.add_argument("job_id", type=int)
+    status.add_argument("--result", action="store_true", help="Inclui o resultado quando o job terminou")
+
+    sub.add_parser("metrics", help="Imprime o último dump de métricas dos workers")
+
+    args = cli.parse_args()
+
+    if args.command == "worker":
+        run_workers(args.db, args.workers)
+        return
+
+    if args.command == "metrics":
+        try:
+            sys.stdout.write(Path(parse_metrics.METRICS_FILE).read_text(encoding="utf-8"))
+        except OSError:
+            print(json.dumps({"error": "Métricas indisponíveis (workers não iniciados?)"}), file=sys.stderr)
+            sys.exit(1)
+        return
+
+    queue = ParseQueue(args.db)
+
+    if args.command == "status":
+        info = job_status(queue, args.job_id, args.result)
+        if info is None:
+            print(json.dumps({"error": "Job não encontrado"}), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(info, ensure_ascii=False))
+        return
+
+    if args.command == "wait":
+        print_outcome(queue, args.job_id, args.timeout)
+
+    job_id = queue.submit(args.demo_path, args.original_name, args.priority, args.cleanup)
+    print(f"📥 Job {job_id} enfileirado (prioridade {args.priority}, posição {queue.position(job_id)})", file=sys.stderr)
+    if not args.wait:
+        print(json.dumps({"jobId": job_id, "status": "queued"}))
+        return
+    print_outcome(queue, job_id, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
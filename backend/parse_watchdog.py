@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Watchdog de parsing: executa parse_demo.py num processo supervisionado
+com limites de tempo (wall-clock) e memória (RSS)
+
+Se o orçamento estourar, mata o processo; se ele terminar com erro (demo
+corrompida/truncada que faz o demoparser2 falhar), também. Nos dois casos tenta
+um parse leve (só rounds e placar) para ainda devolver dados utilizáveis,
+marcados com "partial": true.
+
+Uso:
+  python parse_watchdog.py <arquivo.dem> [nome_original.dem] [--timeout S] [--max-rss-mb MB]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+PARSE_SCRIPT = BACKEND_DIR / "parse_demo.py"
+DEFAULT_TIMEOUT = float(os.environ.get("PARSE_TIMEOUT_SECONDS", "600"))
+DEFAULT_MAX_RSS_MB = float(os.environ.get("PARSE_MAX_RSS_MB", "1500"))
+# Fração do orçamento original concedida ao parse leve de fallback
+FALLBACK_BUDGET_RATIO = 0.5
+POLL_SECONDS = 0.5
+
+
+def read_rss_mb(pid):
+    """
+    RSS atual do processo em MB (Linux /proc); None se indisponível
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def run_supervised(cmd, timeout=DEFAULT_TIMEOUT, max_rss_mb=DEFAULT_MAX_RSS_MB, on_poll=None):
+    """
+    Executa cmd monitorando tempo e RSS; mata o processo ao estourar o orçamento
+
+    Args:
+        cmd: lista de argumentos do subprocesso
+        timeout: limite de wall-clock em segundos (None/0 = sem limite)
+        max_rss_mb: limite de RSS em MB (None/0 = sem limite)
+        on_poll: callback chamado a cada verificação (ex.: heartbeat da fila);
+            retornar False cancela o parse (ex.: lease perdido)
+
+    Returns:
+        dict com returncode, stdout, stderr, reason ("timeout", "memory", "cancelled" ou None),
+        elapsed (s) e peak_rss_mb
+    """
+    start = time.time()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+
+    # Ler os pipes em threads para o processo não travar com buffer cheio
+    chunks = {"stdout": [], "stderr": []}
+
+    def drain(stream, key):
+        for line in iter(stream.readline, ''):
+            chunks[key].append(line)
+        stream.close()
+
+    readers = [
+        threading.Thread(target=drain, args=(proc.stdout, "stdout"), daemon=True),
+        threading.Thread(target=drain, args=(proc.stderr, "stderr"), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    reason = None
+    peak_rss = 0.0
+    while proc.poll() is None:
+        elapsed = time.time() - start
+        rss = read_rss_mb(proc.pid)
+        if rss is not None:
+            peak_rss = max(peak_rss, rss)
+        if timeout and elapsed > timeout:
+            reason = "timeout"
+        elif max_rss_mb and rss is not None and rss > max_rss_mb:
+            reason = "memory"
+        if reason:
+            print(f"⏱️  Orçamento estourado ({reason}) após {elapsed:.1f}s, RSS {peak_rss:.0f}MB - encerrando", file=sys.stderr)
+            proc.kill()
+            break
+        if on_poll and on_poll() is False:
+            reason = "cancelled"
+            print(f"🛑 Parse cancelado após {elapsed:.1f}s - encerrando", file=sys.stderr)
+            proc.kill()
+            break
+        time.sleep(POLL_SECONDS)
+
+    proc.wait()
+    for reader in readers:
+        reader.join()
+
+    return {
+        "returncode": proc.returncode,
+        "stdout": "".join(chunks["stdout"]),
+        "stderr": "".join(chunks["stderr"]),
+        "reason": reason,
+        "elapsed": round(time.time() - start, 2),
+        "peak_rss_mb": round(peak_rss, 1),
+    }
+
+
+def parse_command(demo_path, original_name=None, light=False):
+    cmd = [sys.executable, str(PARSE_SCRIPT), str(demo_path)]
+    if original_name:
+        cmd.append(original_name)
+    if light:
+        cmd.append("--light")
+    return cmd
+
+
+def parse_with_budget(demo_path, original_name=None, timeout=DEFAULT_TIMEOUT,
+                      max_rss_mb=DEFAULT_MAX_RSS_MB, on_poll=None):
+    """
+    Parse completo dentro do orçamento; ao estourar ou falhar, fallback para parse leve
+
+    Returns:
+        dict com returncode, stdout (JSON do resultado quando returncode == 0),
+        stderr, reason e partial
+    """
+    run = run_supervised(parse_command(demo_path, original_name), timeout, max_rss_mb, on_poll)
+    run["partial"] = False
+    if (run["returncode"] == 0 and run["reason"] is None) or run["reason"] == "cancelled":
+        return run
+
+    # Orçamento estourado ou parse com erro: tentar só rounds/placar com orçamento reduzido
+    print("🩹 Tentando parse leve (somente rounds) para resultado parcial...", file=sys.stderr)
+    fallback = run_supervised(
+        parse_command(demo_path, original_name, light=True),
+        timeout * FALLBACK_BUDGET_RATIO if timeout else timeout,
+        max_rss_mb,
+        on_poll,
+    )
+    # Mantém o stderr do parse completo para diagnóstico
+    fallback["stderr"] = run["stderr"] + fallback["stderr"]
+    if fallback["returncode"] != 0 or fallback["reason"]:
+        run["stderr"] = fallback["stderr"]
+        return run
+
+    result = json.loads(fallback["stdout"])
+    result["partial"] = True
+    if run["reason"]:
+        cause = f"Parse completo excedeu o orçamento ({run['reason']})"
+    else:
+        cause = f"Parse completo falhou (código {run['returncode']})"
+    result.setdefault("partialReasons", []).append(f"{cause} - apenas rounds e placar")
+    fallback["stdout"] = json.dumps(result, ensure_ascii=False)
+    fallback["partial"] = True
+    fallback["reason"] = run["reason"]
+    fallback["elapsed"] = round(run["elapsed"] + fallback["elapsed"], 2)
+    return fallback
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Parse de demo com limites de tempo e memória")
+    cli.add_argument("demo_path")
+    cli.add_argument("original_name", nargs="?")
+    cli.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    cli.add_argument("--max-rss-mb", type=float, default=DEFAULT_MAX_RSS_MB)
+    args = cli.parse_args()
+
+    run = parse_with_budget(args.demo_path, args.original_name, args.timeout, args.max_rss_mb)
+    sys.stderr.write(run["stderr"])
+    if run["returncode"] == 0:
+        sys.stdout.write(run["stdout"])
+        sys.exit(0)
+    if run["reason"]:
+        print(json.dumps({
+            "error": "Orçamento de parsing excedido",
+            "reason": run["reason"],
+            "elapsed": run["elapsed"],
+            "peakRssMb": run["peak_rss_mb"],
+        }), file=sys.stderr)
+        sys.exit(2)
+    sys.exit(run["returncode"] if run["returncode"] > 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Carreira por jogador (chave: SteamID) ao longo de todas as partidas parseadas
+
+Armazenamento colunar: uma linha por (jogador, partida) em arrays numpy
+(kills, deaths, dano, rounds, opening duels, splits CT/T, ids de nome/time/mapa),
+com os textos em pools de strings. Cada gravação só escreve um chunk novo
+(chunks/NNNNNN.npz, com as linhas e as strings novas dos pools); a cada
+MAX_CHUNKS chunks tudo é compactado de volta em columns.npz. O time de cada
+jogador vem do team_num (startSide do resultado), não do kill feed. A consulta
+usa um índice ordenado por jogador (argsort + searchsorted), então montar a
+carreira lê apenas as linhas daquele jogador.
+
+Uso:
+  python player_careers.py add <resultado.json|pasta> [...] [--dir careers/]
+  python player_careers.py show <steamid|nome> [--map mirage]
+  python player_careers.py team <nome> [--map mirage]
+  python player_careers.py top [--by adr|kills|kd] [--min-matches 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from kill_index import collect_results
+from round_timeline import round_kills
+from score_verification import starting_ct_side
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_CAREERS_DIR = os.environ.get("PLAYER_CAREERS_DIR", str(BACKEND_DIR / "careers"))
+POOLS = ("players", "names", "teams", "maps", "matches")
+COLUMNS = (
+    "player", "name", "team", "map", "match",
+    "kills", "deaths", "damage", "rounds", "won",
+    "openingKills", "openingDeaths", "tradeKills", "clutchesWon", "clutchesPlayed",
+    "ctKills", "ctDeaths", "ctRounds", "tKills", "tDeaths", "tRounds",
+)
+RECENT_MATCHES = 10
+# Chunks acumulados antes de compactar em columns.npz
+MAX_CHUNKS = 64
+
+
+def match_rows(result):
+    """
+    Linhas (uma por jogador) de uma partida, com textos ainda não codificados
+
+    Returns:
+        lista de dicts com as chaves de COLUMNS
+    """
+    rounds = result.get("rounds", [])
+    team_a = result.get("teamA", {})
+    team_b = result.get("teamB", {})
+    starter, other = (team_a, team_b) if team_a.get("side", "CT") == "CT" else (team_b, team_a)
+    winner = None
+    if team_a.get("score") != team_b.get("score"):
+        winner = team_a.get("name") if (team_a.get("score") or 0) > (team_b.get("score") or 0) else team_b.get("name")
+
+    def team_on(side, number):
+        return starter.get("name") if starting_ct_side(number) == side else other.get("name")
+
+    # Resultados antigos (sem startSide/ctKills por jogador): splits e time pelo kill feed
+    sides = {}
+    team_votes = {}
+    for round_info in rounds:
+        number = round_info["number"]
+        for kill in round_kills(result, round_info) or []:
+            for role, stat in (("attacker", "Kills"), ("victim", "Deaths")):
+                pid, side = kill.get(f"{role}Steamid"), kill.get(f"{role}Side")
+                if pid is None or side not in ("CT", "T"):
+                    continue
+                if role == "attacker" and side == kill.get("victimSide"):
+                    continue  # team kill não conta
+                key = ("ct" if side == "CT" else "t") + stat
+                sides.setdefault(pid, {}).setdefault(key, 0)
+                sides[pid][key] += 1
+                votes = team_votes.setdefault(pid, {})
+                team = team_on(side, number)
+                votes[team] = votes.get(team, 0) + 1
+
+    starter_ct_rounds = sum(1 for r in rounds if starting_ct_side(r["number"]) == "CT")
+    rows = []
+    for player in result.get("players", []):
+        pid = player.get("steamid")
+        if pid is None:
+            continue
+        if player.get("startSide") in ("CT", "T"):
+            # team_num amostrado no fim de cada round: vale também para quem não matou nem morreu
+            team = starter.get("name") if player["startSide"] == "CT" else other.get("name")
+        else:
+            votes = team_votes.get(pid, {})
+            team = max(votes, key=votes.get) if votes else None
+        ct_rounds = starter_ct_rounds if team == starter.get("name") else len(rounds) - starter_ct_rounds
+        if "ctRounds" in player:
+            ct_rounds = player["ctRounds"]
+        split = {key: player[key] for key in ("ctKills", "ctDeaths", "tKills", "tDeaths") if key in player} \
+            or sides.get(pid, {})
+        rows.append({
+            "player": str(pid),
+            "name": player.get("name") or str(pid),
+            "team": team or "",
+            "map": result.get("mapName") or "unknown",
+            "kills": player.get("kills", 0),
+            "deaths": player.get("deaths", 0),
+            "damage": player.get("damage", 0),
+            "rounds": len(rounds),
+            "won": int(team is not None and team == winner),
+            "openingKills": player.get("openingKills", 0),
+            "openingDeaths": player.get("openingDeaths", 0),
+            "tradeKills": player.get("tradeKills", 0),
+            "clutchesWon": player.get("clutchesWon", 0),
+            "clutchesPlayed": player.get("clutchesPlayed", 0),
+            "ctKills": split.get("ctKills", 0),
+            "ctDeaths": split.get("ctDeaths", 0),
+            "ctRounds": ct_rounds if team else 0,
+            "tKills": split.get("tKills", 0),
+            "tDeaths": split.get("tDeaths", 0),
+            "tRounds": player.get("tRounds", len(rounds) - ct_rounds) if team else 0,
+        })
+    return rows
+
+
+class PlayerCareers:
+    """
+    Colunas por (jogador, partida) + pools de strings, persistidos em careers/
+
+    columns.npz guarda a base compactada (colunas, pools em JSON e o último chunk
+    incorporado); chunks/ guarda o que foi acrescentado depois, um arquivo por gravação
+    """
+
+    def __init__(self, careers_dir=DEFAULT_CAREERS_DIR):
+        self.dir = Path(careers_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.columns_path = self.dir / "columns.npz"
+        self.chunks_dir = self.dir / "chunks"
+        self.pools = {name: [] for name in POOLS}
+        parts = []
+        self._merged = 0
+        if self.columns_path.exists():
+            with np.load(self.columns_path, allow_pickle=False) as data:
+                if "pools" in data:
+                    self.pools = json.loads(str(data["pools"]))
+                    self._merged = int(data["chunk"])
+                else:
+                    # Formato antigo: pools em pools.json ao lado das colunas
+                    with open(self.dir / "pools.json", "r", encoding="utf-8") as f:
+                        self.pools = json.load(f)
+                parts.append(self._read_columns(data))
+        self._chunk = self._merged
+        for path in sorted(self.chunks_dir.glob("*.npz")) if self.chunks_dir.exists() else []:
+            if not path.stem.isdigit():
+                continue  # gravação interrompida (.tmp)
+            seq = int(path.stem)
+            if seq <= self._merged:
+                continue
+            with np.load(path, allow_pickle=False) as data:
+                for pool, values in json.loads(str(data["pools"])).items():
+                    self.pools[pool].extend(values)
+                parts.append(self._read_columns(data))
+            self._chunk = seq
+        self._parts = parts
+        self._columns = None
+        self._pending = []
+        self._pending_pools = {name: [] for name in POOLS}
+        self._codes = {name: {value: i for i, value in enumerate(values)} for name, values in self.pools.items()}
+        self._index = None
+
+    @staticmethod
+    def _read_columns(data):
+        rows = len(data["player"])
+        return {name: data[name] if name in data else np.zeros(rows, dtype=np.int32) for name in COLUMNS}
+
+    @property
+    def columns(self):
+        # Concatena os segmentos só na consulta; acrescentar partidas não copia as colunas
+        if self._columns is None:
+            self._columns = {
+                name: np.concatenate([part[name] for part in self._parts]) if self._parts else np.zeros(0, dtype=np.int32)
+                for name in COLUMNS
+            }
+            self._parts = [self._columns]
+        return self._columns
+
+    def _code(self, pool, value):
+        codes = self._codes[pool]
+        if value not in codes:
+            codes[value] = len(self.pools[pool])
+            self.pools[pool].append(value)
+            self._pending_pools[pool].append(value)
+        return codes[value]
+
+    def save(self):
+        """
+        Grava as partidas acrescentadas desde a última gravação num chunk novo
+        (O(linhas novas)); compacta quando os chunks passam de MAX_CHUNKS
+        """
+        if not self._pending:
+            return
+        self.chunks_dir.mkdir(exist_ok=True)
+        seq = self._chunk + 1
+        target = self.chunks_dir / f"{seq:06d}.npz"
+        tmp = self.chunks_dir / f"{seq:06d}.tmp.npz"
+        chunk = {name: np.concatenate([part[name] for part in self._pending]) for name in COLUMNS}
+        np.savez(tmp, pools=np.array(json.dumps(self._pending_pools, ensure_ascii=False)), **chunk)
+        os.replace(tmp, target)
+        self._chunk = seq
+        self._pending = []
+        self._pending_pools = {name: [] for name in POOLS}
+        if self._chunk - self._merged >= MAX_CHUNKS:
+            self.compact()
+
+    def compact(self):
+        """
+        Reescreve a base com tudo (colunas + pools) e remove os chunks incorporados
+        """
+        self.save()
+        tmp = self.columns_path.with_name("columns.tmp.npz")
+        np.savez(tmp, pools=np.array(json.dumps(self.pools, ensure_ascii=False)),
+                 chunk=np.array(self._chunk), **self.columns)
+        os.replace(tmp, self.columns_path)
+        self._merged = self._chunk
+        for path in self.chunks_dir.glob("*.npz"):
+            if int(path.stem.split(".")[0]) <= self._merged:
+                path.unlink(missing_ok=True)
+        (self.dir / "pools.json").unlink(missing_ok=True)
+
+    def add(self, result, match_key, save=True):
+        """
+        Acrescenta as linhas de uma partida (ignorada se já incluída)
+
+        Args:
+            save: grava um chunk com esta partida; em lote, use save=False e chame save() no fim
+
+        Returns:
+            nº de jogadores acrescentados ou None se já incluída
+        """
+        if match_key in self._codes["matches"]:
+            return None
+        rows = match_rows(result)
+        match_code = self._code("matches", match_key)
+        pooled = {"player": "players", "name": "names", "team": "teams", "map": "maps"}
+        new = {name: [] for name in COLUMNS}
+        for row in rows:
+            for name in COLUMNS:
+                if name == "match":
+                    new[name].append(match_code)
+                elif name in pooled:
+                    new[name].append(self._code(pooled[name], row[name]))
+                else:
+                    new[name].append(int(row[name] or 0))
+        part = {name: np.array(new[name], dtype=np.int32) for name in COLUMNS}
+        self._parts.append(part)
+        self._pending.append(part)
+        self._columns = None
+        self._index = None
+        if save:
+            self.save()
+        return len(rows)
+
+    def _rows_index(self):
+        # Linhas agrupadas por jogador (ordem de inserção preservada dentro do grupo)
+        if self._index is None:
+            player = self.columns["player"]
+            order = np.argsort(player, kind="stable")
+            bounds = np.searchsorted(player[order], np.arange(len(self.pools["players"]) + 1))
+            names = {}
+            for row in order:
+                names[self.pools["names"][self.columns["name"][row]].lower()] = int(player[row])
+            self._index = (order, bounds, names)
+        return self._index
+
+    def find_player(self, query):
+        """
+        Código do jogador por steamid ou pelo último nome usado (sem diferenciar maiúsculas)
+        """
+        if str(query) in self._codes["players"]:
+            return self._codes["players"][str(query)]
+        return self._rows_index()[2].get(str(query).lower())
+
+    def career(self, query, map_name=None):
+        """
+        Carreira agregada de um jogador (só as linhas dele)
+
+        Returns:
+            dict ou None se o jogador não existe
+        """
+        code = self.find_player(query)
+        if code is None:
+            return None
+        order, bounds, _ = self._rows_index()
+        rows = order[bounds[code]:bounds[code + 1]]
+        if map_name:
+            maps = [i for i, name in enumerate(self.pools["maps"]) if name.lower() == map_name.lower()]
+            rows = rows[np.isin(self.columns["map"][rows], maps)]
+        col = {name: values[rows] for name, values in self.columns.items()}
+
+        def total(name):
+            return int(col[name].sum())
+
+        def ratio(a, b, digits=2):
+            return round(a / b, digits) if b else None
+
+        def history(column, pool):
+            # Nomes/times na ordem em que apareceram, com nº de partidas
+            seen = {}
+            for position, value in enumerate(col[column].tolist()):
+                entry = seen.setdefault(value, {"matches": 0, "first": position})
+                entry["matches"] += 1
+            values = self.pools[pool]
+            return [{"name": values[v], "matches": e["matches"]}
+                    for v, e in sorted(seen.items(), key=lambda item: item[1]["first"]) if values[v]]
+
+        per_map = {}
+        for code_map in np.unique(col["map"]).tolist():
+            mask = col["map"] == code_map
+            rounds = int(col["rounds"][mask].sum())
+            per_map[self.pools["maps"][code_map]] = {
+                "matches": int(mask.sum()),
+                "wins": int(col["won"][mask].sum()),
+                "kills": int(col["kills"][mask].sum()),
+                "deaths": int(col["deaths"][mask].sum()),
+                "adr": ratio(int(col["damage"][mask].sum()), rounds, 1),
+            }
+
+        recent = [
+            {
+                "match": self.pools["matches"][col["match"][i]],
+                "map": self.pools["maps"][col["map"][i]],
+                "team": self.pools["teams"][col["team"][i]],
+                "kills": int(col["kills"][i]),
+                "deaths": int(col["deaths"][i]),
+                "adr": ratio(int(col["damage"][i]), int(col["rounds"][i]), 1),
+                "won": bool(col["won"][i]),
+            }
+            for i in range(len(rows) - 1, max(len(rows) - RECENT_MATCHES, 0) - 1, -1)
+        ]
+
+        return {
+            "steamid": self.pools["players"][code],
+            "name": self.pools["names"][col["name"][-1]] if len(rows) else None,
+            "matches": len(rows),
+            "wins": total("won"),
+            "rounds": total("rounds"),
+            "kills": total("kills"),
+            "deaths": total("deaths"),
+            "kd": ratio(total("kills"), total("deaths")),
+            "adr": ratio(total("damage"), total("rounds"), 1),
+            "openingKills": total("openingKills"),
+            "openingDeaths": total("openingDeaths"),
+            "tradeKills": total("tradeKills"),
+            "clutchesWon": total("clutchesWon"),
+            "clutchesPlayed": total("clutchesPlayed"),
+            "sides": {
+                side: {
+                    "kills": total(f"{key}Kills"),
+                    "deaths": total(f"{key}Deaths"),
+                    "rounds": total(f"{key}Rounds"),
+                    "kpr": ratio(total(f"{key}Kills"), total(f"{key}Rounds")),
+                }
+                for side, key in (("CT", "ct"), ("T", "t"))
+            },
+            "maps": per_map,
+            "nameHistory": history("name", "names"),
+            "teamHistory": history("team", "teams"),
+            "recent": recent,
+        }
+
+    def team_players(self, team, map_name=None, limit=10):
+        """
+        Jogadores de um time (pelas linhas em que jogaram por ele), com partidas,
+        K/D e ADR agregados (vetorizado com bincount)
+        """
+        teams = [i for i, name in enumerate(self.pools["teams"]) if name and name.lower() == str(team).lower()]
+        if not teams:
+            return []
+        mask = np.isin(self.columns["team"], teams)
+        if map_name:
+            maps = [i for i, name in enumerate(self.pools["maps"]) if name.lower() == map_name.lower()]
+            mask &= np.isin(self.columns["map"], maps)
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return []
+        n = len(self.pools["players"])
+        player = self.columns["player"][rows]
+
+        def sums(name):
+            return np.bincount(player, weights=self.columns[name][rows], minlength=n)
+
+        matches = np.bincount(player, minlength=n)
+        kills, deaths, damage, rounds = sums("kills"), sums("deaths"), sums("damage"), sums("rounds")
+        latest_name = dict(zip(player.tolist(), self.columns["name"][rows].tolist()))
+        codes = sorted(np.flatnonzero(matches).tolist(), key=lambda code: (-matches[code], -kills[code]))[:limit]
+        return [
+            {
+                "steamid": self.pools["players"][code],
+                "name": self.pools["names"][latest_name[code]],
+                "matches": int(matches[code]),
+                "kills": int(kills[code]),
+                "deaths": int(deaths[code]),
+                "kd": round(float(kills[code] / deaths[code]), 2) if deaths[code] else None,
+                "adr": round(float(damage[code] / rounds[code]), 1) if rounds[code] else None,
+            }
+            for code in codes
+        ]
+
+    def top(self, by="adr", min_matches=5, limit=20):
+        """
+        Ranking por ADR, kills ou K/D (agregação vetorizada com bincount)
+        """
+        n = len(self.pools["players"])
+        if not n:
+            return []
+        player = self.columns["player"]
+
+        def sums(name):
+            return np.bincount(player, weights=self.columns[name], minlength=n)
+
+        matches = np.bincount(player, minlength=n)
+        kills, deaths = sums("kills"), sums("deaths")
+        metrics = {
+            "adr": sums("damage") / np.maximum(sums("rounds"), 1),
+            "kills": kills,
+            "kd": kills / np.maximum(deaths, 1),
+        }
+        score = np.where(matches >= min_matches, metrics[by], -np.inf)
+        best = np.argsort(-score, kind="stable")[:limit]
+        latest_name = {}
+        for row, code in enumerate(player.tolist()):
+            latest_name[code] = self.columns["name"][row]
+        return [
+            {
+                "steamid": self.pools["players"][code],
+                "name": self.pools["names"][latest_name[code]],
+                "matches": int(matches[code]),
+                by: round(float(metrics[by][code]), 2),
+            }
+            for code in best.tolist() if np.isfinite(score[code])
+        ]
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Carreira por jogador (SteamID) entre partidas")
+    cli.add_argument("--dir", default=DEFAULT_CAREERS_DIR)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Incorpora resultados JSON do parse_demo")
+    add.add_argument("inputs", nargs="+")
+
+    show = sub.add_parser("show", help="Carreira de um jogador")
+    show.add_argument("player", help="SteamID ou nome")
+    show.add_argument("--map")
+
+    team = sub.add_parser("team", help="Jogadores de um time")
+    team.add_argument("team")
+    team.add_argument("--map")
+    team.add_argument("--limit", type=int, default=10)
+
+    top = sub.add_parser("top", help="Ranking de jogadores")
+    top.add_argument("--by", choices=("adr", "kills", "kd"), default="adr")
+    top.add_argument("--min-matches", type=int, default=5)
+    top.add_argument("--limit", type=int, default=20)
+    args = cli.parse_args()
+
+    careers = PlayerCareers(args.dir)
+    if args.command == "add":
+        for path in collect_results(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            added = careers.add(result, path.stem, save=False)
+            print(f"👤 {path.name}: {'já incluída' if added is None else f'{added} jogadores'}", file=sys.stderr)
+        careers.save()
+    elif args.command == "show":
+        career = careers.career(args.player, args.map)
+        if career is None:
+            print(json.dumps({"error": "Jogador não encontrado"}), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(career, ensure_ascii=False, indent=2))
+    elif args.command == "team":
+        print(json.dumps(careers.team_players(args.team, args.map, args.limit), ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(careers.top(args.by, args.min_matches, args.limit), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
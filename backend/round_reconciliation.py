@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Reconciliação de round_end em uma passada (O(n))
+
+Demos reais trazem round_end a mais: eco do mesmo fim de round poucos ticks
+depois, rounds de warmup/faca antes de um mp_restartgame, rounds refeitos por
+restore de backup e eventos depois do fim da partida. Em vez de testar remoções
+e recontar, os eventos são percorridos uma vez em ordem de tick com uma pilha
+de rounds aceitos e o placar por time (quem começou de CT x o outro):
+
+  - sem vencedor ou round 0 → warmup
+  - a menos de MIN_ROUND_GAP_SECONDS do round aceito anterior, ou sem
+    round_start/round_freeze_end (ou round_officially_ended) entre os dois → duplicata
+  - contador de round que volta (≤ último aceito) → restart/restore: desempilha os
+    rounds substituídos (cada round entra e sai da pilha no máximo uma vez)
+  - depois de um time fechar a partida (13 no MR12 ou 4 num bloco de OT) → descartado
+
+Cada descarte sai com tick, round e motivo.
+
+Uso:
+  python round_reconciliation.py --benchmark [--sizes 30,300,3000,30000]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from score_verification import HALF_ROUNDS, OT_HALF_ROUNDS, REGULATION_ROUNDS, starting_ct_side
+
+
+# Menor intervalo real entre dois round_end (freeze + round ao vivo mais curto)
+MIN_ROUND_GAP_SECONDS = 5
+
+
+def _side(value):
+    if isinstance(value, str) and value in ("CT", "T"):
+        return value
+    if value == 3:
+        return "CT"
+    if value == 2:
+        return "T"
+    return None
+
+
+def _sorted_ticks(frame):
+    if frame is None or frame.empty or 'tick' not in frame.columns:
+        return np.zeros(0, dtype=np.int64)
+    return np.sort(frame['tick'].to_numpy(dtype=np.int64))
+
+
+def _decided(scores, count):
+    """
+    Algum time fechou a partida após `count` rounds aceitos?
+    (scores[i] = (vitórias de quem começou CT, vitórias do outro) após i rounds)
+    """
+    starter, other = scores[count]
+    if count <= REGULATION_ROUNDS:
+        return max(starter, other) == HALF_ROUNDS + 1
+    block_size = 2 * OT_HALF_ROUNDS
+    block_start = REGULATION_ROUNDS + ((count - REGULATION_ROUNDS - 1) // block_size) * block_size
+    before_starter, before_other = scores[block_start]
+    return max(starter - before_starter, other - before_other) == OT_HALF_ROUNDS + 1
+
+
+def reconcile_round_ends(rounds_df, round_start_df=None, freeze_end_df=None, official_end_df=None,
+                         tickrate=64, stop_at_match_end=True):
+    """
+    Remove round_end de warmup, duplicados, refeitos e pós-partida
+
+    Args:
+        rounds_df: DataFrame de round_end (tick, winner, reason e opcionalmente round)
+        round_start_df / freeze_end_df / official_end_df: eventos de fronteira (opcionais)
+        tickrate: ticks por segundo da demo
+        stop_at_match_end: descarta round_end depois de um time fechar a partida
+
+    Returns:
+        (DataFrame com os round_end mantidos em ordem de tick,
+         lista de {"tick", "round", "reason"} dos removidos)
+    """
+    if rounds_df is None or rounds_df.empty or 'tick' not in rounds_df.columns:
+        return rounds_df, []
+
+    frame = rounds_df.sort_values('tick', kind='stable').reset_index(drop=True)
+    ticks = frame['tick'].to_numpy(dtype=np.int64)
+    sides = [_side(value) for value in frame['winner']] if 'winner' in frame.columns else [None] * len(frame)
+    counters = frame['round'].to_numpy() if 'round' in frame.columns else None
+    has_reason = (~frame['reason'].isna()).to_numpy() if 'reason' in frame.columns else np.ones(len(frame), dtype=bool)
+    min_gap = MIN_ROUND_GAP_SECONDS * (tickrate or 64)
+
+    # Fronteiras de round: nº de inícios até cada round_end (diferença = inícios entre dois ends)
+    boundaries = np.concatenate([_sorted_ticks(round_start_df), _sorted_ticks(freeze_end_df)])
+    if not len(boundaries):
+        boundaries = _sorted_ticks(official_end_df)
+    boundaries.sort()
+    starts_before = np.searchsorted(boundaries, ticks, side='left') if len(boundaries) else None
+
+    kept = []          # índices aceitos (pilha)
+    scores = [(0, 0)]  # placar por time após cada round aceito
+    removals = []
+    decided = False
+
+    def remove(i, reason):
+        counter = counters[i] if counters is not None else None
+        removals.append({
+            "tick": int(ticks[i]),
+            "round": int(counter) if counter is not None and not pd.isna(counter) else None,
+            "reason": reason,
+        })
+
+    for i in range(len(frame)):
+        side = sides[i]
+        counter = counters[i] if counters is not None and not pd.isna(counters[i]) else None
+        if side is None:
+            remove(i, "sem vencedor (warmup/restart)")
+            continue
+        if counter == 0:
+            remove(i, "warmup (round 0)")
+            continue
+        if decided:
+            starter, other = scores[-1]
+            remove(i, f"após o fim da partida ({max(starter, other)}-{min(starter, other)})")
+            continue
+
+        if kept:
+            previous = kept[-1]
+            gap = int(ticks[i] - ticks[previous])
+            no_start = starts_before is not None and starts_before[i] == starts_before[previous]
+            if gap < min_gap or no_start:
+                detail = f"{gap} ticks após o round anterior" if gap < min_gap else "sem round_start desde o round anterior"
+                if not has_reason[previous] and has_reason[i]:
+                    # O eco tem o motivo e o aceito não: fica o mais completo
+                    remove(previous, f"duplicata ({detail}) sem motivo de fim")
+                    kept[-1] = i
+                else:
+                    remove(i, f"duplicata ({detail})")
+                continue
+
+            # Contador que volta: restart da partida (≤ 1) ou restore de backup
+            if counter is not None and counters[previous] is not None and counter <= counters[previous]:
+                label = "restart da partida" if counter <= 1 else f"restore de backup no round {int(counter)}"
+                while kept and counters[kept[-1]] is not None and counters[kept[-1]] >= counter:
+                    remove(kept.pop(), f"substituído ({label})")
+                    scores.pop()
+
+        kept.append(i)
+        starter, other = scores[-1]
+        if side == starting_ct_side(len(kept)):
+            starter += 1
+        else:
+            other += 1
+        scores.append((starter, other))
+        decided = stop_at_match_end and _decided(scores, len(kept))
+
+    removals.sort(key=lambda item: item["tick"])
+    return frame.iloc[kept].reset_index(drop=True), removals
+
+
+def _synthetic_events(n_rounds, seed=0, dup_rate=0.1, restarts=True):
+    """
+    Eventos sintéticos de uma demo com duplicatas, warmup e restore injetados
+
+    Returns:
+        (round_end, round_start, round_officially_ended, nº esperado de removidos)
+    """
+    rng = np.random.default_rng(seed)
+    ends, starts, officials = [], [], []
+    expected = 0
+    tick = 1000
+    if restarts:
+        # Warmup e faca antes do mp_restartgame
+        for counter in (0, 1):
+            starts.append(tick)
+            tick += 64 * 60
+            ends.append({"tick": tick, "round": counter, "winner": "CT", "reason": "t_killed"})
+            officials.append(tick + 7 * 64)
+            tick += 7 * 64 + 1
+            expected += 1
+    restore_at = n_rounds // 2 if restarts else None
+    counter = 1
+    while counter <= n_rounds:
+        starts.append(tick)
+        tick += 15 * 64 + int(rng.integers(20, 110)) * 64
+        winner = "CT" if rng.random() < 0.5 else "T"
+        ends.append({"tick": tick, "round": counter, "winner": winner, "reason": "t_killed" if winner == "CT" else "ct_killed"})
+        if rng.random() < dup_rate:
+            ends.append({"tick": tick + int(rng.integers(1, 10)), "round": counter + 1, "winner": winner, "reason": None})
+            expected += 1
+        officials.append(tick + 7 * 64)
+        tick += 7 * 64 + 1
+        if counter == restore_at:
+            # Round refeito após restore de backup
+            restore_at = None
+            expected += 1
+            continue
+        counter += 1
+    return pd.DataFrame(ends), pd.DataFrame({"tick": starts}), pd.DataFrame({"tick": officials}), expected
+
+
+def benchmark(sizes, repeat=3):
+    """
+    Tempo de reconcile_round_ends por tamanho (sem corte no fim da partida)
+    """
+    rows = []
+    for size in sizes:
+        round_end, round_start, official, expected = _synthetic_events(size, seed=size)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            kept, removals = reconcile_round_ends(round_end, round_start, None, official, stop_at_match_end=False)
+            best = min(best, time.perf_counter() - start)
+        rows.append({
+            "rounds": size,
+            "events": len(round_end),
+            "kept": len(kept),
+            "removed": len(removals),
+            "expected": expected,
+            "ms": round(best * 1000, 2),
+            "usPerEvent": round(best * 1e6 / len(round_end), 2),
+        })
+    return rows
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Reconciliação de round_end (benchmark sintético)")
+    cli.add_argument("--benchmark", action="store_true", help="Mede a passada em demos sintéticas com duplicatas")
+    cli.add_argument("--sizes", default="30,300,3000,30000")
+    args = cli.parse_args()
+    if not args.benchmark:
+        cli.print_help()
+        return
+    for row in benchmark([int(size) for size in args.sizes.split(",")]):
+        status = "✅" if row["removed"] == row["expected"] and row["kept"] == row["rounds"] else "❌"
+        print(f"{status} {row['rounds']} rounds ({row['events']} eventos): {row['removed']} removidos "
+              f"(esperado {row['expected']}) em {row['ms']}ms ({row['usPerEvent']}µs/evento)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
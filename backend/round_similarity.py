@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Busca de rounds parecidos ("mostre rounds como este")
+
+Cada round do parse_demo vira um vetor numérico de tamanho fixo (economia, tempos
+e lados dos primeiros kills, primeiro kill, plant/site/defuse, razão de fim,
+duração, vencedor). Os vetores ficam numa matriz numpy persistida (.npz): cada
+gravação só escreve um chunk novo (<store>.chunks/NNNNNN.npz) e a cada MAX_CHUNKS
+tudo é compactado de volta no .npz base. As consultas top-k usam uma ball tree
+(numpy puro) por mapa, construída sob demanda sobre os vetores padronizados
+(z-score) e ponderados por grupo de feature.
+
+Uso:
+  python round_similarity.py add <resultado.json|pasta> [...] [--store round_vectors.npz]
+  python round_similarity.py query <match_key> <round> [-k 10] [--any-map]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from kill_index import collect_results
+from round_timeline import round_kills
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_STORE = os.environ.get("ROUND_VECTORS_FILE", str(BACKEND_DIR / "round_vectors.npz"))
+
+ROUND_SECONDS = 115.0
+# Primeiros kills considerados (tempo desde o fim do freeze e lado do atacante)
+KILL_SLOTS = 6
+END_REASONS = ("Bomba Detonada", "Bomba Desarmada", "CTs Eliminados", "Terroristas Eliminados", "Tempo Esgotado")
+LEAF_SIZE = 64
+# Chunks acrescentados antes de compactar tudo no .npz base
+MAX_CHUNKS = 64
+COLUMNS = ("vectors", "matches", "numbers", "maps")
+
+# (nome, tamanho, peso) — a ordem define o layout do vetor
+FEATURE_GROUPS = (
+    ("economy", 2, 1.0),
+    ("killTimes", KILL_SLOTS, 1.5),
+    ("killSides", KILL_SLOTS, 1.0),
+    ("firstKillSide", 1, 1.0),
+    ("bomb", 6, 1.5),
+    ("endReason", len(END_REASONS), 1.0),
+    ("duration", 1, 1.0),
+    ("winner", 1, 1.0),
+)
+VECTOR_SIZE = sum(size for _, size, _ in FEATURE_GROUPS)
+WEIGHTS = np.concatenate([np.full(size, weight, dtype=np.float32) for _, size, weight in FEATURE_GROUPS])
+
+
+def duration_seconds(value):
+    # "m:ss" (formato do parse_demo) ou número de segundos
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        minutes, seconds = str(value).split(":")
+        return int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return 0.0
+
+
+def round_vector(round_info, kills):
+    """
+    Vetor de features (float32, VECTOR_SIZE) de um round
+
+    Args:
+        kills: kill feed do round (round_timeline.round_kills) ou None
+    """
+    duration = duration_seconds(round_info.get("duration"))
+    economy = round_info.get("economy") or {}
+    kills = sorted(kills or [], key=lambda k: k.get("time", 0.0))[:KILL_SLOTS]
+    # Slots sem kill: tempo = fim do round, lado neutro
+    kill_times = np.full(KILL_SLOTS, max(duration, ROUND_SECONDS), dtype=np.float32)
+    kill_sides = np.full(KILL_SLOTS, 0.5, dtype=np.float32)
+    for i, kill in enumerate(kills):
+        kill_times[i] = kill.get("time", 0.0)
+        kill_sides[i] = 1.0 if kill.get("attackerSide") == "CT" else 0.0
+
+    bomb = round_info.get("bomb") or {}
+    planted = bool(round_info.get("bombPlanted") or bomb)
+    site = bomb.get("site")
+    bomb_features = [
+        float(planted),
+        bomb.get("plantTime", ROUND_SECONDS) if planted else ROUND_SECONDS,
+        float(site == "A"),
+        float(site == "B"),
+        float(bool(round_info.get("bombDefused") or bomb.get("defused"))),
+        float(bool(bomb.get("exploded"))),
+    ]
+    end_reason = round_info.get("endReason")
+
+    return np.concatenate([
+        [economy.get("CT") or 0.0, economy.get("T") or 0.0],
+        kill_times,
+        kill_sides,
+        [float(round_info.get("firstKillSide") == "CT")],
+        bomb_features,
+        [float(end_reason == reason) for reason in END_REASONS],
+        [duration],
+        [float(round_info.get("winnerSide") == "CT")],
+    ]).astype(np.float32)
+
+
+class BallTree:
+    """
+    Ball tree em numpy: nós em arrays (centro, raio, faixa de pontos, filhos)
+    """
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        self.points = np.asarray(points, dtype=np.float32)
+        self.order = np.arange(len(self.points))
+        self.centers, self.radii, self.ranges, self.children = [], [], [], []
+        if len(self.points):
+            self._build(0, len(self.points), leaf_size)
+        self.centers = np.array(self.centers, dtype=np.float32)
+        self.radii = np.array(self.radii, dtype=np.float32)
+        # Pontos reordenados: cada nó cobre uma fatia contígua
+        self.sorted_points = self.points[self.order]
+
+    def _build(self, start, end, leaf_size):
+        node = len(self.centers)
+        idx = self.order[start:end]
+        block = self.points[idx]
+        center = block.mean(axis=0)
+        self.centers.append(center)
+        self.radii.append(float(np.sqrt(((block - center) ** 2).sum(axis=1)).max()))
+        self.ranges.append((start, end))
+        self.children.append(None)
+        if end - start > leaf_size:
+            # Divide na mediana da dimensão de maior amplitude
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (end - start) // 2
+            part = np.argpartition(block[:, dim], mid)
+            self.order[start:end] = idx[part]
+            left = self._build(start, start + mid, leaf_size)
+            right = self._build(start + mid, end, leaf_size)
+            self.children[node] = (left, right)
+        return node
+
+    def query(self, vector, k=10, exclude=None):
+        """
+        k vizinhos mais próximos (best-first com poda pelo raio da bola)
+
+        Returns:
+            lista de (distância, índice original) em ordem crescente
+        """
+        if not len(self.radii):
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        best = []  # max-heap por -distância
+        frontier = [(self._lower_bound(vector, 0), 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(best) == k and bound >= -best[0][0]:
+                break
+            children = self.children[node]
+            if children is None:
+                start, end = self.ranges[node]
+                dist = np.sqrt(((self.sorted_points[start:end] - vector) ** 2).sum(axis=1))
+                originals = self.order[start:end]
+                # Só os k melhores da folha (e abaixo do pior atual) passam pelo heap
+                keep = np.flatnonzero(originals != exclude) if exclude is not None else np.arange(end - start)
+                if len(best) == k:
+                    keep = keep[dist[keep] < -best[0][0]]
+                if len(keep) > k:
+                    keep = keep[np.argpartition(dist[keep], k)[:k]]
+                for d, original in zip(dist[keep].tolist(), originals[keep].tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, original))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, original))
+            else:
+                for child in children:
+                    heapq.heappush(frontier, (self._lower_bound(vector, child), child))
+        return sorted((-d, i) for d, i in best)
+
+    def _lower_bound(self, vector, node):
+        return max(0.0, float(np.sqrt(((self.centers[node] - vector) ** 2).sum())) - float(self.radii[node]))
+
+
+class RoundVectorStore:
+    """
+    Matriz de vetores por round (+ partida, número e mapa de cada linha) com
+    árvores de vizinhança por mapa construídas sob demanda
+
+    O .npz base guarda a matriz compactada e o último chunk incorporado; o
+    diretório <store>.chunks/ guarda o que foi acrescentado depois
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self.chunks_dir = self.path.with_name(self.path.stem + ".chunks")
+        parts = []
+        self._merged = 0
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as data:
+                if data["vectors"].shape[1] == VECTOR_SIZE:
+                    parts.append({name: data[name] for name in COLUMNS})
+                    self._merged = int(data["chunk"]) if "chunk" in data else 0
+                else:
+                    print("🔄 Layout dos vetores mudou - começando do zero (rode add no corpus)", file=sys.stderr)
+        self._chunk = self._merged
+        for chunk_path in sorted(self.chunks_dir.glob("*.npz")) if self.chunks_dir.exists() else []:
+            if not chunk_path.stem.isdigit() or int(chunk_path.stem) <= self._merged:
+                continue  # gravação interrompida (.tmp) ou já compactado
+            with np.load(chunk_path, allow_pickle=False) as data:
+                if data["vectors"].shape[1] == VECTOR_SIZE:
+                    parts.append({name: data[name] for name in COLUMNS})
+            self._chunk = int(chunk_path.stem)
+        self._parts = parts
+        self._columns = None
+        self._pending = []
+        self.match_keys = set()
+        for part in parts:
+            self.match_keys.update(np.unique(part["matches"]).tolist())
+        self._trees = {}
+
+    @property
+    def columns(self):
+        # Concatena os chunks só na consulta; acrescentar partidas não copia a matriz
+        if self._columns is None:
+            if self._parts:
+                self._columns = {name: np.concatenate([part[name] for part in self._parts]) for name in COLUMNS}
+            else:
+                self._columns = {
+                    "vectors": np.zeros((0, VECTOR_SIZE), dtype=np.float32),
+                    "matches": np.zeros(0, dtype=str),
+                    "numbers": np.zeros(0, dtype=np.int32),
+                    "maps": np.zeros(0, dtype=str),
+                }
+            self._parts = [self._columns] if self._parts else []
+        return self._columns
+
+    @property
+    def vectors(self):
+        return self.columns["vectors"]
+
+    @property
+    def matches(self):
+        return self.columns["matches"]
+
+    @property
+    def numbers(self):
+        return self.columns["numbers"]
+
+    @property
+    def maps(self):
+        return self.columns["maps"]
+
+    def save(self):
+        """
+        Grava as partidas acrescentadas desde a última gravação num chunk novo
+        (O(rounds novos)); compacta quando os chunks passam de MAX_CHUNKS
+        """
+        if not self._pending:
+            return
+        self.chunks_dir.mkdir(parents=True, exist_ok=True)
+        seq = self._chunk + 1
+        tmp = self.chunks_dir / f"{seq:06d}.tmp.npz"
+        np.savez(tmp, **{name: np.concatenate([part[name] for part in self._pending]) for name in COLUMNS})
+        os.replace(tmp, self.chunks_dir / f"{seq:06d}.npz")
+        self._chunk = seq
+        self._pending = []
+        if self._chunk - self._merged >= MAX_CHUNKS:
+            self.compact()
+
+    def compact(self):
+        """
+        Reescreve o .npz base com todos os vetores e remove os chunks incorporados
+        """
+        self.save()
+        tmp = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez(tmp, chunk=np.array(self._chunk), **self.columns)
+        os.replace(tmp, self.path)
+        self._merged = self._chunk
+        for chunk_path in self.chunks_dir.glob("*.npz") if self.chunks_dir.exists() else []:
+            if int(chunk_path.stem.split(".")[0]) <= self._merged:
+                chunk_path.unlink(missing_ok=True)
+
+    def add(self, result, match_key, save=True):
+        """
+        Acrescenta os rounds de uma partida (ignorada se já incluída)
+
+        Args:
+            save: grava um chunk com esta partida; em lote, use save=False e chame save() no fim
+
+        Returns:
+            nº de rounds acrescentados ou None se já incluída
+        """
+        if match_key in self.match_keys:
+            return None
+        rounds = result.get("rounds", [])
+        self.match_keys.add(match_key)
+        if rounds:
+            part = {
+                "vectors": np.stack([round_vector(r, round_kills(result, r)) for r in rounds]),
+                "matches": np.full(len(rounds), match_key),
+                "numbers": np.array([r["number"] for r in rounds], dtype=np.int32),
+                "maps": np.full(len(rounds), result.get("mapName") or "unknown"),
+            }
+            self._parts.append(part)
+            self._pending.append(part)
+            self._columns = None
+            self._trees = {}
+            if save:
+                self.save()
+        return len(rounds)
+
+    def _scaled(self):
+        mean = self.vectors.mean(axis=0)
+        std = self.vectors.std(axis=0)
+        std[std == 0] = 1.0
+        return mean, std
+
+    def _tree(self, map_name):
+        if map_name not in self._trees:
+            mean, std = self._scaled()
+            rows = np.arange(len(self.vectors)) if map_name is None else np.flatnonzero(self.maps == map_name)
+            tree = BallTree((self.vectors[rows] - mean) / std * WEIGHTS)
+            self._trees[map_name] = (tree, rows, mean, std)
+        return self._trees[map_name]
+
+    def find(self, match_key, number):
+        rows = np.flatnonzero((self.matches == match_key) & (self.numbers == int(number)))
+        return int(rows[0]) if len(rows) else None
+
+    def similar(self, match_key, number, k=10, same_map=True):
+        """
+        Top-k rounds mais parecidos com um round do corpus
+
+        Returns:
+            lista de {match, round, map, distance} ou None se o round não existe
+        """
+        row = self.find(match_key, number)
+        if row is None:
+            return None
+        tree, rows, mean, std = self._tree(str(self.maps[row]) if same_map else None)
+        query = (self.vectors[row] - mean) / std * WEIGHTS
+        local = np.searchsorted(rows, row)
+        hits = tree.query(query, k, exclude=int(local))
+        return [
+            {
+                "match": str(self.matches[rows[i]]),
+                "round": int(self.numbers[rows[i]]),
+                "map": str(self.maps[rows[i]]),
+                "distance": round(d, 4),
+            }
+            for d, i in hits
+        ]
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Busca de rounds parecidos por vetor de features")
+    cli.add_argument("--store", default=DEFAULT_STORE)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Vetoriza resultados JSON do parse_demo")
+    add.add_argument("inputs", nargs="+")
+
+    query = sub.add_parser("query", help="Rounds mais parecidos com <partida> <round>")
+    query.add_argument("match")
+    query.add_argument("round", type=int)
+    query.add_argument("-k", type=int, default=10)
+    query.add_argument("--any-map", action="store_true", help="Busca em todos os mapas")
+    args = cli.parse_args()
+
+    store = RoundVectorStore(args.store)
+    if args.command == "add":
+        for path in collect_results(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            added = store.add(result, path.stem, save=False)
+            print(f"🧭 {path.name}: {'já incluída' if added is None else f'{added} rounds'}", file=sys.stderr)
+        store.save()
+    else:
+        hits = store.similar(args.match, args.round, args.k, same_map=not args.any_map)
+        if hits is None:
+            print(json.dumps({"error": "Round não encontrado"}), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
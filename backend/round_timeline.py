@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Timeline compacta por round: fases e eventos ordenados a partir do fim do freeze
+
+Cada round vira {"types": [...], "deltas": [...]} com inteiros: `types` são
+códigos de EVENT_TYPES e `deltas` são ticks desde o evento anterior (o primeiro
+conta a partir do round_freeze_end). O k-ésimo "kill" da timeline corresponde à
+k-ésima posição de rounds[i].killFeed (índices inteiros nos pools de
+result["killFeedPools"] + flags), de onde round_kills remonta o kill feed por
+extenso. Assim uma partida de 30 rounds ocupa poucos KB no JSON.
+"""
+
+import numpy as np
+
+from demo_events import assign_rounds
+
+
+# Códigos dos eventos (índice na tupla)
+EVENT_TYPES = ("kill", "plant", "defuse", "explode", "end", "officialEnd")
+_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+# Bits de rounds[].killFeed.flags (bit i = KILL_FLAGS[i])
+KILL_FLAGS = ("headshot", "opening", "trade", "traded", "attackerCT", "attackerT", "victimCT", "victimT")
+
+
+def _ticks(frame):
+    if frame is None or frame.empty or 'tick' not in frame.columns:
+        return np.zeros(0, dtype=np.int64)
+    return frame['tick'].to_numpy(dtype=np.int64)
+
+
+def build_timelines(end_ticks, start_ticks, frames, official_end_df=None):
+    """
+    Timeline delta-codificada de cada round
+
+    Args:
+        end_ticks: ticks de round_end (ordenados, um por round emitido)
+        start_ticks: início ao vivo de cada round (round_windows com freeze_end)
+        frames: dict com DataFrames de player_death, bomb_planted, bomb_defused e bomb_exploded
+        official_end_df: DataFrame de round_officially_ended (opcional)
+
+    Returns:
+        lista (alinhada a end_ticks) de {"types": [...], "deltas": [...]}
+    """
+    end_ticks = np.asarray(end_ticks, dtype=np.int64)
+    start_ticks = np.asarray(start_ticks, dtype=np.int64)
+    n_rounds = len(end_ticks)
+    if n_rounds == 0:
+        return []
+
+    ticks, codes, rounds = [], [], []
+    for name, kind in (("player_death", "kill"), ("bomb_planted", "plant"),
+                       ("bomb_defused", "defuse"), ("bomb_exploded", "explode")):
+        event_ticks = _ticks(frames.get(name))
+        idx = assign_rounds(event_ticks, end_ticks, start_ticks)
+        keep = idx >= 0
+        ticks.append(event_ticks[keep])
+        rounds.append(idx[keep])
+        codes.append(np.full(int(keep.sum()), _CODES[kind], dtype=np.int64))
+
+    ticks.append(end_ticks)
+    rounds.append(np.arange(n_rounds))
+    codes.append(np.full(n_rounds, _CODES["end"], dtype=np.int64))
+
+    # round_officially_ended: primeiro após o round_end e antes do início do próximo round
+    official = np.sort(_ticks(official_end_df))
+    if len(official):
+        next_start = np.concatenate([start_ticks[1:], [np.iinfo(np.int64).max]])
+        pos = np.searchsorted(official, end_ticks, side='left')
+        found = pos < len(official)
+        candidate = official[np.clip(pos, 0, len(official) - 1)]
+        found &= candidate < next_start
+        ticks.append(candidate[found])
+        rounds.append(np.flatnonzero(found))
+        codes.append(np.full(int(found.sum()), _CODES["officialEnd"], dtype=np.int64))
+
+    ticks = np.concatenate(ticks)
+    codes = np.concatenate(codes)
+    rounds = np.concatenate(rounds)
+    # Ordena por round, tick e código (kill antes de "end" no mesmo tick)
+    order = np.lexsort((codes, ticks, rounds))
+    ticks, codes, rounds = ticks[order], codes[order], rounds[order]
+
+    # Delta: primeiro evento relativo ao início ao vivo, demais ao anterior do mesmo round
+    previous = np.concatenate([[0], ticks[:-1]])
+    first = np.concatenate([[True], rounds[1:] != rounds[:-1]])
+    deltas = np.where(first, ticks - start_ticks[rounds], ticks - previous)
+
+    bounds = np.searchsorted(rounds, np.arange(n_rounds + 1))
+    return [
+        {"types": codes[a:b].tolist(), "deltas": deltas[a:b].tolist()}
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def decode_timeline(timeline, tickrate=64):
+    """
+    Expande uma timeline em [(evento, segundos desde o fim do freeze)]
+    """
+    offsets = np.cumsum(timeline.get("deltas", []))
+    return [(EVENT_TYPES[code], round(float(offset) / (tickrate or 64), 2))
+            for code, offset in zip(timeline.get("types", []), offsets)]
+
+
+def live_duration(timeline, tickrate=64):
+    """
+    Duração ao vivo do round (fim do freeze até o round_end), em segundos
+    """
+    offsets = np.cumsum(timeline.get("deltas", []))
+    ends = [offset for code, offset in zip(timeline.get("types", []), offsets) if code == _CODES["end"]]
+    return float(ends[0]) / (tickrate or 64) if ends else None
+
+
+def _side(flags, role):
+    if flags & (1 << KILL_FLAGS.index(f"{role}CT")):
+        return "CT"
+    if flags & (1 << KILL_FLAGS.index(f"{role}T")):
+        return "T"
+    return None
+
+
+def round_kills(result, round_info):
+    """
+    Kill feed de um round por extenso (tick, time, attacker, attackerSteamid,
+    attackerSide, victim..., weapon, headshot, opening, trade, traded)
+
+    Resultados antigos trazem rounds[].kills; os novos, rounds[].killFeed
+    alinhado aos kills da timeline (tick e tempo vêm dos deltas).
+
+    Returns:
+        lista de dicts ou None se o round não tem kill feed
+    """
+    if "kills" in round_info:
+        return round_info["kills"]
+    feed, timeline, pools = round_info.get("killFeed"), round_info.get("timeline"), result.get("killFeedPools")
+    if feed is None or not timeline or not pools:
+        return None
+    tickrate = result.get("tickrate") or 64
+    types = np.asarray(timeline.get("types", []), dtype=np.int64)
+    offsets = np.cumsum(timeline.get("deltas", []), dtype=np.int64)
+    ends = offsets[types == _CODES["end"]]
+    start = round_info["endTick"] - int(ends[0]) if len(ends) and round_info.get("endTick") is not None else 0
+    players, weapons = pools["players"], pools["weapons"]
+    kills = []
+    for offset, attacker, victim, weapon, flags in zip(
+        offsets[types == _CODES["kill"]].tolist(), feed["attackers"], feed["victims"], feed["weapons"], feed["flags"]
+    ):
+        attacker_id, attacker_name = players[attacker] if attacker >= 0 else (None, None)
+        victim_id, victim_name = players[victim] if victim >= 0 else (None, None)
+        kills.append({
+            "tick": start + offset,
+            "time": round(offset / tickrate, 2),
+            "attacker": attacker_name,
+            "attackerSteamid": attacker_id,
+            "attackerSide": _side(flags, "attacker"),
+            "victim": victim_name,
+            "victimSteamid": victim_id,
+            "victimSide": _side(flags, "victim"),
+            "weapon": weapons[weapon] if weapon >= 0 else None,
+            **{name: bool(flags & (1 << bit)) for bit, name in enumerate(KILL_FLAGS[:4])},
+        })
+    return kills
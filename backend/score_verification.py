@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Verificação automática de placar (CS2)
+Compara os rounds calculados com o placar do próprio jogo (props de time)
+amostrado em poucos ticks: intervalo, fim do tempo regulamentar e final
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from demo_events import pick_column, sides_from_team
+
+
+# Props de placar do time (por jogador, conforme o team_num de cada um)
+SCORE_PROPS = ["team_rounds_total", "team_num"]
+
+HALF_ROUNDS = 12
+REGULATION_ROUNDS = 24
+OT_HALF_ROUNDS = 3
+
+
+def starting_ct_side(round_number):
+    """
+    Lado do time que começou de CT no round informado
+    (mesma convenção de trocas usada no cálculo de scores do __main__)
+    """
+    if round_number <= HALF_ROUNDS:
+        return "CT"
+    if round_number <= REGULATION_ROUNDS:
+        return "T"
+    ot_period = (round_number - REGULATION_ROUNDS - 1) // OT_HALF_ROUNDS
+    return "CT" if ot_period % 2 == 0 else "T"
+
+
+def match_finished(rounds_data):
+    """
+    Verifica se algum time fechou a partida (13 no MR12 ou 4 num bloco de OT de 6 rounds)
+    """
+    total = len(rounds_data)
+    if total == 0:
+        return False
+    final = expected_scores(rounds_data, total)
+    if total <= REGULATION_ROUNDS:
+        return max(final.values()) == HALF_ROUNDS + 1
+    # Overtime: cada bloco de 6 rounds é um "MR3"; vence quem chega a 4 no bloco
+    block_size = 2 * OT_HALF_ROUNDS
+    block_start = REGULATION_ROUNDS + ((total - REGULATION_ROUNDS - 1) // block_size) * block_size
+    if block_start > REGULATION_ROUNDS:
+        before = expected_scores(rounds_data, block_start)
+        starter_before = before[starting_ct_side(block_start)]
+    else:
+        before = expected_scores(rounds_data, REGULATION_ROUNDS)
+        starter_before = before[starting_ct_side(REGULATION_ROUNDS)]
+    starter_now = final[starting_ct_side(total)]
+    starter_block = starter_now - starter_before
+    other_block = (total - block_start) - starter_block
+    return max(starter_block, other_block) == OT_HALF_ROUNDS + 1
+
+
+def expected_scores(rounds_data, upto):
+    """
+    Placar esperado por lado após o round `upto`, segundo os rounds calculados
+
+    Returns:
+        dict {"CT": x, "T": y} com o placar de cada time pelo lado em que está no round `upto`
+    """
+    rounds = [r for r in rounds_data if r['number'] <= upto]
+    starter_wins = sum(1 for r in rounds if r['winnerSide'] == starting_ct_side(r['number']))
+    starter_side = starting_ct_side(upto)
+    other_side = "T" if starter_side == "CT" else "CT"
+    return {starter_side: starter_wins, other_side: len(rounds) - starter_wins}
+
+
+def sample_game_scores(parser, ticks):
+    """
+    Uma única chamada esparsa a parse_ticks para ler o placar do jogo
+
+    Returns:
+        dict tick -> {"CT": score, "T": score} (apenas ticks com dados)
+    """
+    if not ticks:
+        return {}
+    try:
+        states = parser.parse_ticks(SCORE_PROPS, ticks=[int(t) for t in ticks])
+    except Exception as e:
+        print(f"⚠️  Não foi possível ler o placar do jogo: {e}", file=sys.stderr)
+        return {}
+    if states is None or len(states) == 0 or 'tick' not in states.columns:
+        return {}
+
+    score_col = pick_column(states, ['team_rounds_total', 'CCSTeam.m_iScore'])
+    team_col = pick_column(states, ['team_num'])
+    if score_col is None or team_col is None:
+        return {}
+
+    frame = pd.DataFrame({
+        'tick': states['tick'].to_numpy(dtype=np.int64),
+        'side': sides_from_team(states[team_col]),
+        'score': pd.to_numeric(states[score_col], errors='coerce'),
+    }).dropna()
+    frame = frame[frame['side'].isin(['CT', 'T'])]
+    table = frame.groupby(['tick', 'side'])['score'].max().unstack()
+
+    samples = {}
+    for tick, row in table.iterrows():
+        if 'CT' in row and 'T' in row and not (pd.isna(row['CT']) or pd.isna(row['T'])):
+            samples[int(tick)] = {"CT": int(row['CT']), "T": int(row['T'])}
+    return samples
+
+
+def verify_scores(parser, rounds_data, round_end_ticks, tickrate=64):
+    """
+    Compara o placar calculado com o do jogo no intervalo, no fim do tempo
+    regulamentar e no último round
+
+    Amostra 1s depois de cada round_end (o placar já foi atualizado e os
+    jogadores ainda não trocaram de lado).
+
+    Args:
+        parser: DemoParser já aberto
+        rounds_data: rounds emitidos por parse_demo
+        round_end_ticks: tick de fim de cada round emitido
+        tickrate: tickrate da demo
+
+    Returns:
+        dict com "ok", "checks" e "halves" (parciais por lado lidas do jogo,
+        apenas quando o checkpoint corresponde ao intervalo/fim real)
+    """
+    report = {"ok": True, "checks": [], "halves": {}}
+    total = len(rounds_data)
+    if total == 0:
+        return report
+
+    checkpoints = []
+    if total >= HALF_ROUNDS:
+        checkpoints.append(("halftime", HALF_ROUNDS))
+    if total >= REGULATION_ROUNDS:
+        checkpoints.append(("regulation", REGULATION_ROUNDS))
+    if total not in (HALF_ROUNDS, REGULATION_ROUNDS):
+        checkpoints.append(("final", total))
+
+    offset = int(tickrate or 64)
+    end_ticks = list(round_end_ticks)
+    sample_ticks = {}
+    for label, number in checkpoints:
+        end_tick = int(end_ticks[number - 1])
+        # Não ultrapassar o fim do round seguinte
+        limit = int(end_ticks[number]) - 1 if number < len(end_ticks) else end_tick + offset
+        sample_ticks[label] = min(end_tick + offset, limit)
+
+    game = sample_game_scores(parser, sorted(set(sample_ticks.values())))
+    if not game:
+        report["ok"] = None
+        print("⚠️  Placar do jogo indisponível - verificação ignorada", file=sys.stderr)
+        return report
+
+    for label, number in checkpoints:
+        tick = sample_ticks[label]
+        expected = expected_scores(rounds_data, number)
+        observed = game.get(tick)
+        check = {
+            "label": label,
+            "round": number,
+            "tick": tick,
+            "expected": expected,
+            "game": observed,
+            "ok": observed == expected if observed else None,
+        }
+        if observed and sum(observed.values()) != number:
+            # Número de rounds diferente: round fantasma ou faltando antes deste ponto
+            check["roundCountMismatch"] = sum(observed.values()) - number
+        report["checks"].append(check)
+        if check["ok"] is False:
+            report["ok"] = False
+
+    # Parciais por lado lidas do próprio jogo (para auto-correção)
+    by_label = {c["label"]: c for c in report["checks"]}
+    half = by_label.get("halftime")
+    if half and half["game"] and sum(half["game"].values()) == HALF_ROUNDS:
+        report["halves"]["first_half_ct"] = half["game"]["CT"]
+        report["halves"]["first_half_t"] = half["game"]["T"]
+        regulation = by_label.get("regulation")
+        if regulation and regulation["game"] and sum(regulation["game"].values()) == REGULATION_ROUNDS:
+            # No round 24 o time que começou CT está de T
+            report["halves"]["second_half_t"] = regulation["game"]["T"] - half["game"]["CT"]
+            report["halves"]["second_half_ct"] = regulation["game"]["CT"] - half["game"]["T"]
+
+    return report
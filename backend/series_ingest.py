@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Modo série (MD1/MD3/MD5): agrupa as demos de um confronto, parseia os mapas em
+paralelo e gera um documento único da série
+
+As demos são agrupadas pelo nome do arquivo (`time-a-vs-time-b-m1-mapa.dem`,
+`-m2-`, `-m3-`, inclusive .dem.gz/.bz2/.xz), com os times normalizados pelo
+registro de aliases. Uma data no nome (`2024-05-01` ou `20240501`) separa
+confrontos repetidos; sem data, um nº de mapa repetido (em ordem de modificação)
+abre uma nova série. Cada mapa roda num processo próprio, então a latência total
+fica próxima à do mapa mais lento. Depois do parse, os elencos de cada time são
+conferidos entre os mapas (times/lados trocados no nome do arquivo) e o placar
+da série é calculado a partir do vencedor de cada mapa.
+
+Uso:
+  python series_ingest.py demos/ [--out series/] [--workers N] [--best-of 3]
+  python parse_demo.py --series demos/
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from ingest_pipeline import DECOMPRESSORS, HASH_CHUNK, _parse_job, collect_demos
+from team_aliases import TeamAliasRegistry, normalize_team_key
+
+
+SERIES_PATTERN = re.compile(r"^(?P<a>.+?)-vs-(?P<b>.+?)-m(?P<number>\d+)(?:-(?P<map>[^.]+))?\.dem$", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"(?:^|[-_])(?P<date>\d{4}-\d{2}-\d{2}|\d{8})(?=[-_.]|$)")
+
+
+def demo_name(path):
+    """
+    Nome do arquivo sem o sufixo de compressão (furia-vs-navi-m1.dem.gz -> furia-vs-navi-m1.dem)
+    """
+    name = Path(path).name
+    suffix = Path(name).suffix.lower()
+    return name[: -len(suffix)] if suffix in DECOMPRESSORS else name
+
+
+def split_date(name):
+    """
+    (nome sem a data, data) - a data vira parte da chave da série
+    """
+    match = DATE_PATTERN.search(name)
+    if not match:
+        return name, None
+    date = match.group("date").replace("-", "")
+    stripped = (name[: match.start()] + name[match.end():]).lstrip("-_")
+    return stripped, f"{date[:4]}-{date[4:6]}-{date[6:]}"
+
+
+def _team_part(part):
+    # Remove o sufixo de lado (-ct / -t) usado nos nomes de arquivo
+    return re.sub(r"-(ct|t)$", "", part.strip().lower())
+
+
+def series_position(filename, registry=None):
+    """
+    (chave do confronto, nº do mapa) a partir do nome do arquivo, ou None;
+    a chave inclui a data do nome, se houver
+    """
+    name, date = split_date(demo_name(filename))
+    match = SERIES_PATTERN.match(name)
+    if not match:
+        return None
+    names = [_team_part(match.group(part)) for part in ("a", "b")]
+    if registry is not None:
+        names = [registry.lookup(name) or name for name in names]
+    matchup = "-vs-".join(sorted(normalize_team_key(name) for name in names))
+    return (f"{date}/{matchup}" if date else matchup), int(match.group("number"))
+
+
+def _split_repeats(maps):
+    # Em ordem de modificação, um nº de mapa já visto abre a próxima série do confronto
+    series = [[]]
+    for number, path in sorted(maps, key=lambda item: (Path(item[1]).stat().st_mtime, item[1])):
+        if any(number == seen for seen, _ in series[-1]):
+            series.append([])
+        series[-1].append((number, path))
+    return series
+
+
+def group_series(paths):
+    """
+    Agrupa demos por (diretório, data, confronto); confrontos repetidos sem data
+    são separados pelo nº de mapa repetido (chave#2, chave#3, ...)
+
+    Returns:
+        dict chave -> lista de (nº do mapa, caminho) ordenada
+    """
+    registry = TeamAliasRegistry()
+    groups = {}
+    for path in paths:
+        position = series_position(path, registry)
+        if position is None:
+            print(f"⚠️  {Path(path).name}: nome fora do padrão time-vs-time-mN - ignorada", file=sys.stderr)
+            continue
+        matchup, number = position
+        key = f"{Path(path).parent.name}/{matchup}" if Path(path).parent.name else matchup
+        groups.setdefault(key, []).append((number, str(path)))
+    series = {}
+    for key, maps in groups.items():
+        for occurrence, chunk in enumerate(_split_repeats(maps), start=1):
+            series[key if occurrence == 1 else f"{key}#{occurrence}"] = sorted(chunk)
+    return series
+
+
+def _series_job(demo_path):
+    """
+    Executado no pool de processos: descompacta (se preciso) num temporário e parseia
+    """
+    name = demo_name(demo_path)
+    opener = DECOMPRESSORS.get(Path(demo_path).suffix.lower())
+    if opener is None:
+        return _parse_job(demo_path, split_date(name)[0])
+    with tempfile.TemporaryDirectory(prefix="series-") as tmp_dir:
+        target = Path(tmp_dir) / name
+        with opener(demo_path, "rb") as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, HASH_CHUNK)
+        return _parse_job(str(target), split_date(name)[0])
+
+
+def _roster(result, side):
+    return {p["steamid"] for p in result.get("players", []) if p.get("startSide") == side and p.get("steamid")}
+
+
+def _map_winner(result):
+    a, b = result["teamA"], result["teamB"]
+    if a.get("score", 0) == b.get("score", 0):
+        return None
+    return a["name"] if a.get("score", 0) > b.get("score", 0) else b["name"]
+
+
+def assemble_series(key, maps, best_of=None):
+    """
+    Documento da série a partir dos resultados por mapa (já parseados)
+
+    Args:
+        maps: lista de (nº do mapa, caminho, saída do _parse_job)
+        best_of: MD da série; padrão inferido do maior nº de mapa (1, 3 ou 5)
+
+    Returns:
+        dict com times, placar, vencedor, mapas e avisos de consistência
+    """
+    warnings = []
+    numbers = [number for number, _, _ in maps]
+    if len(set(numbers)) != len(numbers):
+        warnings.append(f"Mapas repetidos na série: {sorted(numbers)}")
+    if sorted(set(numbers)) != list(range(1, max(numbers) + 1)):
+        warnings.append(f"Sequência de mapas incompleta: {sorted(numbers)}")
+    best_of = best_of or (1 if max(numbers) == 1 else 3 if max(numbers) <= 3 else 5)
+    needed = best_of // 2 + 1
+
+    teams = None
+    wins = {}
+    documents = []
+    map_names = []
+    # Elenco de cada time (steamids) visto nos mapas anteriores
+    rosters = {}
+    for number, path, outcome in maps:
+        entry = {"number": number, "file": Path(path).name}
+        if "error" in outcome:
+            warnings.append(f"Mapa {number} falhou: {outcome['error']}")
+            documents.append({**entry, "error": outcome["error"]})
+            continue
+        result = outcome["result"]
+        names = [result["teamA"]["name"], result["teamB"]["name"]]
+        if teams is None:
+            teams = names
+            wins = {name: 0 for name in teams}
+        elif set(names) != set(teams):
+            warnings.append(f"Mapa {number}: times {names} diferentes de {teams}")
+        if result["teamA"].get("side") == result["teamB"].get("side"):
+            warnings.append(f"Mapa {number}: os dois times começaram no lado {result['teamA'].get('side')}")
+        else:
+            # Entre mapas: o elenco que começou no lado declarado do time deve ser o
+            # mesmo dos mapas anteriores; se bate com o adversário, times/lados trocaram
+            current = {team["name"]: _roster(result, team.get("side")) for team in (result["teamA"], result["teamB"])}
+            for name, players in current.items():
+                other = next((rival for rival in current if rival != name), None)
+                known, rival_known = rosters.get(name, set()), rosters.get(other, set())
+                if players and len(players & rival_known) > len(players & known):
+                    warnings.append(f"Mapa {number}: elenco de {name} é o de {other} nos mapas anteriores "
+                                    f"(times/lados trocados no nome do arquivo?)")
+            for name, players in current.items():
+                rosters.setdefault(name, set()).update(players)
+        if result.get("partial"):
+            warnings.append(f"Mapa {number}: resultado parcial ({', '.join(result.get('partialReasons', []))})")
+        if result.get("mapName") in map_names:
+            warnings.append(f"Mapa {number}: {result.get('mapName')} já jogado nesta série")
+        map_names.append(result.get("mapName"))
+
+        winner = _map_winner(result)
+        if winner is None:
+            warnings.append(f"Mapa {number}: placar empatado")
+        elif any(count >= needed for count in wins.values()):
+            warnings.append(f"Mapa {number}: jogado depois da série decidida")
+        if winner in wins:
+            wins[winner] += 1
+        documents.append({
+            **entry,
+            "mapName": result.get("mapName"),
+            "winner": winner,
+            "score": {result["teamA"]["name"]: result["teamA"].get("score"),
+                      result["teamB"]["name"]: result["teamB"].get("score")},
+            "parseSeconds": round(outcome.get("elapsed", 0.0), 2),
+            "result": result,
+        })
+
+    series_winner = next((name for name, count in wins.items() if count >= needed), None)
+    return {
+        "series": key,
+        "teams": teams or [],
+        "bestOf": best_of,
+        "score": wins,
+        "winner": series_winner,
+        "complete": series_winner is not None,
+        "maps": documents,
+        "warnings": warnings,
+    }
+
+
+def parse_series(key, maps, workers=None, best_of=None):
+    """
+    Parseia os mapas de uma série em paralelo (um processo por mapa) e monta o documento
+    """
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers or len(maps)) as pool:
+        futures = [(number, path, pool.submit(_series_job, path)) for number, path in maps]
+        outcomes = [(number, path, future.result()) for number, path, future in futures]
+    document = assemble_series(key, outcomes, best_of)
+    document["elapsed"] = round(time.time() - start, 2)
+    document["slowestMap"] = max((m.get("parseSeconds", 0.0) for m in document["maps"]), default=0.0)
+    return document
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description="Modo série: parse paralelo dos mapas e resultado da série")
+    cli.add_argument("inputs", nargs="+", help="Demos ou pastas com demos")
+    cli.add_argument("--out", help="Grava <série>.json neste diretório (padrão: stdout)")
+    cli.add_argument("--workers", type=int, help="Processos por série (padrão: um por mapa)")
+    cli.add_argument("--best-of", type=int, choices=(1, 3, 5))
+    args = cli.parse_args(argv)
+
+    groups = group_series(collect_demos(args.inputs))
+    print(f"🏆 {len(groups)} série(s) encontrada(s)", file=sys.stderr)
+    for key, maps in groups.items():
+        print(f"🗺️  {key}: mapas {[number for number, _ in maps]}", file=sys.stderr)
+        document = parse_series(key, maps, args.workers, args.best_of)
+        for warning in document["warnings"]:
+            print(f"⚠️  {warning}", file=sys.stderr)
+        print(f"✅ {key}: {document['score']} → {document['winner'] or 'série incompleta'} "
+              f"em {document['elapsed']}s (mapa mais lento {document['slowestMap']}s)", file=sys.stderr)
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            target = Path(args.out) / (key.replace("/", "__") + ".json")
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+        else:
+            print(json.dumps(document, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import multer from 'multer';
 import fs from 'fs';
 import path from 'path';
 import { fileURLToPath } from 'url';
+import { spawn } from 'child_process';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -49,8 +50,62 @@ if (!fs.existsSync('uploads')) {
   fs.mkdirSync('uploads');
 }
 
+// Fila de parsing (SQLite): limita quantos parses rodam ao mesmo tempo
+// PARSE_WORKERS define quantos parse_demo.py podem rodar em paralelo (padrão: 1)
+const parseQueueScript = path.join(__dirname, 'parse_queue.py');
+const PARSE_WORKERS = process.env.PARSE_WORKERS || '1';
+
+function startParseWorkers() {
+  const workerProcess = spawn('python', [parseQueueScript, 'worker', '--workers', PARSE_WORKERS]);
+  workerProcess.stderr.on('data', (data) => {
+    console.error('Fila stderr:', data.toString());
+  });
+  workerProcess.on('close', (code) => {
+    // Jobs em andamento voltam para a fila (heartbeat expirado) quando o worker reinicia
+    console.error(`⚠️  Workers da fila terminaram (código ${code}) - reiniciando em 5s`);
+    setTimeout(startParseWorkers, 5000);
+  });
+}
+
+startParseWorkers();
+
+// Executa um comando do parse_queue.py e junta stdout/stderr
+function runQueueCommand(args) {
+  return new Promise((resolve, reject) => {
+    const queueProcess = spawn('python', [parseQueueScript, ...args]);
+    let stdout = '';
+    let stderr = '';
+    queueProcess.stdout.on('data', (data) => {
+      stdout += data.toString();
+    });
+    queueProcess.stderr.on('data', (data) => {
+      stderr += data.toString();
+      console.error('Python stderr:', data.toString());
+    });
+    queueProcess.on('error', reject);
+    queueProcess.on('close', (code) => resolve({ code, stdout, stderr }));
+  });
+}
+
+// Responde com o JSON impresso por um script Python (500 se a saída não for JSON válido)
+function sendPythonJson(res, output) {
+  let data;
+  try {
+    data = JSON.parse(output);
+  } catch (parseError) {
+    console.error('❌ Erro ao parsear JSON do Python:', parseError);
+    return res.status(500).json({
+      error: 'Erro ao parsear resultado do Python',
+      details: parseError.message,
+      output
+    });
+  }
+  res.json(data);
+}
+
 /**
  * Endpoint para fazer parsing de arquivo .dem usando script Python
+ * Com ?async=1 responde 202 com o jobId logo após enfileirar (acompanhar em /api/parse-jobs/:id)
  */
 app.post('/api/parse-demo', upload.single('demo'), async (req, res) => {
   const startTime = Date.now();
@@ -62,85 +117,105 @@ app.post('/api/parse-demo', upload.single('demo'), async (req, res) => {
   console.log('📂 Recebido arquivo:', req.file.originalname);
   console.log('📦 Tamanho:', (req.file.size / 1024 / 1024).toFixed(2), 'MB');
 
+  let jobId = null;
   try {
     const demoPath = req.file.path;
     const originalFilename = req.file.originalname;
     
-    // Executar script Python para processar a demo
-    console.log('🐍 Executando script Python...');
-    
-    const { spawn } = await import('child_process');
-    const pythonScript = path.join(__dirname, 'parse_demo.py');
-    
-    // Executar: python parse_demo.py <arquivo.dem> <nome_original.dem>
-    // Passar o nome original para que o Python possa extrair os nomes dos times
-    const pythonProcess = spawn('python', [pythonScript, demoPath, originalFilename]);
-    
-    let dataString = '';
-    let errorString = '';
-    
-    pythonProcess.stdout.on('data', (data) => {
-      dataString += data.toString();
-    });
-    
-    pythonProcess.stderr.on('data', (data) => {
-      errorString += data.toString();
-      console.error('Python stderr:', data.toString());
-    });
+    // Enfileirar o parse: python parse_queue.py submit <arquivo.dem> <nome_original.dem> --cleanup
+    // Passar o nome original para que o Python possa extrair os nomes dos times.
+    // O upload só é apagado pelo worker quando o job termina (done/failed), então
+    // um job devolvido à fila após reinício do servidor ainda encontra a demo
+    console.log('📥 Enfileirando demo para parsing...');
+    const priority = String(parseInt(req.body?.priority, 10) || 0);
+    const submitted = await runQueueCommand([
+      'submit', demoPath, originalFilename, '--priority', priority, '--cleanup'
+    ]);
+    if (submitted.code !== 0) {
+      throw new Error(submitted.stderr || 'Falha ao enfileirar demo');
+    }
+    try {
+      jobId = JSON.parse(submitted.stdout).jobId;
+    } catch (parseError) {
+      throw new Error(`Resposta inválida da fila: ${parseError.message}`);
+    }
+    console.log(`📥 Job ${jobId} enfileirado`);
+
+    if (req.query.async === '1' || req.body?.async === '1') {
+      return res.status(202).json({ success: true, jobId, status: 'queued' });
+    }
+
+    const outcome = await runQueueCommand(['wait', String(jobId)]);
+    if (outcome.code !== 0) {
+      console.error('❌ Python script falhou:', outcome.stderr);
+      return res.status(500).json({ 
+        error: 'Erro ao processar demo com Python',
+        details: outcome.stderr,
+        jobId
+      });
+    }
     
-    pythonProcess.on('close', (code) => {
-      // Limpar arquivo temporário
-      if (fs.existsSync(demoPath)) {
-        fs.unlinkSync(demoPath);
-      }
+    try {
+      // Parse do JSON retornado pelo Python
+      const matchData = JSON.parse(outcome.stdout);
       
-      if (code !== 0) {
-        console.error('❌ Python script falhou:', errorString);
-        return res.status(500).json({ 
-          error: 'Erro ao processar demo com Python',
-          details: errorString
-        });
-      }
+      const parseTime = ((Date.now() - startTime) / 1000).toFixed(2);
+      console.log(`✅ Parsing completo em ${parseTime}s`);
+      console.log(`📊 Total de rounds: ${matchData.rounds?.length || 0}`);
       
-      try {
-        // Parse do JSON retornado pelo Python
-        const matchData = JSON.parse(dataString);
-        
-        const parseTime = ((Date.now() - startTime) / 1000).toFixed(2);
-        console.log(`✅ Parsing completo em ${parseTime}s`);
-        console.log(`📊 Total de rounds: ${matchData.rounds?.length || 0}`);
-        
-        res.json({
-          success: true,
-          data: matchData,
-          parseTime: parseTime + 's'
-        });
-        
-      } catch (parseError) {
-        console.error('❌ Erro ao parsear JSON do Python:', parseError);
-        res.status(500).json({ 
-          error: 'Erro ao parsear resultado do Python',
-          details: parseError.message,
-          output: dataString
-        });
-      }
-    });
+      res.json({
+        success: true,
+        data: matchData,
+        parseTime: parseTime + 's',
+        jobId
+      });
+      
+    } catch (parseError) {
+      console.error('❌ Erro ao parsear JSON do Python:', parseError);
+      res.status(500).json({ 
+        error: 'Erro ao parsear resultado do Python',
+        details: parseError.message,
+        output: outcome.stdout,
+        jobId
+      });
+    }
 
   } catch (error) {
     console.error('❌ Erro:', error);
     
-    // Limpar arquivo temporário
-    if (req.file && fs.existsSync(req.file.path)) {
+    // Sem job na fila ninguém mais vai usar o upload
+    if (jobId === null && req.file && fs.existsSync(req.file.path)) {
       fs.unlinkSync(req.file.path);
     }
 
     res.status(500).json({ 
       error: 'Erro ao processar arquivo',
-      details: error.message 
+      details: error.message,
+      jobId
     });
   }
 });
 
+// Status de um job da fila de parsing
+// ?result=1 inclui o resultado do parse quando o job terminou (fluxo com ?async=1)
+app.get('/api/parse-jobs/:id', (req, res) => {
+  const statusArgs = [parseQueueScript, 'status', req.params.id];
+  if (req.query.result === '1') {
+    statusArgs.push('--result');
+  }
+  const statusProcess = spawn('python', statusArgs);
+  let dataString = '';
+  statusProcess.stdout.on('data', (data) => {
+    dataString += data.toString();
+  });
+  statusProcess.on('close', (code) => {
+    if (code !== 0) {
+      return res.status(404).json({ error: 'Job não encontrado' });
+    }
+    sendPythonJson(res, dataString);
+  });
+});
+
 // Endpoint de health check
 app.get('/api/health', (req, res) => {
   res.json({ 
@@ -150,6 +225,114 @@ app.get('/api/health', (req, res) => {
   });
 });
 
+// Métricas do parser (formato texto do Prometheus), gravadas pelos workers da fila
+const parseMetricsFile = process.env.PARSE_METRICS_FILE || path.join(__dirname, 'parse_metrics.prom');
+
+app.get('/api/metrics', (req, res) => {
+  fs.readFile(parseMetricsFile, 'utf8', (error, metrics) => {
+    if (error) {
+      return res.status(503).json({ error: 'Métricas indisponíveis (workers ainda não gravaram)' });
+    }
+    res.type('text/plain; version=0.0.4').send(metrics);
+  });
+});
+
+// Carreira de um jogador (SteamID ou nome) a partir do store colunar (player_careers.py)
+const playerCareersScript = path.join(__dirname, 'player_careers.py');
+
+app.get('/api/players/:id/career', (req, res) => {
+  const args = [playerCareersScript, 'show', req.params.id];
+  if (req.query.map) {
+    args.push('--map', String(req.query.map));
+  }
+  const careerProcess = spawn('python', args);
+  let dataString = '';
+  careerProcess.stdout.on('data', (data) => {
+    dataString += data.toString();
+  });
+  careerProcess.on('close', (code) => {
+    if (code !== 0) {
+      return res.status(404).json({ error: 'Jogador não encontrado' });
+    }
+    sendPythonJson(res, dataString);
+  });
+});
+
+// Jogadores de um time (comparação de times), a partir do mesmo store de carreiras
+app.get('/api/teams/:name/players', (req, res) => {
+  const args = [playerCareersScript, 'team', req.params.name];
+  if (req.query.map) {
+    args.push('--map', String(req.query.map));
+  }
+  const teamProcess = spawn('python', args);
+  let dataString = '';
+  teamProcess.stdout.on('data', (data) => {
+    dataString += data.toString();
+  });
+  teamProcess.on('close', (code) => {
+    if (code !== 0) {
+      return res.status(500).json({ error: 'Erro ao consultar jogadores do time' });
+    }
+    sendPythonJson(res, dataString);
+  });
+});
+
+// Rating Elo e agregados CT/T de um time (team_ratings.py)
+const teamRatingsScript = path.join(__dirname, 'team_ratings.py');
+
+app.get('/api/teams/:name/rating', (req, res) => {
+  const args = [teamRatingsScript, 'show', req.params.name];
+  if (req.query.map) {
+    args.push('--map', String(req.query.map));
+  }
+  const ratingProcess = spawn('python', args);
+  let dataString = '';
+  ratingProcess.stdout.on('data', (data) => {
+    dataString += data.toString();
+  });
+  ratingProcess.on('close', (code) => {
+    if (code !== 0) {
+      return res.status(404).json({ error: 'Time sem rating' });
+    }
+    sendPythonJson(res, dataString);
+  });
+});
+
+// Registro de aliases de times: correções de nome confirmadas no AdjustScores
+const teamAliasesScript = path.join(__dirname, 'team_aliases.py');
+
+app.post('/api/team-aliases', (req, res) => {
+  const { alias, team } = req.body || {};
+  if (!alias || !team) {
+    return res.status(400).json({ error: 'Informe alias e team' });
+  }
+  const learnProcess = spawn('python', [teamAliasesScript, 'learn', alias, team]);
+  let dataString = '';
+  let errorString = '';
+  learnProcess.stdout.on('data', (data) => {
+    dataString += data.toString();
+  });
+  learnProcess.stderr.on('data', (data) => {
+    errorString += data.toString();
+  });
+  learnProcess.on('close', (code) => {
+    if (code === 2) {
+      // Recusado: nome genérico ou alias que já é outro time (não funde times)
+      const lastLine = errorString.trim().split('\n').pop();
+      try {
+        return res.status(409).json(JSON.parse(lastLine));
+      } catch (e) {
+        return res.status(409).json({ error: 'Alias recusado' });
+      }
+    }
+    if (code !== 0) {
+      return res.status(500).json({ error: 'Erro ao registrar alias' });
+    }
+    console.log(`🏷️  Alias registrado: ${alias} → ${team}`);
+    sendPythonJson(res, dataString);
+  });
+});
+
 // Endpoint para atualizar scores/lados de um match (ajuste manual)
 // Este endpoint apenas faz ACK, a atualização real é feita pelo frontend no Supabase
 app.put('/api/matches/:id', async (req, res) => {
@@ -187,6 +370,7 @@ app.listen(PORT, '0.0.0.0', () => {
   console.log(`✅ Servidor rodando em http://localhost:${PORT}`);
   console.log(`📡 Endpoint: POST /api/parse-demo`);
   console.log(`💚 Health: GET /api/health`);
+  console.log(`📈 Métricas: GET /api/metrics`);
   console.log(`🌐 CORS: ${allowedOrigins.join(', ')}`);
   console.log('');
   console.log('🔥 Pronto para receber demos!');
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Workers de spool: vários processos (no mesmo host ou em hosts com o mesmo
+filesystem) disputam demos de um diretório via arquivos de lease atômicos
+
+Estrutura do spool:
+  incoming/  demos a processar (+ <demo>.config.json opcional)
+  leases/    <demo>.lease - criado com O_EXCL por quem pegou a demo
+  done/      <demo>.json com o resultado (demo e config movidos para cá)
+  failed/    <demo>.error.json após esgotar as tentativas
+  metrics/   <worker>.prom com as métricas de cada worker (formato Prometheus)
+
+Leases vencidos (worker morto) são devolvidos à fila por qualquer worker.
+
+Uso:
+  python spool_worker.py <spool_dir> [--workers N] [--once]
+  python spool_worker.py --simulate 20 --workers 4   (teste local, sem demos reais)
+  python parse_demo.py --spool <spool_dir> [--workers N] [--once]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import parse_metrics
+from parse_watchdog import parse_with_budget
+
+
+LEASE_SECONDS = float(os.environ.get("SPOOL_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.environ.get("SPOOL_MAX_ATTEMPTS", "3"))
+POLL_SECONDS = 2.0
+# Travas de lease são seguradas por milissegundos; mais velhas que isso são de um worker morto
+LOCK_STALE_SECONDS = 10.0
+
+
+class Spool:
+    """
+    Operações atômicas sobre o diretório de spool
+
+    Criar um lease é atômico (O_EXCL). Renovar, liberar e devolver um lease
+    vencido leem o dono e depois escrevem/apagam; essas três operações rodam
+    sob uma trava curta por demo (mkdir atômico, funciona também em NFS), então
+    um worker antigo nunca recria nem apaga o lease de quem o pegou depois.
+    """
+
+    def __init__(self, root, lease_seconds=LEASE_SECONDS):
+        self.root = Path(root)
+        self.lease_seconds = lease_seconds
+        self.incoming = self.root / "incoming"
+        self.leases = self.root / "leases"
+        self.done = self.root / "done"
+        self.failed = self.root / "failed"
+        for directory in (self.incoming, self.leases, self.done, self.failed):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def lease_path(self, demo_name):
+        return self.leases / f"{demo_name}.lease"
+
+    def lock_path(self, demo_name):
+        return self.leases / f"{demo_name}.lock"
+
+    def attempts_path(self, demo_name):
+        return self.leases / f"{demo_name}.attempts"
+
+    def attempts(self, demo_name):
+        """
+        Tentativas já feitas (persistidas entre workers quando um lease vence)
+        """
+        try:
+            return int(self.attempts_path(demo_name).read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def pending(self):
+        return sorted(
+            p for p in self.incoming.iterdir()
+            if p.is_file() and p.name.lower().endswith(".dem")
+        )
+
+    def _read_lease(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_lease(self, path, lease):
+        # Renovação: escreve num temporário e renomeia por cima (atômico)
+        tmp = path.with_name(f"{path.name}.{lease['worker']}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(lease, f)
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _locked(self, demo_name, wait=0.0):
+        """
+        Trava curta da demo; produz False se não conseguir dentro de `wait` segundos
+        """
+        path = self.lock_path(demo_name)
+        deadline = time.time() + wait
+        while True:
+            try:
+                os.mkdir(path)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - path.stat().st_mtime > LOCK_STALE_SECONDS:
+                        os.rmdir(path)  # trava de um worker que morreu segurando
+                        continue
+                except OSError:
+                    continue
+                if time.time() >= deadline:
+                    yield False
+                    return
+                time.sleep(0.05)
+        try:
+            yield True
+        finally:
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    def _owns(self, lease):
+        current = self._read_lease(self.lease_path(lease["demo"]))
+        return current is not None and current.get("token") == lease["token"]
+
+    def _expired(self, path, now):
+        lease = self._read_lease(path)
+        if lease is not None:
+            return lease, lease.get("expires_at", 0) < now
+        # Lease vazio/ilegível: worker morreu entre o O_EXCL e a escrita
+        try:
+            return None, path.stat().st_mtime + self.lease_seconds < now
+        except OSError:
+            return None, False
+
+    def claim(self, demo, worker):
+        """
+        Tenta criar o lease com O_EXCL; só um worker consegue
+
+        Returns:
+            dict do lease ou None se outro worker já tem a demo
+        """
+        path = self.lease_path(demo.name)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        lease = {
+            "demo": demo.name,
+            "worker": worker,
+            "token": uuid.uuid4().hex,
+            "attempts": self.attempts(demo.name) + 1,
+            "expires_at": time.time() + self.lease_seconds,
+        }
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(lease, f)
+        return lease
+
+    def renew(self, lease):
+        """
+        Estende o lease se ele ainda for deste worker
+
+        Returns:
+            False se o lease foi devolvido/pego por outro worker (parar o parse)
+        """
+        with self._locked(lease["demo"]) as locked:
+            if not locked:
+                return True  # outro worker mexendo agora; tenta no próximo ciclo
+            if not self._owns(lease):
+                return False
+            lease["expires_at"] = time.time() + self.lease_seconds
+            self._write_lease(self.lease_path(lease["demo"]), lease)
+            return True
+
+    def release(self, lease):
+        with self._locked(lease["demo"], wait=2.0) as locked:
+            if locked and self._owns(lease):
+                self.lease_path(lease["demo"]).unlink(missing_ok=True)
+
+    @contextmanager
+    def holding(self, lease):
+        """
+        Trava a demo e produz True se o lease ainda é deste worker (para gravar o resultado)
+        """
+        with self._locked(lease["demo"], wait=2.0) as locked:
+            yield locked and self._owns(lease)
+
+    def reclaim_expired(self, worker):
+        """
+        Devolve à fila leases vencidos; a trava da demo e a releitura do lease
+        garantem que um lease renovado nesse meio-tempo não seja apagado
+
+        Returns:
+            lista de nomes de demos devolvidas
+        """
+        reclaimed = []
+        now = time.time()
+        for path in self.leases.glob("*.lease"):
+            if not self._expired(path, now)[1]:
+                continue
+            demo_name = path.name[:-len(".lease")]
+            with self._locked(demo_name) as locked:
+                if not locked:
+                    continue  # outro worker chegou antes
+                lease, expired = self._expired(path, time.time())
+                if not expired:
+                    continue
+                attempts = int(lease.get("attempts", 1)) if lease else self.attempts(demo_name) + 1
+                self.attempts_path(demo_name).write_text(str(attempts))
+                path.unlink(missing_ok=True)
+            owner = lease.get("worker") if lease else "?"
+            print(f"♻️  [{worker}] Lease vencido de {owner} para {demo_name} - devolvendo", file=sys.stderr)
+            reclaimed.append(demo_name)
+        return reclaimed
+
+    def finish(self, demo, result):
+        target = self.done / f"{demo.name}.json"
+        tmp = target.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(result)
+        os.replace(tmp, target)
+        self._archive(demo, self.done)
+        return target
+
+    def fail(self, demo, error):
+        target = self.failed / f"{demo.name}.error.json"
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump({"demo": demo.name, "error": error}, f, ensure_ascii=False)
+        self._archive(demo, self.failed)
+        return target
+
+    def _archive(self, demo, directory):
+        self.attempts_path(demo.name).unlink(missing_ok=True)
+        config = demo.with_name(demo.name + ".config.json")
+        if config.exists():
+            os.replace(config, directory / config.name)
+        if demo.exists():
+            os.replace(demo, directory / demo.name)
+
+
+def process_demo(spool, demo, lease, worker, parse=parse_with_budget):
+    """
+    Parse supervisionado (watchdog), renovando o lease enquanto roda
+    """
+    last_renew = [time.time()]
+
+    def renew():
+        if time.time() - last_renew[0] >= spool.lease_seconds / 3:
+            if not spool.renew(lease):
+                return False
+            last_renew[0] = time.time()
+        return True
+
+    print(f"🐍 [{worker}] Processando {demo.name} (tentativa {lease['attempts']})", file=sys.stderr)
+    # O parse roda com o caminho dentro de incoming/, então o .config.json ao lado é usado
+    run = parse(demo, demo.name, on_poll=renew)
+    with spool.holding(lease) as owned:
+        if not owned:
+            # Lease vencido e pego por outro worker: o resultado fica com ele
+            print(f"⚠️  [{worker}] Lease de {demo.name} perdido - descartando resultado", file=sys.stderr)
+            return False
+        parse_metrics.observe_run(run, demo)
+        if run["returncode"] == 0:
+            target = spool.finish(demo, run["stdout"])
+            print(f"✅ [{worker}] {demo.name} → {target}", file=sys.stderr)
+            return True
+        error = run["stderr"][-4000:] or f"Processo terminou com código {run['returncode']}"
+        spool.fail(demo, error)
+    print(f"❌ [{worker}] {demo.name} falhou (código {run['returncode']})", file=sys.stderr)
+    return False
+
+
+def worker_loop(root, worker, once=False, lease_seconds=LEASE_SECONDS, parse=parse_with_budget):
+    """
+    Loop de um worker: reclama leases vencidos, disputa a próxima demo e processa
+    """
+    spool = Spool(root, lease_seconds)
+    # Um arquivo por worker (label worker=...), pronto para o textfile collector
+    parse_metrics.REGISTRY.const_labels["worker"] = worker
+    metrics_file = spool.root / "metrics" / f"{worker}.prom"
+    metrics_file.parent.mkdir(exist_ok=True)
+    while True:
+        spool.reclaim_expired(worker)
+
+        claimed = False
+        for demo in spool.pending():
+            lease = spool.claim(demo, worker)
+            if lease is None:
+                continue
+            claimed = True
+            try:
+                if not demo.exists():
+                    continue  # outro worker terminou entre a listagem e o lease
+                if lease["attempts"] > MAX_ATTEMPTS:
+                    spool.fail(demo, f"Esgotadas {MAX_ATTEMPTS} tentativas (worker interrompido)")
+                    continue
+                process_demo(spool, demo, lease, worker, parse)
+            finally:
+                spool.release(lease)
+                parse_metrics.QUEUE_DEPTH.set(len(spool.pending()))
+                parse_metrics.REGISTRY.dump(metrics_file)
+            break
+
+        if not claimed:
+            if once and not any(spool.leases.glob("*.lease")):
+                return
+            time.sleep(POLL_SECONDS)
+
+
+def run_workers(root, workers=1, once=False):
+    """
+    Sobe N processos worker independentes (mesmo host)
+    """
+    host = socket.gethostname()
+    names = [f"{host}-{os.getpid()}-w{i + 1}" for i in range(max(1, workers))]
+    print(f"🚀 Spool {root}: {len(names)} worker(s)", file=sys.stderr)
+    if len(names) == 1:
+        worker_loop(root, names[0], once)
+        return
+    processes = [multiprocessing.Process(target=worker_loop, args=(root, name, once)) for name in names]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+def _simulated_parse(demo, original_name=None, on_poll=None):
+    """
+    Parse falso da simulação: dorme chamando on_poll como o watchdog; a primeira
+    demo "stall-*" trava sem renovar o lease (worker congelado)
+    """
+    stall_marker = Path(demo).parent.parent / "stalled"
+    if Path(demo).name.startswith("stall-") and not stall_marker.exists():
+        stall_marker.touch()
+        time.sleep(_simulated_parse.lease_seconds * 3)
+    deadline = time.time() + random.uniform(0.2, 0.8)
+    while time.time() < deadline:
+        if on_poll and on_poll() is False:
+            return {"returncode": -9, "stdout": "", "stderr": "", "reason": "cancelled",
+                    "elapsed": 0.0, "peak_rss_mb": 0.0, "partial": False}
+        time.sleep(0.05)
+    result = {"rounds": [], "worker": os.getpid()}
+    return {"returncode": 0, "stdout": json.dumps(result), "stderr": "", "reason": None,
+            "elapsed": 0.0, "peak_rss_mb": 0.0, "partial": False}
+
+
+def _simulation_worker(root, worker, lease_seconds, log_path):
+    # Registra cada resultado gravado para conferir que nenhuma demo foi concluída duas vezes
+    finish = Spool.finish
+
+    def logged_finish(spool, demo, result):
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(f"{demo.name} {worker}\n")
+        return finish(spool, demo, result)
+
+    Spool.finish = logged_finish
+    _simulated_parse.lease_seconds = lease_seconds
+    worker_loop(root, worker, once=True, lease_seconds=lease_seconds, parse=_simulated_parse)
+
+
+def simulate(root, demos=20, workers=4, lease_seconds=1.0):
+    """
+    Simulação local do modo spool: N workers, um deles morto no meio de um parse
+    e outro congelado além do lease; confere que toda demo termina exatamente uma vez
+
+    Returns:
+        True se o spool terminou consistente
+    """
+    global POLL_SECONDS
+    POLL_SECONDS = 0.2
+    spool = Spool(root, lease_seconds)
+    for i in range(demos):
+        prefix = "stall-" if i == 0 else "demo-"
+        (spool.incoming / f"{prefix}{i:03d}.dem").write_bytes(b"")
+    log_path = spool.root / "finished.log"
+    names = [f"sim-w{i + 1}" for i in range(max(2, workers))]
+    processes = [multiprocessing.Process(target=_simulation_worker, args=(root, name, lease_seconds, log_path))
+                 for name in names]
+    start = time.time()
+    for process in processes:
+        process.start()
+    time.sleep(lease_seconds / 2)
+    print(f"💥 Matando {names[-1]} no meio do parse", file=sys.stderr)
+    processes[-1].kill()
+    for process in processes[:-1]:
+        process.join()
+
+    finished = Path(log_path).read_text(encoding="utf-8").split() if Path(log_path).exists() else []
+    counts = {}
+    for name in finished[::2]:
+        counts[name] = counts.get(name, 0) + 1
+    duplicated = sorted(name for name, count in counts.items() if count > 1)
+    done = len(list(spool.done.glob("*.dem.json")))
+    leftover = len(spool.pending()) + len(list(spool.failed.iterdir())) + len(list(spool.leases.glob("*.lease")))
+    ok = done == demos and not duplicated and leftover == 0
+    print(f"{'✅' if ok else '❌'} {done}/{demos} demos concluídas em {time.time() - start:.1f}s, "
+          f"duplicadas: {duplicated or 'nenhuma'}, sobras: {leftover}", file=sys.stderr)
+    return ok
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description="Workers de parsing sobre diretório de spool")
+    cli.add_argument("spool_dir", nargs="?", help="Diretório do spool (na simulação, padrão: temporário)")
+    cli.add_argument("--workers", type=int, default=1)
+    cli.add_argument("--once", action="store_true", help="Sai quando o spool esvaziar")
+    cli.add_argument("--simulate", type=int, metavar="N",
+                     help="Teste local: N demos falsas, workers concorrentes, um morto e um congelado")
+    args = cli.parse_args(argv)
+    if args.simulate:
+        root = args.spool_dir or tempfile.mkdtemp(prefix="spool-sim-")
+        sys.exit(0 if simulate(root, args.simulate, max(args.workers, 3)) else 1)
+    if not args.spool_dir:
+        cli.error("informe o diretório do spool")
+    run_workers(args.spool_dir, args.workers, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Estado dos jogadores amostrado em poucos ticks (CS2)
+Sobreviventes (HP, colete e equipamento) nos ticks de round_end e economia
+de cada lado no início ao vivo do round
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from demo_events import pick_column, sides_from_team
+from score_verification import starting_ct_side
+
+
+# Props amostradas por jogador no tick de fim de round
+SURVIVOR_PROPS = ["health", "armor_value", "current_equip_value", "is_alive", "team_num"]
+# Props amostradas no início ao vivo de cada round (valor do equipamento comprado)
+ECONOMY_PROPS = ["current_equip_value", "team_num"]
+
+
+def sample_survivors(parser, end_ticks, roster=None):
+    """
+    Faz uma única chamada esparsa a parse_ticks com todos os ticks de fim de round
+
+    Args:
+        parser: DemoParser já aberto
+        end_ticks: tick de fim de cada round emitido
+        roster: dict opcional preenchido com o lado de cada jogador (ver player_sides)
+
+    Returns:
+        lista (alinhada aos rounds) de listas de sobreviventes
+        [{"steamid", "name", "side", "hp", "armor", "equipValue"}, ...]
+    """
+    per_round = [[] for _ in end_ticks]
+    if not len(end_ticks):
+        return per_round
+
+    try:
+        states = parser.parse_ticks(SURVIVOR_PROPS, ticks=[int(t) for t in end_ticks])
+    except Exception as e:
+        print(f"⚠️  Não foi possível amostrar sobreviventes: {e}", file=sys.stderr)
+        return per_round
+
+    if states is None or len(states) == 0 or 'tick' not in states.columns:
+        return per_round
+    if roster is not None:
+        roster.update(player_sides(states, end_ticks))
+    return survivors_from_states(states, end_ticks)
+
+
+def player_sides(states, end_ticks):
+    """
+    Lado de cada jogador (team_num) nos ticks de fim de round, vivo ou morto
+
+    Returns:
+        dict steamid -> {"name", "startSide", "ctRounds", "tRounds"}; startSide é o
+        lado do time do jogador no 1º round (trocas do intervalo/overtime desfeitas)
+    """
+    team_col = pick_column(states, ['team_num'])
+    if team_col is None or 'steamid' not in states.columns:
+        return {}
+    end_ticks = np.asarray(end_ticks, dtype=np.int64)
+    ticks = states['tick'].to_numpy(dtype=np.int64)
+    pos = np.searchsorted(end_ticks, ticks)
+    valid = (pos < len(end_ticks)) & (end_ticks[np.clip(pos, 0, len(end_ticks) - 1)] == ticks)
+    frame = pd.DataFrame({
+        'round_idx': pos,
+        'steamid': states['steamid'].astype(str).to_numpy(),
+        'name': states['name'].to_numpy(dtype=object) if 'name' in states.columns else None,
+        'side': sides_from_team(states[team_col]),
+    })[valid]
+    frame = frame[frame['side'].isin(['CT', 'T']) & ~frame['steamid'].isin(['', '0', 'None', 'nan'])]
+    if frame.empty:
+        return {}
+
+    starter_side = np.array([starting_ct_side(i + 1) for i in range(len(end_ticks))], dtype=object)
+    frame = frame.assign(
+        ct=frame['side'] == 'CT',
+        starter=frame['side'].to_numpy() == starter_side[frame['round_idx'].to_numpy()],
+    )
+    grouped = frame.groupby('steamid', sort=False)
+    summary = grouped.agg(name=('name', 'last'), ct=('ct', 'sum'), rounds=('ct', 'size'), starter=('starter', 'sum'))
+    return {
+        steamid: {
+            "name": row.name if row.name is not None else steamid,
+            # Maioria dos rounds amostrados (robusto a uma amostra ruim)
+            "startSide": "CT" if 2 * row.starter >= row.rounds else "T",
+            "ctRounds": int(row.ct),
+            "tRounds": int(row.rounds - row.ct),
+        }
+        for steamid, row in summary.iterrows()
+    }
+
+
+def _int_column(df, column):
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=int)
+    return pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int).to_numpy()
+
+
+def survivors_from_states(states, end_ticks):
+    """
+    Converte o frame de parse_ticks na lista compacta de sobreviventes por round
+    """
+    per_round = [[] for _ in end_ticks]
+    health_col = pick_column(states, ['health'])
+    if health_col is None:
+        return per_round
+
+    health = pd.to_numeric(states[health_col], errors='coerce').fillna(0)
+    alive = health > 0
+    if 'is_alive' in states.columns:
+        alive &= states['is_alive'].fillna(True).astype(bool)
+    survivors = states[alive]
+    if survivors.empty:
+        return per_round
+
+    # Tick amostrado -> índice do round (ticks de fim são únicos e ordenados)
+    end_ticks = np.asarray(end_ticks, dtype=np.int64)
+    pos = np.searchsorted(end_ticks, survivors['tick'].to_numpy(dtype=np.int64))
+    valid = (pos < len(end_ticks)) & (end_ticks[np.clip(pos, 0, len(end_ticks) - 1)] == survivors['tick'].to_numpy())
+
+    team_col = pick_column(survivors, ['team_num'])
+    frame = pd.DataFrame({
+        'round_idx': pos,
+        'steamid': survivors['steamid'].astype(str).to_numpy() if 'steamid' in survivors.columns else None,
+        'name': survivors['name'].to_numpy(dtype=object) if 'name' in survivors.columns else None,
+        'side': sides_from_team(survivors[team_col]) if team_col else None,
+        'hp': health[alive].astype(int).to_numpy(),
+        'armor': _int_column(survivors, 'armor_value'),
+        'equipValue': _int_column(survivors, 'current_equip_value'),
+    })[valid]
+
+    for round_idx, group in frame.groupby('round_idx'):
+        per_round[int(round_idx)] = group.drop(columns='round_idx').to_dict('records')
+    return per_round
+
+
+def sample_economy(parser, start_ticks):
+    """
+    Valor total de equipamento por lado no início ao vivo de cada round
+    (uma única chamada esparsa a parse_ticks)
+
+    Returns:
+        lista (alinhada aos rounds) de {"CT": valor, "T": valor} ou None sem dados
+    """
+    per_round = [None] * len(start_ticks)
+    if not len(start_ticks):
+        return per_round
+
+    try:
+        states = parser.parse_ticks(ECONOMY_PROPS, ticks=[int(t) for t in start_ticks])
+    except Exception as e:
+        print(f"⚠️  Não foi possível amostrar a economia: {e}", file=sys.stderr)
+        return per_round
+
+    team_col = pick_column(states, ['team_num']) if states is not None else None
+    if team_col is None or len(states) == 0 or 'tick' not in states.columns:
+        return per_round
+
+    frame = pd.DataFrame({
+        'tick': states['tick'].to_numpy(dtype=np.int64),
+        'side': sides_from_team(states[team_col]),
+        'value': _int_column(states, 'current_equip_value'),
+    })
+    totals = frame[frame['side'].isin(['CT', 'T'])].groupby(['tick', 'side'])['value'].sum().unstack(fill_value=0)
+    for i, tick in enumerate(np.asarray(start_ticks, dtype=np.int64)):
+        if tick in totals.index:
+            row = totals.loc[tick]
+            per_round[i] = {"CT": int(row.get('CT', 0)), "T": int(row.get('T', 0))}
+    return per_round
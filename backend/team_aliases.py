@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Registro de aliases de times (identidade única por time)
+
+"Imperial", "imperial-esports" e "Imperial E" viram o mesmo time. Cada nome é
+reduzido a uma chave normalizada (sem acentos, pontuação e sufixos como
+"esports"/"gaming"), que resolve em O(1) num dicionário; nomes sem chave exata
+caem num índice de trigramas (O(k) candidatos) com similaridade de Dice.
+
+O registro é um log append-only (team_aliases.ndjson) de pares alias → time,
+seguro para vários workers anexando ao mesmo tempo; cada processo recarrega só
+as linhas novas. Resolver um nome nunca grava nada: o log só cresce por `learn`,
+com correções confirmadas na tela AdjustScores. Um alias que já é o nome de um
+time cadastrado é recusado (corrigir uma partida não pode fundir dois times).
+
+Uso:
+  python team_aliases.py resolve "imperial-esports"
+  python team_aliases.py learn "Imperial E" "Imperial"
+  python team_aliases.py list
+  python team_aliases.py reresolve parsed/ [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+from kill_index import collect_results
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_ALIASES_FILE = os.environ.get("TEAM_ALIASES_FILE", str(BACKEND_DIR / "team_aliases.ndjson"))
+# Palavras que não distinguem times ("Imperial Esports" == "Imperial")
+NOISE_TOKENS = {"esports", "esport", "e", "gaming", "team", "club", "gg", "clan", "org"}
+# Similaridade mínima (Dice sobre trigramas) para aceitar um candidato aproximado
+MIN_SIMILARITY = 0.75
+# Nomes genéricos do parse_demo quando não há config nem nome de arquivo
+PLACEHOLDER_PATTERN = re.compile(r"^\s*(team|time)[\s_-]*[ab12]\s*$", re.IGNORECASE)
+
+
+def normalize_team_key(name):
+    """
+    Chave canônica de um nome: minúsculas, sem acentos/pontuação, sem sufixos de organização
+    """
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = re.findall(r"[a-z0-9]+", text)
+    meaningful = [token for token in tokens if token not in NOISE_TOKENS]
+    return "".join(meaningful or tokens)
+
+
+def is_placeholder(name):
+    return not name or bool(PLACEHOLDER_PATTERN.match(str(name)))
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TeamAliasRegistry:
+    """
+    Índices em memória (chave → time, trigrama → chaves) sobre o log de aliases
+    """
+
+    def __init__(self, path=DEFAULT_ALIASES_FILE):
+        self.path = Path(path)
+        self.by_key = {}
+        self.grams = defaultdict(set)
+        self.aliases = defaultdict(set)
+        self._offset = 0
+        self.refresh()
+
+    def refresh(self):
+        """
+        Aplica as linhas anexadas ao log desde a última leitura (outros processos)
+        """
+        if not self.path.exists() or self.path.stat().st_size == self._offset:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # linha ainda sendo escrita
+                self._offset += len(line.encode("utf-8"))
+                if line.strip():
+                    entry = json.loads(line)
+                    self._apply(entry["alias"], entry["team"])
+
+    def _canonical(self, team):
+        # Se o time informado já é alias de outro, segue até a raiz
+        return self.by_key.get(normalize_team_key(team), team)
+
+    def _is_other_team(self, key, team):
+        # A chave é o nome de um time cadastrado diferente de `team`?
+        current = self.by_key.get(key)
+        return current is not None and current != team and normalize_team_key(current) == key
+
+    def _apply(self, alias, team):
+        if is_placeholder(alias) or is_placeholder(team):
+            return
+        team = self._canonical(team)
+        key = normalize_team_key(alias)
+        if not key or self._is_other_team(key, team):
+            # Linhas antigas que fundiriam dois times são ignoradas
+            return
+        previous = self.by_key.get(key)
+        if previous and previous != team:
+            # Só esta grafia muda de time; os demais aliases do time antigo ficam
+            self.aliases[previous] = {name for name in self.aliases[previous] if normalize_team_key(name) != key}
+        self.by_key[key] = team
+        self.aliases[team].update({alias, team})
+        team_key = normalize_team_key(team)
+        self.by_key.setdefault(team_key, team)
+        for indexed in (key, team_key):
+            for gram in trigrams(indexed):
+                self.grams[gram].add(indexed)
+
+    def _append(self, alias, team):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"alias": alias, "team": team}, ensure_ascii=False) + "\n")
+
+    def lookup(self, name):
+        """
+        Time canônico de um nome ou None (chave exata, depois trigramas)
+        """
+        self.refresh()
+        key = normalize_team_key(name)
+        if not key:
+            return None
+        if key in self.by_key:
+            return self.by_key[key]
+        query = trigrams(key)
+        counts = defaultdict(int)
+        for gram in query:
+            for candidate in self.grams.get(gram, ()):
+                counts[candidate] += 1
+        best, score = None, 0.0
+        for candidate, shared in counts.items():
+            dice = 2.0 * shared / (len(query) + len(trigrams(candidate)))
+            if dice > score:
+                best, score = candidate, dice
+        return self.by_key[best] if best and score >= MIN_SIMILARITY else None
+
+    def resolve(self, name):
+        """
+        Resolve um nome para o time canônico (somente leitura; nomes desconhecidos voltam iguais)
+        """
+        if is_placeholder(name):
+            return name
+        return self.lookup(name) or name
+
+    def learn(self, alias, team):
+        """
+        Registra alias → time (correção confirmada); grava no log e aplica
+
+        Raises:
+            ValueError: nome genérico ou alias que já é outro time cadastrado
+        """
+        if is_placeholder(alias) or is_placeholder(team):
+            raise ValueError(f"Nome genérico não vira alias: {alias} → {team}")
+        self.refresh()
+        key = normalize_team_key(alias)
+        if not key:
+            raise ValueError(f"Nome sem caracteres válidos: {alias}")
+        if self._is_other_team(key, self._canonical(team)):
+            raise ValueError(f"{alias} já é o time {self.by_key[key]} - corrija a partida sem criar alias")
+        self._append(alias, team)
+        # Relê o log (a própria linha e as de outros processos) em ordem
+        self.refresh()
+        return self.by_key[normalize_team_key(alias)]
+
+    def resolve_result(self, result):
+        """
+        Reescreve teamA/teamB.name de um resultado do parse_demo
+
+        Returns:
+            lista de (antigo, novo) para os nomes alterados
+        """
+        changes = []
+        for side in ("teamA", "teamB"):
+            team = result.get(side) or {}
+            name = team.get("name")
+            resolved = self.resolve(name)
+            if resolved and resolved != name:
+                team["name"] = resolved
+                changes.append((name, resolved))
+        return changes
+
+    def teams(self):
+        return {team: sorted(aliases - {team}) for team, aliases in sorted(self.aliases.items())}
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Registro de aliases de times")
+    cli.add_argument("--file", default=DEFAULT_ALIASES_FILE)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    resolve = sub.add_parser("resolve", help="Time canônico de um nome")
+    resolve.add_argument("name")
+
+    learn = sub.add_parser("learn", help="Registra um alias confirmado")
+    learn.add_argument("alias")
+    learn.add_argument("team")
+
+    sub.add_parser("list", help="Times e seus aliases")
+
+    reresolve = sub.add_parser("reresolve", help="Reaplica o registro a resultados JSON já gravados")
+    reresolve.add_argument("inputs", nargs="+")
+    reresolve.add_argument("--dry-run", action="store_true")
+    args = cli.parse_args()
+
+    registry = TeamAliasRegistry(args.file)
+    if args.command == "resolve":
+        print(json.dumps({"name": args.name, "team": registry.resolve(args.name)}, ensure_ascii=False))
+    elif args.command == "learn":
+        try:
+            team = registry.learn(args.alias, args.team)
+        except ValueError as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(2)
+        print(f"🏷️  {args.alias} → {team}", file=sys.stderr)
+        print(json.dumps({"alias": args.alias, "team": team}, ensure_ascii=False))
+    elif args.command == "list":
+        print(json.dumps(registry.teams(), ensure_ascii=False, indent=2))
+    else:
+        renames = {}
+        for path in collect_results(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            changes = registry.resolve_result(result)
+            if not changes:
+                continue
+            renames.update(changes)
+            print(f"🏷️  {path.name}: " + ", ".join(f"{old} → {new}" for old, new in changes), file=sys.stderr)
+            if not args.dry_run:
+                tmp = path.with_suffix(".json.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, path)
+        # Mapa antigo → novo para aplicar também à tabela teams do Supabase
+        print(json.dumps(renames, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
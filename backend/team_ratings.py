@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Agregados incrementais por time: rating Elo (geral e por mapa), win rate de
+rounds CT/T por mapa (janela móvel das últimas partidas) e pistol rounds
+
+Cada partida nova é resumida numa linha do log append-only (ratings_log.ndjson)
+e aplicada ao estado em O(1) (dois times, somas móveis). O log é a fonte da
+verdade: o snapshot (team_ratings.json) só guarda o estado dos times e até que
+byte do log ele cobre, e é regravado a cada SNAPSHOT_EVERY partidas; ao abrir,
+só os bytes posteriores são lidos e reaplicados. As chaves das partidas já
+vistas ficam fora do snapshot e só são lidas do log quando `add` precisa delas;
+`show` abre em modo somente leitura (não grava nem cria o diretório). Tudo é
+recalculado do zero com `rebuild` ou quando SCHEMA_VERSION muda.
+
+Uso:
+  python team_ratings.py add <resultado.json|pasta> [...] [--dir ratings/]
+  python team_ratings.py show [time] [--map mirage]
+  python team_ratings.py rebuild
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from collections import deque
+from pathlib import Path
+
+from kill_index import collect_results
+from score_verification import HALF_ROUNDS, starting_ct_side
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_RATINGS_DIR = os.environ.get("TEAM_RATINGS_DIR", str(BACKEND_DIR / "ratings"))
+SCHEMA_VERSION = 2
+# Partidas novas entre duas gravações do snapshot (o log cobre o intervalo)
+SNAPSHOT_EVERY = 50
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+# Partidas consideradas na win rate móvel por mapa e lado
+ROLLING_MATCHES = 10
+PISTOL_ROUNDS = (1, HALF_ROUNDS + 1)
+
+
+def summarize_match(result, match_key):
+    """
+    Resumo compacto de uma partida (o que vai para o log append-only)
+
+    Returns:
+        dict ou None se a partida não tem rounds/times
+    """
+    rounds = result.get("rounds", [])
+    team_a = result.get("teamA", {})
+    team_b = result.get("teamB", {})
+    if not rounds or not team_a.get("name") or not team_b.get("name") or team_a["name"] == team_b["name"]:
+        return None
+    starter, other = (team_a, team_b) if team_a.get("side", "CT") == "CT" else (team_b, team_a)
+
+    teams = {
+        name: {"ctWon": 0, "ctPlayed": 0, "tWon": 0, "tPlayed": 0, "pistolWon": 0, "pistolPlayed": 0, "rounds": 0}
+        for name in (starter["name"], other["name"])
+    }
+    for round_info in rounds:
+        number = round_info["number"]
+        starter_side = starting_ct_side(number)
+        sides = {starter["name"]: starter_side, other["name"]: "T" if starter_side == "CT" else "CT"}
+        for name, side in sides.items():
+            won = round_info.get("winnerSide") == side
+            key = "ct" if side == "CT" else "t"
+            teams[name][f"{key}Played"] += 1
+            teams[name][f"{key}Won"] += int(won)
+            teams[name]["rounds"] += int(won)
+            if number in PISTOL_ROUNDS:
+                teams[name]["pistolPlayed"] += 1
+                teams[name]["pistolWon"] += int(won)
+
+    return {
+        "match": match_key,
+        "map": result.get("mapName"),
+        "teams": teams,
+    }
+
+
+def _expected(rating, opponent):
+    return 1.0 / (1.0 + 10 ** ((opponent - rating) / 400.0))
+
+
+def _empty_team():
+    return {
+        "rating": INITIAL_RATING,
+        "matches": 0,
+        "wins": 0,
+        "pistol": {"won": 0, "played": 0},
+        "maps": {},
+    }
+
+
+def _empty_map():
+    return {
+        "rating": INITIAL_RATING,
+        "matches": 0,
+        "wins": 0,
+        "pistol": {"won": 0, "played": 0},
+        "sides": {"CT": {"won": 0, "played": 0}, "T": {"won": 0, "played": 0}},
+        # Janela móvel: últimos ROLLING_MATCHES [ctWon, ctPlayed, tWon, tPlayed] + somas
+        "recent": [],
+        "recentSums": [0, 0, 0, 0],
+    }
+
+
+class TeamRatings:
+    """
+    Estado incremental (snapshot JSON + log) alimentado por resumos de partidas
+
+    Args:
+        read_only: só consulta (show): reaplica a cauda do log em memória, sem
+            regravar o snapshot nem criar o diretório
+    """
+
+    def __init__(self, ratings_dir=DEFAULT_RATINGS_DIR, read_only=False):
+        self.dir = Path(ratings_dir)
+        self.read_only = read_only
+        if not read_only:
+            self.dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.dir / "ratings_log.ndjson"
+        self.state_path = self.dir / "team_ratings.json"
+        self._matches = None
+        self._unsaved = 0
+        self.state = self._load()
+
+    @property
+    def matches(self):
+        """
+        Chaves das partidas já vistas (lidas do log inteiro só no primeiro uso)
+        """
+        if self._matches is None:
+            self._matches = set()
+            if self.log_path.exists():
+                with open(self.log_path, "rb") as f:
+                    for raw in f:
+                        if raw.strip() and raw.endswith(b"\n"):
+                            self._matches.add(json.loads(raw)["match"])
+        return self._matches
+
+    def _fresh_state(self):
+        return {"schema": SCHEMA_VERSION, "logOffset": 0, "teams": {}}
+
+    def _load(self):
+        state = None
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("schema") != SCHEMA_VERSION:
+                print(f"🔄 Schema {state.get('schema')} → {SCHEMA_VERSION}: reconstruindo a partir do log", file=sys.stderr)
+                state = None
+        self.state = state or self._fresh_state()
+        if self.log_path.exists():
+            # Só as linhas posteriores ao snapshot são lidas e reaplicadas
+            self._replay(self.state["logOffset"])
+            if self._unsaved and not self.read_only:
+                self._save()
+        return self.state
+
+    def _save(self):
+        if self.read_only:
+            raise RuntimeError("TeamRatings aberto somente para leitura")
+        self.state["logOffset"] = self.log_path.stat().st_size if self.log_path.exists() else 0
+        tmp = self.state_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+        self._unsaved = 0
+
+    def _replay(self, applied_until=0):
+        with open(self.log_path, "rb") as f:
+            if applied_until > self.log_path.stat().st_size:
+                print("⚠️  Log menor que o snapshot - rode rebuild", file=sys.stderr)
+                return
+            f.seek(applied_until)
+            for raw in f:
+                if not raw.strip():
+                    continue
+                if not raw.endswith(b"\n"):
+                    break  # linha parcial de uma gravação interrompida
+                summary = json.loads(raw)
+                if self._matches is not None:
+                    self._matches.add(summary["match"])
+                self.apply(summary)
+                self._unsaved += 1
+
+    def rebuild(self):
+        """
+        Recalcula o snapshot do zero a partir do log
+        """
+        self.state = self._fresh_state()
+        self._matches = set()
+        if self.log_path.exists():
+            self._replay()
+        self._save()
+        return len(self.matches)
+
+    def add(self, result, match_key):
+        """
+        Incorpora uma partida (ignorada se já vista): grava no log e aplica;
+        o snapshot é regravado a cada SNAPSHOT_EVERY partidas (ou em flush)
+
+        Returns:
+            resumo aplicado ou None
+        """
+        if match_key in self.matches:
+            return None
+        summary = summarize_match(result, match_key)
+        if summary is None:
+            return None
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        self.matches.add(match_key)
+        self.apply(summary)
+        self._unsaved += 1
+        if self._unsaved >= SNAPSHOT_EVERY:
+            self._save()
+        return summary
+
+    def flush(self):
+        """
+        Grava o snapshot se há partidas aplicadas desde a última gravação
+        """
+        if self._unsaved:
+            self._save()
+
+    def apply(self, summary):
+        """
+        Atualização O(1) do estado com o resumo de uma partida
+        """
+        (name_a, a), (name_b, b) = summary["teams"].items()
+        map_name = summary.get("map") or "unknown"
+        teams = self.state["teams"]
+        team_a = teams.setdefault(name_a, _empty_team())
+        team_b = teams.setdefault(name_b, _empty_team())
+        map_a = team_a["maps"].setdefault(map_name, _empty_map())
+        map_b = team_b["maps"].setdefault(map_name, _empty_map())
+
+        score_a = 1.0 if a["rounds"] > b["rounds"] else 0.0 if a["rounds"] < b["rounds"] else 0.5
+        # Multiplicador por margem de rounds (vitórias largas movem mais o rating)
+        margin = math.log(abs(a["rounds"] - b["rounds"]) + 1) if score_a != 0.5 else 1.0
+        for ra, rb in ((team_a, team_b), (map_a, map_b)):
+            delta = K_FACTOR * margin * (score_a - _expected(ra["rating"], rb["rating"]))
+            ra["rating"] = round(ra["rating"] + delta, 2)
+            rb["rating"] = round(rb["rating"] - delta, 2)
+
+        for team, team_map, stats, score in ((team_a, map_a, a, score_a), (team_b, map_b, b, 1.0 - score_a)):
+            for bucket in (team, team_map):
+                bucket["matches"] += 1
+                bucket["wins"] += int(score == 1.0)
+                bucket["pistol"]["won"] += stats["pistolWon"]
+                bucket["pistol"]["played"] += stats["pistolPlayed"]
+            team_map["sides"]["CT"]["won"] += stats["ctWon"]
+            team_map["sides"]["CT"]["played"] += stats["ctPlayed"]
+            team_map["sides"]["T"]["won"] += stats["tWon"]
+            team_map["sides"]["T"]["played"] += stats["tPlayed"]
+
+            entry = [stats["ctWon"], stats["ctPlayed"], stats["tWon"], stats["tPlayed"]]
+            recent = deque(team_map["recent"], maxlen=ROLLING_MATCHES)
+            sums = team_map["recentSums"]
+            if len(recent) == ROLLING_MATCHES:
+                sums[:] = [s - x for s, x in zip(sums, recent[0])]
+            recent.append(entry)
+            sums[:] = [s + x for s, x in zip(sums, entry)]
+            team_map["recent"] = list(recent)
+
+    def team_report(self, name, map_name=None):
+        if name not in self.state["teams"]:
+            name = next((key for key in self.state["teams"] if key.lower() == name.lower()), name)
+        team = self.state["teams"].get(name)
+        if team is None:
+            return None
+
+        def rate(won, played):
+            return round(100.0 * won / played, 1) if played else None
+
+        maps = {}
+        for key, data in team["maps"].items():
+            if map_name and key.lower() != map_name.lower():
+                continue
+            ct_won, ct_played, t_won, t_played = data["recentSums"]
+            maps[key] = {
+                "rating": data["rating"],
+                "matches": data["matches"],
+                "wins": data["wins"],
+                "ctWinRate": rate(data["sides"]["CT"]["won"], data["sides"]["CT"]["played"]),
+                "tWinRate": rate(data["sides"]["T"]["won"], data["sides"]["T"]["played"]),
+                "recentCtWinRate": rate(ct_won, ct_played),
+                "recentTWinRate": rate(t_won, t_played),
+                "pistol": data["pistol"],
+            }
+        return {
+            "team": name,
+            "rating": team["rating"],
+            "matches": team["matches"],
+            "wins": team["wins"],
+            "pistol": team["pistol"],
+            "pistolWinRate": rate(team["pistol"]["won"], team["pistol"]["played"]),
+            "maps": maps,
+        }
+
+    def leaderboard(self):
+        return sorted(
+            ({"team": name, "rating": data["rating"], "matches": data["matches"]}
+             for name, data in self.state["teams"].items()),
+            key=lambda row: -row["rating"],
+        )
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Ratings e agregados incrementais por time")
+    cli.add_argument("--dir", default=DEFAULT_RATINGS_DIR)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Incorpora resultados JSON do parse_demo")
+    add.add_argument("inputs", nargs="+")
+
+    show = sub.add_parser("show", help="Leaderboard ou relatório de um time")
+    show.add_argument("team", nargs="?")
+    show.add_argument("--map")
+
+    sub.add_parser("rebuild", help="Recalcula tudo a partir do log")
+    args = cli.parse_args()
+
+    ratings = TeamRatings(args.dir, read_only=args.command == "show")
+    if args.command == "add":
+        for path in collect_results(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            summary = ratings.add(result, path.stem)
+            print(f"📈 {path.name}: {'ignorada' if summary is None else 'incorporada'}", file=sys.stderr)
+        ratings.flush()
+    elif args.command == "rebuild":
+        print(f"🔁 {ratings.rebuild()} partidas reaplicadas", file=sys.stderr)
+    elif args.team:
+        report = ratings.team_report(args.team, args.map)
+        if report is None:
+            print(json.dumps({"error": "Time não encontrado"}), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(ratings.leaderboard(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
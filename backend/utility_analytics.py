@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Análise de utilitários (granadas) do CS2
+Contagem por tipo, dano de HE, inimigos cegados e tempo de cegueira por round e lado
+"""
+
+import numpy as np
+import pandas as pd
+
+from demo_events import assign_rounds, pick_column, round_windows, sides_from_team
+
+
+# Evento de detonação -> chave no resumo de utilitários
+GRENADE_EVENTS = {
+    "hegrenade_detonate": "he",
+    "flashbang_detonate": "flash",
+    "smokegrenade_detonate": "smoke",
+}
+
+# inferno_startburn não traz o jogador (nem o lado): molotov/incendiária são
+# contadas no arremesso, pelo weapon_fire, que traz os campos user_*
+THROWN_WEAPONS = {
+    "molotov": ("molotov", "incgrenade"),
+}
+
+# Eventos necessários para a análise (extraídos numa única passada)
+UTILITY_EVENTS = list(GRENADE_EVENTS) + ["weapon_fire", "player_blind", "player_hurt"]
+
+UTILITY_FIELDS = ["he", "flash", "smoke", "molotov", "heDamage", "enemiesFlashed", "blindDuration"]
+
+
+def _empty_summary():
+    return {field: 0 for field in UTILITY_FIELDS}
+
+
+def _thrower_side(df):
+    team_col = pick_column(df, ['user_team_num', 'user_team', 'team_num'])
+    if team_col is None:
+        return np.full(len(df), None, dtype=object)
+    return sides_from_team(df[team_col])
+
+
+def _long_frame(frames):
+    """
+    Junta todas as fontes num frame longo (tick, side, field, value)
+    para agregação agrupada única
+    """
+    parts = []
+    for event_name, field in GRENADE_EVENTS.items():
+        df = frames.get(event_name)
+        if df is None or df.empty or 'tick' not in df.columns:
+            continue
+        parts.append(pd.DataFrame({
+            'tick': df['tick'].to_numpy(dtype=np.int64),
+            'side': _thrower_side(df),
+            'field': field,
+            'value': 1.0,
+        }))
+
+    fire = frames.get("weapon_fire")
+    if fire is not None and not fire.empty and 'tick' in fire.columns and 'weapon' in fire.columns:
+        weapons = fire['weapon'].astype(str).str.lower()
+        for field, names in THROWN_WEAPONS.items():
+            thrown = fire[weapons.str.contains('|'.join(names), na=False)]
+            if thrown.empty:
+                continue
+            parts.append(pd.DataFrame({
+                'tick': thrown['tick'].to_numpy(dtype=np.int64),
+                'side': _thrower_side(thrown),
+                'field': field,
+                'value': 1.0,
+            }))
+
+    hurt = frames.get("player_hurt")
+    if hurt is not None and not hurt.empty and 'tick' in hurt.columns and 'weapon' in hurt.columns:
+        he_hurt = hurt[hurt['weapon'].astype(str).str.contains('hegrenade', na=False)]
+        dmg_col = pick_column(he_hurt, ['dmg_health'])
+        att_team = pick_column(he_hurt, ['attacker_team_num', 'attacker_team'])
+        vic_team = pick_column(he_hurt, ['user_team_num', 'user_team'])
+        if dmg_col and not he_hurt.empty:
+            att_side = sides_from_team(he_hurt[att_team]) if att_team else np.full(len(he_hurt), None, dtype=object)
+            vic_side = sides_from_team(he_hurt[vic_team]) if vic_team else np.full(len(he_hurt), None, dtype=object)
+            enemy = att_side != vic_side
+            parts.append(pd.DataFrame({
+                'tick': he_hurt['tick'].to_numpy(dtype=np.int64)[enemy],
+                'side': att_side[enemy],
+                'field': 'heDamage',
+                'value': pd.to_numeric(he_hurt[dmg_col], errors='coerce').fillna(0).to_numpy(dtype=float)[enemy],
+            }))
+
+    blind = frames.get("player_blind")
+    if blind is not None and not blind.empty and 'tick' in blind.columns:
+        att_team = pick_column(blind, ['attacker_team_num', 'attacker_team'])
+        vic_team = pick_column(blind, ['user_team_num', 'user_team'])
+        if att_team and vic_team:
+            att_side = sides_from_team(blind[att_team])
+            vic_side = sides_from_team(blind[vic_team])
+            enemy = (att_side != vic_side) & pd.notna(att_side)
+            ticks = blind['tick'].to_numpy(dtype=np.int64)[enemy]
+            duration = pd.to_numeric(blind.get('blind_duration', pd.Series(0, index=blind.index)), errors='coerce')
+            parts.append(pd.DataFrame({'tick': ticks, 'side': att_side[enemy], 'field': 'enemiesFlashed', 'value': 1.0}))
+            parts.append(pd.DataFrame({
+                'tick': ticks,
+                'side': att_side[enemy],
+                'field': 'blindDuration',
+                'value': duration.fillna(0).to_numpy(dtype=float)[enemy],
+            }))
+
+    if not parts:
+        return pd.DataFrame(columns=['tick', 'side', 'field', 'value'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def analyze_utility(frames, end_ticks, freeze_end_ticks=None):
+    """
+    Resume o uso de utilitários por round e lado
+
+    Args:
+        frames: dict evento -> DataFrame (parse_event_frames com UTILITY_EVENTS)
+        end_ticks: tick de fim de cada round emitido
+        freeze_end_ticks: ticks de round_freeze_end (opcional)
+
+    Returns:
+        lista (alinhada aos rounds) de {"CT": {...}, "T": {...}} com
+        he, flash, smoke, molotov, heDamage, enemiesFlashed e blindDuration
+    """
+    n_rounds = len(end_ticks)
+    summaries = [{"CT": _empty_summary(), "T": _empty_summary()} for _ in range(n_rounds)]
+    long_df = _long_frame(frames)
+    if long_df.empty or n_rounds == 0:
+        return summaries
+
+    long_df['round_idx'] = assign_rounds(long_df['tick'].to_numpy(), end_ticks, round_windows(end_ticks, freeze_end_ticks))
+    long_df = long_df[(long_df['round_idx'] >= 0) & long_df['side'].isin(['CT', 'T'])]
+    totals = long_df.groupby(['round_idx', 'side', 'field'])['value'].sum()
+
+    for (round_idx, side, field), value in totals.items():
+        if field == 'blindDuration':
+            summaries[round_idx][side][field] = round(float(value), 2)
+        else:
+            summaries[round_idx][side][field] = int(round(value))
+    return summaries
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Tabela pré-computada de probabilidade de vitória por estado de round
+
+Estado = (vivos CT, vivos T, bomba plantada, faixa de tempo restante, faixa de
+economia CT, faixa de economia T). A partir do kill feed (`round_kills`, com o
+tempo de cada kill), do plant (`rounds[].bomb.plantTime`) e da economia no início
+do round (`rounds[].economy`), cada round do corpus percorre uma grade de tempo e
+soma, em cada estado visitado, uma ocorrência e (se for o caso) uma vitória CT.
+
+Rounds sem amostra de economia (parse leve, prop ausente) entram numa faixa
+"unknown" própria, em vez de contaminar uma faixa real. Os contadores são
+aditivos: uma partida nova só soma seus rounds (rebuild incremental); a consulta
+é uma leitura O(1) no array, e sem economia informada usa a tabela marginal
+(somada sobre as faixas de economia daquele lado).
+
+Uso:
+  python win_probability.py add <resultado.json|pasta> [...] [--table win_prob.npz]
+  python win_probability.py lookup --ct 3 --t 2 --planted --remaining 30 --ct-money 20000 --t-money 9000
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from kill_index import collect_results
+from round_timeline import live_duration, round_kills
+
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_TABLE = os.environ.get("WIN_PROB_TABLE", str(BACKEND_DIR / "win_prob.npz"))
+
+TEAM_SIZE = 5
+ROUND_SECONDS = 115.0
+BOMB_SECONDS = 40.0
+TIME_BUCKET_SECONDS = 10.0
+TIME_BUCKETS = int(np.ceil(ROUND_SECONDS / TIME_BUCKET_SECONDS))
+# Grade de amostragem dentro de cada round (segundos)
+SAMPLE_STEP_SECONDS = 5.0
+# Limites (valor total de equipamento do lado): eco < 10k <= force < 20k <= full;
+# "unknown" = round sem amostra de economia
+ECONOMY_EDGES = (10000, 20000)
+ECONOMY_BUCKETS = ("eco", "force", "full", "unknown")
+UNKNOWN_ECONOMY = ECONOMY_BUCKETS.index("unknown")
+# Peso do prior (tabela sem economia) quando o estado tem poucas amostras
+PRIOR_WEIGHT = 5.0
+
+SHAPE = (TEAM_SIZE + 1, TEAM_SIZE + 1, 2, TIME_BUCKETS, len(ECONOMY_BUCKETS), len(ECONOMY_BUCKETS))
+
+
+def economy_bucket(value):
+    if value is None:
+        return UNKNOWN_ECONOMY
+    return int(np.searchsorted(ECONOMY_EDGES, value, side="right"))
+
+
+def time_bucket(remaining):
+    return np.clip((np.asarray(remaining, dtype=float) // TIME_BUCKET_SECONDS).astype(int), 0, TIME_BUCKETS - 1)
+
+
+def round_states(round_info, kills):
+    """
+    Estados distintos visitados por um round (índices na tabela) e se o CT venceu
+
+    Args:
+        kills: kill feed do round (round_timeline.round_kills)
+
+    Returns:
+        (array N x 6 de índices, ct_won) ou None se o round não tem kill feed
+    """
+    if kills is None:
+        return None
+    bomb = round_info.get("bomb") or {}
+    plant_time = bomb.get("plantTime")
+    times = np.array([k.get("time", 0.0) for k in kills], dtype=float)
+    victim_sides = np.array([k.get("victimSide") for k in kills], dtype=object)
+
+    last_event = times.max() if len(times) else 0.0
+    if plant_time is not None:
+        last_event = max(last_event, plant_time + (bomb.get("postPlantDuration") or 0.0))
+    # Com a timeline, a grade vai até o fim real do round (ex.: tempo esgotado sem kills finais)
+    duration = live_duration(round_info["timeline"]) if round_info.get("timeline") else None
+    if duration is not None:
+        last_event = max(last_event, min(duration, ROUND_SECONDS if plant_time is None else plant_time + BOMB_SECONDS))
+    grid = np.arange(0.0, last_event + SAMPLE_STEP_SECONDS, SAMPLE_STEP_SECONDS)
+
+    # Vivos em cada instante da grade: mortes por lado até t (kills ordenados por tempo)
+    alive = {}
+    for side in ("CT", "T"):
+        deaths = np.sort(times[victim_sides == side])
+        alive[side] = np.clip(TEAM_SIZE - np.searchsorted(deaths, grid, side="right"), 0, TEAM_SIZE)
+
+    planted = np.zeros(len(grid), dtype=int) if plant_time is None else (grid >= plant_time).astype(int)
+    remaining = np.where(
+        planted == 1,
+        BOMB_SECONDS - (grid - (plant_time or 0.0)),
+        ROUND_SECONDS - grid,
+    )
+    economy = round_info.get("economy") or {}
+    states = np.column_stack([
+        alive["CT"],
+        alive["T"],
+        planted,
+        time_bucket(remaining),
+        np.full(len(grid), economy_bucket(economy.get("CT"))),
+        np.full(len(grid), economy_bucket(economy.get("T"))),
+    ])
+    # Depois que um lado zera, o round já está decidido
+    states = states[(states[:, 0] > 0) & (states[:, 1] > 0)]
+    return np.unique(states, axis=0), round_info.get("winnerSide") == "CT"
+
+
+class WinProbabilityTable:
+    """
+    Contadores (ocorrências e vitórias CT) por estado, persistidos num .npz
+    """
+
+    def __init__(self, path=DEFAULT_TABLE):
+        self.path = Path(path)
+        self.total = np.zeros(SHAPE, dtype=np.int64)
+        self.ct_wins = np.zeros(SHAPE, dtype=np.int64)
+        self.matches = set()
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as data:
+                if tuple(data["total"].shape) == SHAPE:
+                    self.total = data["total"]
+                    self.ct_wins = data["ct_wins"]
+                    self.matches = set(data["matches"].tolist())
+                else:
+                    print("🔄 Formato da tabela mudou - começando do zero (rode add no corpus)", file=sys.stderr)
+        self._refresh_prior()
+
+    def _refresh_prior(self):
+        # Prior sem economia: soma sobre os eixos de economia (mantidos para broadcast)
+        total = self.total.sum(axis=(4, 5), keepdims=True)
+        wins = self.ct_wins.sum(axis=(4, 5), keepdims=True)
+        self.prior = np.where(total > 0, wins / np.maximum(total, 1), 0.5)
+        # Tabelas suavizadas por quais economias são conhecidas (CT, T); o eixo de
+        # economia desconhecida é marginalizado (somado) e fica com tamanho 1
+        self.tables = {}
+        for known in ((True, True), (True, False), (False, True), (False, False)):
+            axes = tuple(axis for axis, is_known in zip((4, 5), known) if not is_known)
+            total = self.total.sum(axis=axes, keepdims=True) if axes else self.total
+            wins = self.ct_wins.sum(axis=axes, keepdims=True) if axes else self.ct_wins
+            self.tables[known] = (total, (wins + PRIOR_WEIGHT * self.prior) / (total + PRIOR_WEIGHT))
+        self.probability = self.tables[(True, True)][1]
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez_compressed(tmp, total=self.total, ct_wins=self.ct_wins,
+                            matches=np.array(sorted(self.matches), dtype=str))
+        os.replace(tmp, self.path)
+
+    def add(self, result, match_key, save=True):
+        """
+        Soma os rounds de uma partida na tabela (ignorada se já incluída)
+
+        Returns:
+            nº de rounds considerados ou None se já incluída
+        """
+        if match_key in self.matches:
+            return None
+        used = 0
+        for round_info in result.get("rounds", []):
+            visited = round_states(round_info, round_kills(result, round_info))
+            if visited is None:
+                continue
+            states, ct_won = visited
+            index = tuple(states.T)
+            np.add.at(self.total, index, 1)
+            if ct_won:
+                np.add.at(self.ct_wins, index, 1)
+            used += 1
+        self.matches.add(match_key)
+        self._refresh_prior()
+        if save:
+            self.save()
+        return used
+
+    def lookup(self, ct_alive, t_alive, planted, remaining, ct_money=None, t_money=None):
+        """
+        Probabilidade de vitória CT num estado (leitura O(1) na tabela suavizada);
+        sem ct_money/t_money usa a tabela marginal sobre a economia daquele lado
+
+        Returns:
+            dict com ctWin, tWin e samples
+        """
+        if ct_alive <= 0 or t_alive <= 0:
+            ct = 1.0 if t_alive <= 0 < ct_alive else 0.0
+            return {"ctWin": ct, "tWin": 1.0 - ct, "samples": 0}
+        index = (
+            min(int(ct_alive), TEAM_SIZE),
+            min(int(t_alive), TEAM_SIZE),
+            int(bool(planted)),
+            int(time_bucket(remaining)),
+            economy_bucket(ct_money) if ct_money is not None else 0,
+            economy_bucket(t_money) if t_money is not None else 0,
+        )
+        total, probability = self.tables[(ct_money is not None, t_money is not None)]
+        ct = float(probability[index])
+        return {"ctWin": round(ct, 4), "tWin": round(1.0 - ct, 4), "samples": int(total[index])}
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Tabela de probabilidade de vitória por estado de round")
+    cli.add_argument("--table", default=DEFAULT_TABLE)
+    sub = cli.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Soma resultados JSON do parse_demo na tabela")
+    add.add_argument("inputs", nargs="+")
+
+    lookup = sub.add_parser("lookup")
+    lookup.add_argument("--ct", type=int, required=True, help="CTs vivos")
+    lookup.add_argument("--t", type=int, required=True, help="Ts vivos")
+    lookup.add_argument("--planted", action="store_true")
+    lookup.add_argument("--remaining", type=float, required=True, help="Segundos restantes (round ou bomba)")
+    lookup.add_argument("--ct-money", type=int)
+    lookup.add_argument("--t-money", type=int)
+    args = cli.parse_args()
+
+    table = WinProbabilityTable(args.table)
+    if args.command == "add":
+        for path in collect_results(args.inputs):
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            used = table.add(result, path.stem, save=False)
+            print(f"🎲 {path.name}: {'já incluída' if used is None else f'{used} rounds'}", file=sys.stderr)
+        table.save()
+    else:
+        print(json.dumps(table.lookup(args.ct, args.t, args.planted, args.remaining, args.ct_money, args.t_money)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Match, TeamSide } from '../types';
 import { Save, RotateCcw, AlertCircle, Trash2 } from 'lucide-react';
 import supabaseService from '../services/supabaseService';
+import { learnTeamAlias } from '../services/demoParser';
 
 interface AdjustScoresProps {
   matches: Match[];
@@ -92,6 +93,19 @@ const AdjustScores: React.FC<AdjustScoresProps> = ({ matches, onUpdate }) => {
       await supabaseService.updateMatch(selectedMatchId, formData);
       
       console.log('✅ Atualizado no banco de dados');
+
+      // Nome corrigido = alias confirmado: ensina o backend a resolver a grafia antiga
+      if (selectedMatch) {
+        const renames: [string, string][] = [
+          [selectedMatch.teamA.name, formData.teamA_name],
+          [selectedMatch.teamB.name, formData.teamB_name],
+        ];
+        for (const [oldName, newName] of renames) {
+          if (newName && oldName !== newName) {
+            await learnTeamAlias(oldName, newName);
+          }
+        }
+      }
       setMessage({ type: 'success', text: 'Match atualizado com sucesso!' });
       
       // Chamar callback do pai para recarregar todos os matches
@@ -262,7 +276,13 @@ const AdjustScores: React.FC<AdjustScoresProps> = ({ matches, onUpdate }) => {
                   <div className="grid grid-cols-3 gap-4 items-center">
                     {/* Team A */}
                     <div className="space-y-2">
-                      <label className="block text-sm text-slate-400">{formData.teamA_name}</label>
+                      <input
+                        type="text"
+                        value={formData.teamA_name}
+                        onChange={(e) => setFormData({ ...formData, teamA_name: e.target.value })}
+                        className="w-full bg-transparent border-b border-slate-600 text-sm text-slate-400 focus:outline-none focus:border-blue-500"
+                        title="Nome do time (correções viram alias)"
+                      />
                       <input
                         type="number"
                         min="0"
@@ -286,7 +306,13 @@ const AdjustScores: React.FC<AdjustScoresProps> = ({ matches, onUpdate }) => {
 
                     {/* Team B */}
                     <div className="space-y-2">
-                      <label className="block text-sm text-slate-400">{formData.teamB_name}</label>
+                      <input
+                        type="text"
+                        value={formData.teamB_name}
+                        onChange={(e) => setFormData({ ...formData, teamB_name: e.target.value })}
+                        className="w-full bg-transparent border-b border-slate-600 text-sm text-slate-400 focus:outline-none focus:border-blue-500"
+                        title="Nome do time (correções viram alias)"
+                      />
                       <input
                         type="number"
                         min="0"
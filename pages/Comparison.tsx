@@ -1,7 +1,8 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { Match, RoundEndReason, TeamSide } from '../types';
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, Legend } from 'recharts';
-import { Swords, Map, Filter, Sparkles, Crown, Zap, TrendingUp, TrendingDown, Scale } from 'lucide-react';
+import { Swords, Map, Filter, Sparkles, Crown, Zap, TrendingUp, TrendingDown, Scale, Users } from 'lucide-react';
+import { fetchTeamPlayers, fetchTeamRating, TeamPlayerStats, TeamRating } from '../services/demoParser';
 
 interface ComparisonProps {
   matches: Match[];
@@ -66,6 +67,42 @@ const Comparison: React.FC<ComparisonProps> = ({ matches }) => {
     }
   }, [teamA, teamB, teamOptions]);
 
+  const [teamAPlayers, setTeamAPlayers] = useState<TeamPlayerStats[]>([]);
+  const [teamBPlayers, setTeamBPlayers] = useState<TeamPlayerStats[]>([]);
+  const [teamARating, setTeamARating] = useState<TeamRating | null>(null);
+  const [teamBRating, setTeamBRating] = useState<TeamRating | null>(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    const mapFilter = selectedMap || undefined;
+    Promise.all([
+      teamA ? fetchTeamPlayers(teamA, mapFilter) : Promise.resolve([]),
+      teamB ? fetchTeamPlayers(teamB, mapFilter) : Promise.resolve([]),
+      teamA ? fetchTeamRating(teamA, mapFilter) : Promise.resolve(null),
+      teamB ? fetchTeamRating(teamB, mapFilter) : Promise.resolve(null),
+    ]).then(([playersA, playersB, ratingA, ratingB]) => {
+      if (cancelled) return;
+      setTeamAPlayers(playersA);
+      setTeamBPlayers(playersB);
+      setTeamARating(ratingA);
+      setTeamBRating(ratingB);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [teamA, teamB, selectedMap]);
+
+  // Elo do mapa filtrado (quando o time já jogou nele) ou o geral
+  const ratingLabel = (rating: TeamRating | null) => {
+    if (!rating) return 'Resumo do time';
+    const mapRating = selectedMap
+      ? Object.entries(rating.maps).find(([name]) => name.toLowerCase() === selectedMap.toLowerCase())?.[1]
+      : undefined;
+    return mapRating
+      ? `Elo ${mapRating.rating.toFixed(0)} em ${selectedMap} · geral ${rating.rating.toFixed(0)}`
+      : `Elo ${rating.rating.toFixed(0)} · ${rating.matches} partidas`;
+  };
+
   const filteredMatches = useMemo(() => {
     if (!selectedMap) return matches;
     return matches.filter(m => m.mapName === selectedMap);
@@ -357,7 +394,7 @@ const Comparison: React.FC<ComparisonProps> = ({ matches }) => {
             </div>
             <div>
               <div className="text-emerald-100 text-sm uppercase tracking-wider">{teamA || 'Time A'}</div>
-              <div className="text-xs text-slate-400">Resumo do time</div>
+              <div className="text-xs text-slate-400">{ratingLabel(teamARating)}</div>
             </div>
           </div>
           <div className="grid grid-cols-2 gap-4">
@@ -379,7 +416,7 @@ const Comparison: React.FC<ComparisonProps> = ({ matches }) => {
             </div>
             <div>
               <div className="text-amber-100 text-sm uppercase tracking-wider">{teamB || 'Time B'}</div>
-              <div className="text-xs text-slate-400">Resumo do time</div>
+              <div className="text-xs text-slate-400">{ratingLabel(teamBRating)}</div>
             </div>
           </div>
           <div className="grid grid-cols-2 gap-4">
@@ -446,6 +483,50 @@ const Comparison: React.FC<ComparisonProps> = ({ matches }) => {
         </div>
       </div>
 
+      {(teamAPlayers.length > 0 || teamBPlayers.length > 0) && (
+        <div className="bg-gradient-to-br from-slate-900 to-slate-950 border border-slate-800 rounded-2xl p-6">
+          <div className="flex items-center gap-3 mb-4">
+            <div className="p-2 bg-blue-500/20 rounded-lg text-blue-400">
+              <Users size={20} />
+            </div>
+            <div>
+              <h3 className="text-lg font-bold text-white">Jogadores</h3>
+              <p className="text-slate-400 text-xs">Carreira no time (K/D e ADR){selectedMap ? ` em ${selectedMap}` : ''}</p>
+            </div>
+          </div>
+          <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
+            {[
+              { team: teamA, players: teamAPlayers, color: 'text-emerald-300' },
+              { team: teamB, players: teamBPlayers, color: 'text-amber-300' },
+            ].map(({ team, players, color }) => (
+              <div key={team || color}>
+                <div className={`text-sm font-semibold mb-2 ${color}`}>{team}</div>
+                <table className="w-full text-sm">
+                  <thead>
+                    <tr className="text-slate-400 text-xs uppercase">
+                      <th className="text-left py-1">Jogador</th>
+                      <th className="text-right py-1">Partidas</th>
+                      <th className="text-right py-1">K/D</th>
+                      <th className="text-right py-1">ADR</th>
+                    </tr>
+                  </thead>
+                  <tbody>
+                    {players.map(player => (
+                      <tr key={player.steamid} className="border-t border-slate-800 text-slate-200">
+                        <td className="py-1.5">{player.name}</td>
+                        <td className="text-right">{player.matches}</td>
+                        <td className="text-right">{player.kd?.toFixed(2) ?? '-'}</td>
+                        <td className="text-right">{player.adr?.toFixed(1) ?? '-'}</td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+              </div>
+            ))}
+          </div>
+        </div>
+      )}
+
       <div className="bg-gradient-to-br from-slate-900 to-slate-950 border border-slate-800 rounded-2xl p-6">
         <div className="flex items-center justify-between mb-6">
           <div>
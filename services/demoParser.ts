@@ -158,6 +158,88 @@ export const checkBackendHealth = async (): Promise<boolean> => {
   }
 };
 
+/**
+ * Registra no backend um alias confirmado de time (ex.: "Imperial E" -> "Imperial")
+ * para que próximas demos com essa grafia já entrem com o nome correto
+ */
+export const learnTeamAlias = async (alias: string, team: string): Promise<boolean> => {
+  try {
+    const response = await fetch(`${BACKEND_URL}/api/team-aliases`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ alias, team })
+    });
+    if (!response.ok) {
+      // 409: alias recusado (nome genérico ou já é outro time cadastrado)
+      const body = await response.json().catch(() => ({}));
+      console.warn('⚠️ Alias do time não registrado:', body.error || response.status);
+    }
+    return response.ok;
+  } catch (error) {
+    console.warn('⚠️ Não foi possível registrar o alias do time:', error);
+    return false;
+  }
+};
+
+export interface TeamPlayerStats {
+  steamid: string;
+  name: string;
+  matches: number;
+  kills: number;
+  deaths: number;
+  kd: number | null;
+  adr: number | null;
+}
+
+/**
+ * Jogadores de um time no store de carreiras do backend (player_careers.py)
+ */
+export const fetchTeamPlayers = async (team: string, map?: string): Promise<TeamPlayerStats[]> => {
+  try {
+    const query = map ? `?map=${encodeURIComponent(map)}` : '';
+    const response = await fetch(`${BACKEND_URL}/api/teams/${encodeURIComponent(team)}/players${query}`);
+    if (!response.ok) return [];
+    return await response.json();
+  } catch (error) {
+    console.warn('⚠️ Não foi possível carregar os jogadores do time:', error);
+    return [];
+  }
+};
+
+export interface TeamRatingMap {
+  rating: number;
+  matches: number;
+  wins: number;
+  ctWinRate: number | null;
+  tWinRate: number | null;
+  recentCtWinRate: number | null;
+  recentTWinRate: number | null;
+}
+
+export interface TeamRating {
+  team: string;
+  rating: number;
+  matches: number;
+  wins: number;
+  pistolWinRate: number | null;
+  maps: Record<string, TeamRatingMap>;
+}
+
+/**
+ * Rating Elo (geral e por mapa) de um time, mantido pelo backend (team_ratings.py)
+ */
+export const fetchTeamRating = async (team: string, map?: string): Promise<TeamRating | null> => {
+  try {
+    const query = map ? `?map=${encodeURIComponent(map)}` : '';
+    const response = await fetch(`${BACKEND_URL}/api/teams/${encodeURIComponent(team)}/rating${query}`);
+    if (!response.ok) return null;
+    return await response.json();
+  } catch (error) {
+    console.warn('⚠️ Não foi possível carregar o rating do time:', error);
+    return null;
+  }
+};
+
 /**
  * Formatar nome do mapa
  */
@@ -647,9 +647,11 @@ export const supabaseService = {
   },
 
   /**
-   * Atualiza scores e lados de um match (ajuste manual)
+   * Atualiza nomes, scores e lados de um match (ajuste manual)
    */
   updateMatch: async (matchId: string, updates: {
+    teamA_name?: string;
+    teamB_name?: string;
     teamA_score?: number;
     teamB_score?: number;
     teamA_side?: TeamSide;
@@ -671,6 +673,23 @@ export const supabaseService = {
 
       const { team_a_id, team_b_id } = matchData;
 
+      // Atualizar nomes das teams
+      if (updates.teamA_name && team_a_id) {
+        const { error } = await supabase
+          .from('teams')
+          .update({ name: updates.teamA_name })
+          .eq('id', team_a_id);
+        if (error) throw error;
+      }
+
+      if (updates.teamB_name && team_b_id) {
+        const { error } = await supabase
+          .from('teams')
+          .update({ name: updates.teamB_name })
+          .eq('id', team_b_id);
+        if (error) throw error;
+      }
+
       // Atualizar scores das teams
       if (updates.teamA_score !== undefined && team_a_id) {
         const { error } = await supabase